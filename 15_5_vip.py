@@ -22,7 +22,10 @@ from datetime import datetime
 import re
 from collections import defaultdict, Counter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
-from requests.auth import HTTPBasicAuth
+from f5_session import (get_session_pool, with_select, decode_json, get_pools_expanded,
+                        VIRTUAL_FIELDS, POOL_FIELDS, MEMBER_FIELDS, NODE_FIELDS,
+                        PREFETCH_ENDPOINTS)
+from f5_cache import ResponseCache, DEFAULT_CACHE_FILE, CONFIG_TTL, STATS_TTL, DEFAULT_MAX_BYTES
 from openpyxl import Workbook
 import argparse
 import logging
@@ -45,7 +48,7 @@ logger = logging.getLogger(__name__)
 class F5Config:
     """Client for interacting with F5 API."""
     
-    def __init__(self, host, username, password, verify_ssl=False):
+    def __init__(self, host, username, password, verify_ssl=False, response_cache=None, use_async=False):
         """Initialize F5 client with connection details and generate report."""
         # Ensure host has https:// prefix
         if not host.startswith('http'):
@@ -56,14 +59,24 @@ class F5Config:
         self.USERNAME = username
         self.PASSWORD = password
         
-        # Create session
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.USERNAME, self.PASSWORD)
-        self.session.verify = verify_ssl
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Shared token-authenticated session (see f5_session.py)
+        self.session = get_session_pool(self.USERNAME, self.PASSWORD, verify_ssl).session(self.F5_HOST)
+
+        # Optional persistent response cache (see f5_cache.py) answering repeat requests locally
+        self.response_cache = response_cache
+
+        # Responses fetched ahead by the asyncio client, each handed out once by get_json
+        self.prefetched = {}
 
         # Automatically generate report upon initialization
         try:
+            if use_async:
+                logger.info("Prefetching virtual server, pool and node collections...")
+                from f5_async_client import prefetch_device
+                self.prefetched.update(prefetch_device(self.F5_HOST, self.USERNAME, self.PASSWORD,
+                                                       PREFETCH_ENDPOINTS, verify_ssl,
+                                                       response_cache=self.response_cache))
+
             logger.info("Fetching virtual server data...")
             vs_data, summary_counts = process_virtual_servers(self)
             
@@ -114,11 +127,21 @@ class F5Config:
 
     def get_json(self, endpoint):
         """Get data from F5 API endpoint."""
+        prefetched = self.prefetched.pop(endpoint, None)
+        if prefetched is not None:
+            return prefetched
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.F5_HOST, endpoint)
+            if cached is not None:
+                return cached
         url = f"{self.F5_HOST}{endpoint}"
         try:
             resp = self.session.get(url)
             resp.raise_for_status()
-            return resp.json()
+            data = decode_json(resp)
+            if self.response_cache is not None:
+                self.response_cache.put(self.F5_HOST, endpoint, resp.content)
+            return data
         except Exception as e:
             logger.error(f"Failed to get data from {endpoint}: {str(e)}")
             return None
@@ -165,7 +188,7 @@ def parse_destination(destination):
 def process_virtual_servers(f5_config):
     """Fetch and process virtual server information using robust data-driven mapping."""
     try:
-        virtuals = f5_config.get_json('/mgmt/tm/ltm/virtual')
+        virtuals = f5_config.get_json(with_select('/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS))
         vstats = f5_config.get_json('/mgmt/tm/ltm/virtual/stats')
         if not virtuals or not vstats:
             logger.error("Failed to get virtual server data or stats")
@@ -222,9 +245,9 @@ def process_virtual_servers(f5_config):
         return [], {"virtual": Counter(), "pool": Counter(), "node": Counter()}
 
 def process_pools(f5_config, summary_counts):
-    """Fetch and process pool information, always fetching members live from membersReference.link, and mapping status by fullPath/tmName.description only."""
+    """Fetch and process pool information, taking members inline from an expanded pool collection (or live from membersReference.link on older devices), and mapping status by fullPath/tmName.description only."""
     try:
-        pools = f5_config.get_json('/mgmt/tm/ltm/pool')
+        pools, expanded = get_pools_expanded(f5_config, POOL_FIELDS)
         pstats = f5_config.get_json('/mgmt/tm/ltm/pool/stats')
         if not pools or not pstats:
             logger.error("Failed to get pool data or stats")
@@ -259,20 +282,25 @@ def process_pools(f5_config, summary_counts):
                     'totalMemberCount': stats.get('memberCnt', {}).get('value', 0),
                     'members': []
                 }
-                # Always fetch members live from membersReference.link
-                members_ref = pool.get('membersReference', {}).get('link')
-                if members_ref:
-                    members_ref = members_ref.split('?')[0]
-                    if members_ref.startswith('https://localhost'):
-                        members_ref = members_ref.replace('https://localhost', '')
-                    members_data = f5_config.get_json(members_ref)
-                    if members_data and 'items' in members_data:
-                        for member in members_data['items']:
-                            pool_data[fullPath]['members'].append({
-                                'name': member.get('name', ''),
-                                'address': member.get('address', ''),
-                                'port': member.get('port', '')
-                            })
+                members_ref = pool.get('membersReference', {})
+                if expanded:
+                    member_items = members_ref.get('items', [])
+                else:
+                    # Fetch members live from membersReference.link
+                    member_items = []
+                    if members_ref.get('link'):
+                        link = members_ref['link'].split('?')[0]
+                        if link.startswith('https://localhost'):
+                            link = link.replace('https://localhost', '')
+                        members_data = f5_config.get_json(with_select(link, MEMBER_FIELDS))
+                        if members_data and 'items' in members_data:
+                            member_items = members_data['items']
+                for member in member_items:
+                    pool_data[fullPath]['members'].append({
+                        'name': member.get('name', ''),
+                        'address': member.get('address', ''),
+                        'port': member.get('port', '')
+                    })
             except Exception as e:
                 logger.error(f"Error processing pool {name}: {str(e)}")
                 continue
@@ -284,7 +312,7 @@ def process_pools(f5_config, summary_counts):
 def process_nodes(f5_config, summary_counts):
     """Fetch and process node information using robust data-driven mapping."""
     try:
-        nodes = f5_config.get_json('/mgmt/tm/ltm/node')
+        nodes = f5_config.get_json(with_select('/mgmt/tm/ltm/node', NODE_FIELDS))
         nstats = f5_config.get_json('/mgmt/tm/ltm/node/stats')
         if not nodes or not nstats:
             logger.error("Failed to get node data or stats")
@@ -486,56 +514,27 @@ def main():
     parser.add_argument('--username', required=True, help='F5 username')
     parser.add_argument('--password', required=True, help='F5 password')
     parser.add_argument('--verify-ssl', action='store_true', help='Verify SSL certificate')
+    parser.add_argument('--response-cache', nargs='?', const=DEFAULT_CACHE_FILE, metavar='PATH',
+                        help=f'Serve repeat requests from a local SQLite response cache (default file: {DEFAULT_CACHE_FILE})')
+    parser.add_argument('--config-ttl', type=int, default=CONFIG_TTL,
+                        help=f'Seconds cached config responses stay valid (default: {CONFIG_TTL})')
+    parser.add_argument('--stats-ttl', type=int, default=STATS_TTL,
+                        help=f'Seconds cached /stats, pool member and expanded pool responses stay valid (default: {STATS_TTL})')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help=f'Size of the response cache before least recently used entries are evicted (default: {DEFAULT_MAX_BYTES // (1024 * 1024)})')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Fetch the virtual/pool/node list and stats collections concurrently (requires aiohttp)')
     
     args = parser.parse_args()
+
+    response_cache = None
+    if args.response_cache:
+        response_cache = ResponseCache(args.response_cache, args.config_ttl, args.stats_ttl,
+                                       args.cache_max_mb * 1024 * 1024)
     
     try:
-        # Initialize F5 config
-        f5_config = F5Config(args.host, args.username, args.password, args.verify_ssl)
-        
-        # Fetch and process data
-        logger.info("Fetching virtual server data...")
-        vs_data, summary_counts = process_virtual_servers(f5_config)
-        
-        logger.info("Fetching pool data...")
-        pool_data = process_pools(f5_config, summary_counts)
-        
-        logger.info("Fetching node data...")
-        node_data = process_nodes(f5_config, summary_counts)
-        
-        # Generate report
-        logger.info("Generating report...")
-        report_data = generate_report(vs_data, pool_data, node_data)
-        
-        # Generate output filename prefix
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        f5_hostname = args.host.replace("https://", "").replace("http://", "")
-        output_prefix = f"{f5_hostname}_{timestamp}_f5_report"
-        
-        # Generate Excel report
-        excel_filename = generate_excel_report(report_data, summary_counts, output_prefix)
-        logger.info(f"Report generated in: {os.path.abspath(os.path.dirname(excel_filename))}")
-        
-        # Print summary
-        print("\nSummary of F5 Components:")
-        print("-" * 50)
-        print("Virtual Servers:")
-        for status, count in summary_counts['virtual'].items():
-            print(f"  {status}: {count}")
-        
-        print("\nPools:")
-        for status, count in summary_counts['pool'].items():
-            print(f"  {status}: {count}")
-        
-        print("\nNodes:")
-        for status, count in summary_counts['node'].items():
-            print(f"  {status}: {count}")
-        
-        print(f"\nTotal virtual servers: {len(report_data)}")
-        print(f"Total pools with members: {sum(1 for item in report_data if item.get('active_members', 0) > 0)}")
-        print(f"Total pools: {len(pool_data)}")
-        print(f"Total nodes: {len(node_data)}")
-        
+        # The constructor collects, writes the report and prints the summary
+        F5Config(args.host, args.username, args.password, args.verify_ssl, response_cache, args.use_async)
     except Exception as e:
         logger.error(f"Error generating report: {str(e)}")
         import traceback
@@ -22,13 +22,25 @@ from datetime import datetime
 import re
 from collections import defaultdict, Counter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
-from requests.auth import HTTPBasicAuth
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment
-import pandas as pd
+from f5_session import (get_session_pool, with_select, DEFAULT_POOL_MAXSIZE, decode_json, next_page_endpoint,
+                        EXPANDED_POOL_ENDPOINT, members_inline, VIRTUAL_FIELDS, POOL_FIELDS,
+                        MEMBER_FIELDS, NODE_FIELDS, list_stats_endpoints)
+from f5_snapshot import write_snapshot, SNAPSHOT_FORMATS
+from f5_cache import ResponseCache, DEFAULT_CACHE_FILE, CONFIG_TTL, STATS_TTL, DEFAULT_MAX_BYTES
+from f5_metrics import Metrics, ThreadProfiler
+from f5_records import VirtualServer, Pool, PoolMember, Node, ReportRow, intern_state, record_dict
+from f5_throttle import host_guard
+from f5_fleet_index import FleetIndex, DEFAULT_INDEX_FILE
+from f5_incremental import ConfigCache, CHANGE_FIELDS, PROBE_FIELDS, DEFAULT_CACHE_DIR, change_marker, item_endpoint
+from concurrent.futures import ThreadPoolExecutor, Future
+from itertools import chain
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
 import argparse
 import logging
 import sys
+import time
 
 # Suppress insecure HTTPS warnings
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -44,10 +56,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Default number of concurrent pool member requests; keep this below the
+# device's restjavad worker limit
+DEFAULT_MEMBER_WORKERS = 8
+
+# Items requested per page ($top) when streaming config collections
+DEFAULT_PAGE_SIZE = 500
+
+# Above this many changed objects a collection is refetched in pages
+# instead of one request per changed object
+INCREMENTAL_REFETCH_LIMIT = 50
+
+# Background fetches (the three /stats requests) run while the config
+# collections are collected
+PIPELINE_WORKERS = 3
+
+class IncompleteCollectionError(Exception):
+    """Raised while streaming a collection when a page after the first cannot be fetched."""
+
 class F5Config:
     """Client for interacting with F5 API."""
     
-    def __init__(self, host, username, password, verify_ssl=False):
+    def __init__(self, host, username, password, verify_ssl=False, max_workers=DEFAULT_MEMBER_WORKERS,
+                 page_size=DEFAULT_PAGE_SIZE, snapshot_format=None, snapshot_dir='.',
+                 cache_dir=None, full_refresh=False, response_cache=None, run_report=True,
+                 metrics_file=None, use_async=False, fleet_index=None):
         """Initialize F5 client with connection details and generate report."""
         # Ensure host has https:// prefix
         if not host.startswith('http'):
@@ -57,36 +90,93 @@ class F5Config:
             
         self.USERNAME = username
         self.PASSWORD = password
+        self.verify_ssl = verify_ssl
         
-        # Create session
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.USERNAME, self.PASSWORD)
-        self.session.verify = verify_ssl
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Shared token-authenticated session (see f5_session.py). The
+        # connection pool is sized to the worker count so concurrent member
+        # fetches reuse keep-alive connections instead of opening new ones
+        self.max_workers = max(1, int(max_workers))
+        session_pool = get_session_pool(self.USERNAME, self.PASSWORD, verify_ssl,
+                                        pool_maxsize=max(self.max_workers, DEFAULT_POOL_MAXSIZE))
+        self.session = session_pool.session(self.F5_HOST)
+        self.page_size = max(1, int(page_size))
+
+        # (endpoint, seconds) for every request, used to tune max_workers
+        self.request_timings = []
+        # Phase timings, per-endpoint latency histograms, bytes and object counts
+        self.metrics = Metrics()
+
+        # Last collected config per fullPath; only changed objects are refetched
+        self.config_cache = ConfigCache(cache_dir, self.F5_HOST) if cache_dir else None
+        self.full_refresh = full_refresh
+
+        # Optional persistent response cache (see f5_cache.py) answering repeat requests locally
+        self.response_cache = response_cache
+
+        # Responses fetched ahead by prefetch(), each handed out once by get_json
+        self.prefetched = {}
+
+        # Executor for background fetches (see submit_fetch); only set while the report is collected
+        self.fetch_executor = None
+
+        # Monitor mode only needs the client, not the one-shot report
+        if not run_report:
+            return
 
         # Automatically generate report upon initialization
         try:
-            logger.info("Fetching virtual server data...")
-            vs_data, summary_counts = process_virtual_servers(self)
-            
-            logger.info("Fetching pool data...")
-            pool_data = process_pools(self, summary_counts)
-            
-            logger.info("Fetching node data...")
-            node_data = process_nodes(self, summary_counts)
-            
+            if use_async:
+                logger.info("Prefetching virtual server, pool and node collections...")
+                with self.metrics.phase('prefetch'):
+                    self.prefetch(prefetch_endpoints(self))
+
+            logger.info("Fetching virtual server, pool and node data...")
+            vs_data, pool_data, node_data, summary_counts = self.collect()
+
             # Generate report
             logger.info("Generating report...")
-            report_data = generate_report(vs_data, pool_data, node_data)
-            
+            with self.metrics.phase('join'):
+                report_data = generate_report(vs_data, pool_data, node_data)
+
             # Generate output filename prefix
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             f5_hostname = self.F5_HOST.replace("https://", "").replace("http://", "")
             output_prefix = f"{f5_hostname}_{timestamp}_f5_report"
-            
-            # Generate Excel report
-            excel_filename = generate_excel_report(report_data, summary_counts, output_prefix, pool_data)
-            logger.info(f"Report generated in: {os.path.abspath(os.path.dirname(excel_filename))}")
+
+            # Optional fleet-wide query index (see f5_fleet_index.py)
+            if fleet_index is not None:
+                with self.metrics.phase('index'):
+                    fleet_index.replace_device(self.F5_HOST, vs_data, pool_data, node_data)
+                logger.info(f"Fleet index updated: {fleet_index.path}")
+
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                # Optional columnar snapshot of the collected tables, written while the Excel report is built
+                snapshot_future = None
+                if snapshot_format:
+                    snapshot_future = writer.submit(
+                        self.timed, 'snapshot', write_snapshot, snapshot_tables(vs_data, pool_data, node_data),
+                        os.path.join(snapshot_dir, output_prefix), snapshot_format, device=f5_hostname
+                    )
+
+                # Generate Excel report
+                with self.metrics.phase('excel'):
+                    excel_filename = generate_excel_report(report_data, summary_counts, output_prefix, pool_data)
+                logger.info(f"Report generated in: {os.path.abspath(os.path.dirname(excel_filename))}")
+                self.log_request_timings()
+
+                if snapshot_future is not None:
+                    logger.info(f"Snapshot written: {', '.join(snapshot_future.result())}")
+
+            self.metrics.count('virtual', len(vs_data))
+            self.metrics.count('pool', len(pool_data))
+            self.metrics.count('member', sum(len(pool.members) for pool in pool_data.values()))
+            self.metrics.count('node', len(node_data))
+            self.metrics.count('report_row', len(report_data))
+            phases = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.metrics.phases.items())
+            logger.info(f"Phases: {phases}")
+            if metrics_file:
+                self.metrics.write(metrics_file)
+                logger.info(f"Metrics written: {metrics_file}")
             
             # Print summary
             print("\nSummary of F5 Components:")
@@ -111,7 +201,7 @@ class F5Config:
                 except (ValueError, TypeError):
                     return 0
             
-            print(f"Total pools with members: {sum(1 for item in report_data if safe_int(item.get('active_members', 0)) > 0)}")
+            print(f"Total pools with members: {sum(1 for item in report_data if safe_int(item.active_members) > 0)}")
             print(f"Total pools: {len(pool_data)}")
             print(f"Total nodes: {len(node_data)}")
             
@@ -121,16 +211,202 @@ class F5Config:
             logger.error(traceback.format_exc())
             raise
 
+    def timed(self, phase, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) and add its duration to a metrics phase."""
+        with self.metrics.phase(phase):
+            return fn(*args, **kwargs)
+
+    def collect(self):
+        """Fetch and parse virtual servers, pools and nodes as one pipeline.
+
+        The three collections are processed on their own threads, and each
+        /stats response is fetched and indexed on the fetch executor while
+        the matching config pages stream in, so parsing overlaps the network
+        waits and the whole step takes about as long as the slowest
+        collection. Returns (vs_data, pool_data, node_data, summary_counts).
+        """
+        summary_counts = new_summary_counts()
+        with self.metrics.phase('fetch'), \
+                ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix='f5-fetch') as fetch_executor, \
+                ThreadPoolExecutor(max_workers=3, thread_name_prefix='f5-collect') as collectors:
+            self.fetch_executor = fetch_executor
+            try:
+                # process_pools and process_nodes only touch their own counter
+                vs_future = collectors.submit(self.timed, 'virtual', process_virtual_servers, self)
+                pool_future = collectors.submit(self.timed, 'pool', process_pools, self, summary_counts)
+                node_future = collectors.submit(self.timed, 'node', process_nodes, self, summary_counts)
+                vs_data, vs_counts = vs_future.result()
+                pool_data = pool_future.result()
+                node_data = node_future.result()
+            finally:
+                self.fetch_executor = None
+        summary_counts['virtual'] = vs_counts['virtual']
+        return vs_data, pool_data, node_data, summary_counts
+
     def get_json(self, endpoint):
         """Get data from F5 API endpoint."""
+        prefetched = self.prefetched.pop(endpoint, None)
+        if prefetched is not None:
+            return prefetched
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.F5_HOST, endpoint)
+            if cached is not None:
+                return cached
         url = f"{self.F5_HOST}{endpoint}"
+        start = time.perf_counter()
+        nbytes = 0
+        decode_seconds = 0.0
+        failed = False
         try:
             resp = self.session.get(url)
             resp.raise_for_status()
-            return resp.json()
+            nbytes = len(resp.content)
+            decode_start = time.perf_counter()
+            data = decode_json(resp)
+            decode_seconds = time.perf_counter() - decode_start
+            if self.response_cache is not None:
+                self.response_cache.put(self.F5_HOST, endpoint, resp.content)
+            return data
         except Exception as e:
+            failed = True
             logger.error(f"Failed to get data from {endpoint}: {str(e)}")
             return None
+        finally:
+            elapsed = time.perf_counter() - start
+            self.request_timings.append((endpoint, elapsed))
+            self.metrics.record_request(endpoint, elapsed, nbytes, decode_seconds, failed)
+
+    def iter_pages(self, endpoint):
+        """Yield the pages of a collection one at a time using $top/$skip.
+
+        Follows the nextLink returned by the device until the last page, so
+        only one page of the collection is held in memory at a time. Stops
+        without yielding if the first page cannot be fetched; raises
+        IncompleteCollectionError if a later one fails, so a partial
+        collection is never taken for the whole one.
+        """
+        endpoint = self.first_page(endpoint)
+        first = True
+        while endpoint:
+            page = self.get_json(endpoint)
+            if page is None:
+                if first:
+                    return
+                raise IncompleteCollectionError(f"Failed to get page {endpoint}, collection is incomplete")
+            first = False
+            yield page
+            endpoint = next_page_endpoint(page)
+
+    def first_page(self, endpoint):
+        """Return the endpoint of the first $top/$skip page of a collection."""
+        separator = '&' if '?' in endpoint else '?'
+        return f"{endpoint}{separator}$top={self.page_size}&$skip=0"
+
+    def prefetch(self, endpoints):
+        """Fetch endpoints (and their further pages) concurrently with the asyncio client.
+
+        The responses are kept in memory and handed out once by get_json, so
+        the process_* functions read them without waiting on the device.
+        """
+        from f5_async_client import prefetch_device
+
+        start = time.perf_counter()
+        self.prefetched.update(prefetch_device(self.F5_HOST, self.USERNAME, self.PASSWORD, endpoints,
+                                               self.verify_ssl, self.max_workers, self.response_cache,
+                                               self.metrics, self.request_timings))
+        logger.info(f"Prefetched {len(self.prefetched)} responses concurrently in {time.perf_counter() - start:.2f}s")
+
+    def iter_collection(self, endpoint):
+        """Stream the items of a collection page by page.
+
+        Returns None if the first page cannot be fetched, otherwise an
+        iterator over all items of the collection that raises
+        IncompleteCollectionError if a later page fails.
+        """
+        pages = self.iter_pages(endpoint)
+        first = next(pages, None)
+        if first is None:
+            return None
+        return chain(first.get('items', []), (item for page in pages for item in page.get('items', [])))
+
+    def collect_config(self, endpoint, fields, kind):
+        """Return the items of a config collection, refetching only changed objects.
+
+        Without a config cache this streams the collection as iter_collection
+        does. With one, the collection is probed for fullPath, generation and
+        lastModifiedTime only; unchanged objects come from the cache and
+        changed or new ones are fetched individually (or the whole collection
+        again when more than INCREMENTAL_REFETCH_LIMIT changed). Returns None
+        if the collection cannot be fetched; a page failing part way through
+        raises IncompleteCollectionError before the cache is updated.
+        """
+        if self.config_cache is None:
+            return self.iter_collection(with_select(endpoint, fields))
+        fields = tuple(fields) + CHANGE_FIELDS
+        cached = self.config_cache.items(kind)
+
+        items = None
+        if cached and not self.full_refresh:
+            probe = self.iter_collection(with_select(endpoint, PROBE_FIELDS))
+            if probe is None:
+                return None
+            items = []
+            changed = []
+            for marker in probe:
+                item = cached.get(marker.get('fullPath', ''))
+                if item is not None and change_marker(item) == change_marker(marker):
+                    items.append(item)
+                else:
+                    changed.append((len(items), marker.get('fullPath', '')))
+                    items.append(item)
+            logger.info(f"{kind}: {len(changed)} of {len(items)} objects changed since the last run")
+            if len(changed) > INCREMENTAL_REFETCH_LIMIT:
+                items = None
+            elif changed:
+                def fetch(change):
+                    return change[0], self.get_json(with_select(item_endpoint(endpoint, change[1]), fields))
+                stale = []
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(changed))) as executor:
+                    for (position, item), (_, full_path) in zip(executor.map(fetch, changed), changed):
+                        if item is not None:
+                            items[position] = item
+                        elif items[position] is not None:
+                            stale.append(full_path)
+                        else:
+                            logger.warning(f"{kind}: could not fetch new object {full_path}, it is left out of the report")
+                # Objects that could not be refetched keep their cached copy, if any
+                if stale:
+                    logger.warning(f"{kind}: {len(stale)} changed objects could not be refetched, "
+                                   f"reporting their stale cached copy: {', '.join(stale)}")
+                items = [item for item in items if item is not None]
+
+        if items is None:
+            collection = self.iter_collection(with_select(endpoint, fields))
+            if collection is None:
+                return None
+            items = list(collection)
+        self.config_cache.update(kind, items)
+        self.config_cache.save()
+        return items
+
+    def log_request_timings(self):
+        """Log request count and latency distribution for the requests made so far."""
+        if self.response_cache is not None:
+            logger.info(f"Response cache: {self.response_cache.hits} hits, {self.response_cache.misses} misses")
+        logger.info(f"Throttle: {host_guard(self.F5_HOST).summary()}")
+        durations = sorted(elapsed for _, elapsed in self.request_timings)
+        if not durations:
+            return
+        count = len(durations)
+        p95 = durations[min(count - 1, int(count * 0.95))]
+        logger.info(
+            f"Requests: {count}, workers: {self.max_workers}, "
+            f"total {sum(durations):.2f}s, mean {sum(durations) / count:.3f}s, "
+            f"p95 {p95:.3f}s, max {durations[-1]:.3f}s"
+        )
+        slowest = sorted(self.request_timings, key=lambda t: t[1], reverse=True)[:5]
+        for endpoint, elapsed in slowest:
+            logger.debug(f"  {elapsed:.3f}s {endpoint}")
 
 def extract_name_from_path(path):
     """Extract the name from a path, handling different formats."""
@@ -171,30 +447,69 @@ def parse_destination(destination):
     
     return ip, port
 
+def config_endpoint(f5_config, endpoint, fields, kind):
+    """Return the first collection page collect_config will request for a config collection."""
+    if f5_config.config_cache is None:
+        return f5_config.first_page(with_select(endpoint, fields))
+    if f5_config.config_cache.items(kind) and not f5_config.full_refresh:
+        return f5_config.first_page(with_select(endpoint, PROBE_FIELDS))
+    return f5_config.first_page(with_select(endpoint, tuple(fields) + CHANGE_FIELDS))
+
+def prefetch_endpoints(f5_config):
+    """Return the six list/stats requests process_virtual_servers, process_pools and process_nodes start with."""
+    return list_stats_endpoints(
+        config_endpoint(f5_config, '/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS, 'virtual'),
+        f5_config.first_page(with_select(EXPANDED_POOL_ENDPOINT, POOL_FIELDS)),
+        config_endpoint(f5_config, '/mgmt/tm/ltm/node', NODE_FIELDS, 'node'))
+
+def new_summary_counts():
+    """Return empty per-kind availability counters."""
+    return {"virtual": Counter(), "pool": Counter(), "node": Counter()}
+
+def build_stats_map(stats_json):
+    """Map fullPath to the nested stats entries of a /stats response, using tmName.description."""
+    stats_map = {}
+    for entry in stats_json.get('entries', {}).values():
+        nested = entry.get('nestedStats', {}).get('entries', {})
+        tm_name = nested.get('tmName', {}).get('description', '')
+        if tm_name:
+            stats_map[tm_name] = nested
+    return stats_map
+
+def fetch_stats_map(f5_config, endpoint):
+    """Fetch a /stats collection and index it by fullPath; None if it cannot be fetched."""
+    stats = f5_config.get_json(endpoint)
+    return build_stats_map(stats) if stats else None
+
+def submit_fetch(f5_config, fn, *args):
+    """Start fn(*args) on the client's fetch executor and return its future.
+
+    Outside the pipelined report (monitor mode, say) there is no executor:
+    fn runs right away and the returned future is already done.
+    """
+    if f5_config.fetch_executor is not None:
+        return f5_config.fetch_executor.submit(fn, *args)
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
 def process_virtual_servers(f5_config):
     """Fetch and process virtual server information using robust data-driven mapping."""
     try:
-        virtuals = f5_config.get_json('/mgmt/tm/ltm/virtual')
-        vstats = f5_config.get_json('/mgmt/tm/ltm/virtual/stats')
-        if not virtuals or not vstats:
+        # The stats are fetched and indexed while the config pages stream in
+        stats_future = submit_fetch(f5_config, fetch_stats_map, f5_config, '/mgmt/tm/ltm/virtual/stats')
+        virtuals = f5_config.collect_config('/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS, 'virtual')
+        stats_map = stats_future.result()
+        if virtuals is None or stats_map is None:
             logger.error("Failed to get virtual server data or stats")
-            return [], {"virtual": Counter(), "pool": Counter(), "node": Counter()}
-        
-        # Build a map from fullPath to stats using tmName.description
-        stats_map = {}
-        for entry in vstats.get('entries', {}).values():
-            nested = entry.get('nestedStats', {}).get('entries', {})
-            tm_name = nested.get('tmName', {}).get('description', '')
-            if tm_name:
-                stats_map[tm_name] = nested
+            return [], new_summary_counts()
         
         vs_data = []
-        summary_counts = {
-            "virtual": Counter(),
-            "pool": Counter(),
-            "node": Counter()
-        }
-        for virtual in virtuals.get('items', []):
+        summary_counts = new_summary_counts()
+        for virtual in virtuals:
             try:
                 name = virtual.get('name', '')
                 fullPath = virtual.get('fullPath', '')
@@ -203,24 +518,23 @@ def process_virtual_servers(f5_config):
                 if not stats:
                     logger.warning(f"Could not get stats for virtual server: {name} ({fullPath})")
                     continue
-                vs_info = {
-                    'name': name,
-                    'fullPath': fullPath,
-                    'partition': partition,
-                    'description': virtual.get('description', ''),
-                    'destination_ip': '',
-                    'destination_port': '',
-                    'pool': virtual.get('pool', ''),
-                    'availabilityState': stats.get('status.availabilityState', {}).get('description', 'N/A'),
-                    'enabledState': stats.get('status.enabledState', {}).get('description', 'N/A'),
-                    'statusReason': stats.get('status.statusReason', {}).get('description', 'N/A')
-                }
-                summary_counts["virtual"][vs_info['availabilityState']] += 1
+                ip, port = '', ''
                 destination = virtual.get('destination', '')
                 if destination:
                     ip, port = parse_destination(destination)
-                    vs_info['destination_ip'] = ip
-                    vs_info['destination_port'] = port
+                vs_info = VirtualServer(
+                    name=name,
+                    fullPath=fullPath,
+                    partition=intern_state(partition),
+                    description=virtual.get('description', ''),
+                    destination_ip=ip,
+                    destination_port=port,
+                    pool=virtual.get('pool', ''),
+                    availabilityState=intern_state(stats.get('status.availabilityState', {}).get('description', 'N/A')),
+                    enabledState=intern_state(stats.get('status.enabledState', {}).get('description', 'N/A')),
+                    statusReason=intern_state(stats.get('status.statusReason', {}).get('description', 'N/A'))
+                )
+                summary_counts["virtual"][vs_info.availabilityState] += 1
                 vs_data.append(vs_info)
             except Exception as e:
                 logger.error(f"Error processing virtual server {name}: {str(e)}")
@@ -228,25 +542,82 @@ def process_virtual_servers(f5_config):
         return vs_data, summary_counts
     except Exception as e:
         logger.error(f"Error in process_virtual_servers: {str(e)}")
-        return [], {"virtual": Counter(), "pool": Counter(), "node": Counter()}
+        return [], new_summary_counts()
+
+def stream_pools_expanded(f5_config):
+    """Paged counterpart of f5_session.get_pools_expanded.
+
+    Returns (pools, expanded) where pools streams the pool items page by page
+    (None on failure); whether members are inline is decided from the first page.
+    """
+    pages = f5_config.iter_pages(with_select(EXPANDED_POOL_ENDPOINT, POOL_FIELDS))
+    first = next(pages, None)
+    if first is None:
+        logger.info("expandSubcollections not supported, falling back to per-pool member requests")
+        return f5_config.iter_collection(with_select('/mgmt/tm/ltm/pool', POOL_FIELDS)), False
+    items = first.get('items', [])
+    expanded = members_inline(items)
+    if not expanded:
+        logger.info("expandSubcollections ignored by device, falling back to per-pool member requests")
+    pools = chain(items, (item for page in pages for item in page.get('items', [])))
+    return pools, expanded
+
+def member_record(member):
+    """Build the PoolMember stored in pool_data from a raw member item."""
+    return PoolMember(
+        name=member.get('name', ''),
+        address=member.get('address', ''),
+        port=member.get('port', ''),
+        state=intern_state(member.get('state', '')),
+        session=intern_state(member.get('session', ''))
+    )
+
+def members_link_to_endpoint(members_ref):
+    """Convert a membersReference.link into an endpoint relative to the F5 host."""
+    members_ref = members_ref.split('?')[0]
+    if members_ref.startswith('https://localhost'):
+        members_ref = members_ref.replace('https://localhost', '')
+    return members_ref
+
+def fetch_pool_members(f5_config, member_endpoints):
+    """Fetch pool members for many pools concurrently.
+
+    member_endpoints is a list of (pool fullPath, members endpoint) tuples.
+    Requests are spread over f5_config.max_workers threads sharing the client
+    session; the returned dict is keyed by pool fullPath and keeps the input order.
+    """
+    def fetch(item):
+        fullPath, endpoint = item
+        members = []
+        members_data = f5_config.get_json(with_select(endpoint, MEMBER_FIELDS))
+        if members_data and 'items' in members_data:
+            members = [member_record(member) for member in members_data['items']]
+        return fullPath, members
+
+    if not member_endpoints:
+        return {}
+    workers = min(f5_config.max_workers, len(member_endpoints))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # map() yields results in submission order, so the merge is deterministic
+        results = dict(executor.map(fetch, member_endpoints))
+    logger.info(f"Fetched members for {len(member_endpoints)} pools with {workers} workers in {time.perf_counter() - start:.2f}s")
+    return results
 
 def process_pools(f5_config, summary_counts):
-    """Fetch and process pool information, always fetching members live from membersReference.link, and mapping status by fullPath/tmName.description only."""
+    """Fetch and process pool information, taking members inline from an expanded pool collection (or live from membersReference.link on older devices), and mapping status by fullPath/tmName.description only."""
     try:
-        pools = f5_config.get_json('/mgmt/tm/ltm/pool')
-        pstats = f5_config.get_json('/mgmt/tm/ltm/pool/stats')
-        if not pools or not pstats:
+        # Pools are not served from the config cache: member state/session
+        # carry monitor status, and members arrive inline with the pools
+        stats_future = submit_fetch(f5_config, fetch_stats_map, f5_config, '/mgmt/tm/ltm/pool/stats')
+        pools, expanded = stream_pools_expanded(f5_config)
+        stats_map = stats_future.result()
+        if pools is None or stats_map is None:
             logger.error("Failed to get pool data or stats")
             return {}
-        # Build a map from fullPath to stats using tmName.description
-        stats_map = {}
-        for entry in pstats.get('entries', {}).values():
-            nested = entry.get('nestedStats', {}).get('entries', {})
-            tm_name = nested.get('tmName', {}).get('description', '')
-            if tm_name:
-                stats_map[tm_name] = nested
         pool_data = {}
-        for pool in pools.get('items', []):
+        member_endpoints = []
+        for pool in pools:
             try:
                 fullPath = pool.get('fullPath', '')
                 name = pool.get('name', '')
@@ -255,38 +626,30 @@ def process_pools(f5_config, summary_counts):
                 if not stats:
                     logger.warning(f"Could not get stats for pool: {name} ({fullPath})")
                     continue
-                availability_state = stats.get('status.availabilityState', {}).get('description', 'N/A')
+                availability_state = intern_state(stats.get('status.availabilityState', {}).get('description', 'N/A'))
                 summary_counts["pool"][availability_state] += 1
-                pool_data[fullPath] = {
-                    'name': name,
-                    'partition': partition,
-                    'monitor': pool.get('monitor', ''),
-                    'availabilityState': availability_state,
-                    'enabledState': stats.get('status.enabledState', {}).get('description', 'N/A'),
-                    'statusReason': stats.get('status.statusReason', {}).get('description', 'N/A'),
-                    'activeMemberCount': stats.get('activeMemberCnt', {}).get('value', 0),
-                    'totalMemberCount': stats.get('memberCnt', {}).get('value', 0),
-                    'members': []
-                }
-                # Always fetch members live from membersReference.link
-                members_ref = pool.get('membersReference', {}).get('link')
-                if members_ref:
-                    members_ref = members_ref.split('?')[0]
-                    if members_ref.startswith('https://localhost'):
-                        members_ref = members_ref.replace('https://localhost', '')
-                    members_data = f5_config.get_json(members_ref)
-                    if members_data and 'items' in members_data:
-                        for member in members_data['items']:
-                            pool_data[fullPath]['members'].append({
-                                'name': member.get('name', ''),
-                                'address': member.get('address', ''),
-                                'port': member.get('port', ''),
-                                'state': member.get('state', ''),
-                                'session': member.get('session', '')
-                            })
+                pool_data[fullPath] = Pool(
+                    fullPath=fullPath,
+                    name=name,
+                    partition=intern_state(partition),
+                    monitor=intern_state(pool.get('monitor', '')),
+                    availabilityState=availability_state,
+                    enabledState=intern_state(stats.get('status.enabledState', {}).get('description', 'N/A')),
+                    statusReason=intern_state(stats.get('status.statusReason', {}).get('description', 'N/A')),
+                    activeMemberCount=stats.get('activeMemberCnt', {}).get('value', 0),
+                    totalMemberCount=stats.get('memberCnt', {}).get('value', 0)
+                )
+                members_ref = pool.get('membersReference', {})
+                if expanded:
+                    pool_data[fullPath].members = [member_record(member) for member in members_ref.get('items', [])]
+                elif members_ref.get('link'):
+                    # Fetch members live from membersReference.link
+                    member_endpoints.append((fullPath, members_link_to_endpoint(members_ref['link'])))
             except Exception as e:
                 logger.error(f"Error processing pool {name}: {str(e)}")
                 continue
+        for fullPath, members in fetch_pool_members(f5_config, member_endpoints).items():
+            pool_data[fullPath].members = members
         return pool_data
     except Exception as e:
         logger.error(f"Error in process_pools: {str(e)}")
@@ -295,20 +658,14 @@ def process_pools(f5_config, summary_counts):
 def process_nodes(f5_config, summary_counts):
     """Fetch and process node information using robust data-driven mapping."""
     try:
-        nodes = f5_config.get_json('/mgmt/tm/ltm/node')
-        nstats = f5_config.get_json('/mgmt/tm/ltm/node/stats')
-        if not nodes or not nstats:
+        stats_future = submit_fetch(f5_config, fetch_stats_map, f5_config, '/mgmt/tm/ltm/node/stats')
+        nodes = f5_config.collect_config('/mgmt/tm/ltm/node', NODE_FIELDS, 'node')
+        stats_map = stats_future.result()
+        if nodes is None or stats_map is None:
             logger.error("Failed to get node data or stats")
             return {}
-        # Build a map from fullPath to stats using tmName.description
-        stats_map = {}
-        for entry in nstats.get('entries', {}).values():
-            nested = entry.get('nestedStats', {}).get('entries', {})
-            tm_name = nested.get('tmName', {}).get('description', '')
-            if tm_name:
-                stats_map[tm_name] = nested
         node_data = {}
-        for node in nodes.get('items', []):
+        for node in nodes:
             try:
                 name = node.get('name', '')
                 address = node.get('address', '')
@@ -318,16 +675,17 @@ def process_nodes(f5_config, summary_counts):
                 if not stats:
                     logger.warning(f"Could not get stats for node: {name} ({fullPath})")
                     continue
-                availability_state = stats.get('status.availabilityState', {}).get('description', 'N/A')
+                availability_state = intern_state(stats.get('status.availabilityState', {}).get('description', 'N/A'))
                 summary_counts["node"][availability_state] += 1
-                node_data[address] = {
-                    'name': name,
-                    'fullPath': fullPath,
-                    'partition': partition,
-                    'availabilityState': availability_state,
-                    'enabledState': stats.get('status.enabledState', {}).get('description', 'N/A'),
-                    'statusReason': stats.get('status.statusReason', {}).get('description', 'N/A')
-                }
+                node_data[address] = Node(
+                    address=address,
+                    name=name,
+                    fullPath=fullPath,
+                    partition=intern_state(partition),
+                    availabilityState=availability_state,
+                    enabledState=intern_state(stats.get('status.enabledState', {}).get('description', 'N/A')),
+                    statusReason=intern_state(stats.get('status.statusReason', {}).get('description', 'N/A'))
+                )
             except Exception as e:
                 logger.error(f"Error processing node {name}: {str(e)}")
                 continue
@@ -336,224 +694,291 @@ def process_nodes(f5_config, summary_counts):
         logger.error(f"Error in process_nodes: {str(e)}")
         return {}
 
+def add_report_styles(book):
+    """Register the shared named styles used by the report sheets."""
+    def fill(color):
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    book.add_named_style(NamedStyle(
+        name='f5_heading',
+        fill=fill("C6EFCE"),
+        font=Font(color="FFFFFF", bold=True, size=14),  # White color, bold, size 14
+        alignment=Alignment(horizontal='center', vertical='center')
+    ))
+    thin = Side(style='thin')
+    book.add_named_style(NamedStyle(
+        name='f5_header',
+        font=Font(bold=True),
+        border=Border(left=thin, right=thin, top=thin, bottom=thin),
+        alignment=Alignment(horizontal='center', vertical='top')
+    ))
+    book.add_named_style(NamedStyle(name='f5_green', fill=fill("C6EFCE")))
+    book.add_named_style(NamedStyle(name='f5_yellow', fill=fill("FFEB9C")))
+    book.add_named_style(NamedStyle(name='f5_red', fill=fill("FFC7CE")))
+    book.add_named_style(NamedStyle(name='f5_blue', fill=fill("BDD7EE")))
+
+def styled_row(ws, values, styles):
+    """Build a write-only row whose cells use the given named styles."""
+    row = []
+    for value, style in zip(values, styles):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        row.append(cell)
+    return row
+
 def generate_excel_report(report_data, summary_counts, output_prefix, pool_data):
-    """Generate Excel report with summary and details."""
+    """Generate Excel report with summary and details.
+
+    Uses an openpyxl write-only workbook: rows are streamed to disk as they
+    are appended and cells share named styles, so memory stays flat and the
+    time is linear in the number of member rows.
+    """
     try:
-        # Create summary data for DataFrame
-        summary_data = []
-        for k, counts in summary_counts.items():
-            summary_data.append({
-                'Type': k.capitalize(),
-                'Available': counts.get("available", 0),
-                'Offline': counts.get("offline", 0),
-                'Online': counts.get("online", 0),
-                'Unknown': counts.get("unknown", 0),
-                'Total': sum(counts.values())
-            })
-        
-        # Create DataFrame
-        summary_df = pd.DataFrame(summary_data)
-        
         # Generate output filename
         excel_filename = f"{output_prefix}.xlsx"
-        
-        # Write DataFrame to Excel using ExcelWriter
-        with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-            # Write summary data
-            summary_df.to_excel(writer, sheet_name='Summary', startrow=1, startcol=0, index=False)
-            
-            # Get the workbook and worksheet
-            book = writer.book
-            ws = book['Summary']
-            
-            # Define color fills
-            green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-            yellow_fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")
-            red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-            blue_fill = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
-            
-            # Add F5 hostname as heading
-            f5_hostname = output_prefix.split('_')[0]  # Extract hostname from output_prefix
-            ws['A1'] = f5_hostname
-            ws.merge_cells('A1:F1')  # Merge cells from A1 to F1
-            
-            # Format the heading
-            heading_cell = ws['A1']
-            heading_cell.fill = green_fill
-            heading_cell.font = Font(color="FFFFFF", bold=True, size=14)  # White color, bold, size 14
-            heading_cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Apply colors to the summary sheet
-            for row in range(3, len(summary_data) + 3):  # Start from row 3 (after heading and headers)
-                for col in range(1, 7):  # Columns A through F
-                    cell = ws.cell(row=row, column=col)
-                    if col == 1:  # Type column
-                        cell.fill = blue_fill
-                    elif col == 2:  # Available column
-                        cell.fill = green_fill
-                    elif col == 3:  # Offline column
-                        cell.fill = red_fill
-                    elif col == 4:  # Online column
-                        cell.fill = green_fill
-                    elif col == 5:  # Unknown column
-                        cell.fill = yellow_fill
-                    elif col == 6:  # Total column
-                        cell.fill = blue_fill
-            
-            # Create List sheet
-            list_sheet = book.create_sheet("List")
-            
-            # Add list headers with hierarchical structure
-            headers = [
+
+        book = Workbook(write_only=True)
+        add_report_styles(book)
+
+        # Summary sheet
+        ws = book.create_sheet("Summary")
+
+        # Add F5 hostname as heading, merged from A1 to F1
+        f5_hostname = output_prefix.split('_')[0]  # Extract hostname from output_prefix
+        heading = WriteOnlyCell(ws, value=f5_hostname)
+        heading.style = 'f5_heading'
+        ws.append([heading])
+        ws.merged_cells.add('A1:F1')
+
+        summary_headers = ['Type', 'Available', 'Offline', 'Online', 'Unknown', 'Total']
+        ws.append(styled_row(ws, summary_headers, ['f5_header'] * len(summary_headers)))
+
+        # Type and Total blue, Available/Online green, Offline red, Unknown yellow
+        summary_styles = ['f5_blue', 'f5_green', 'f5_red', 'f5_green', 'f5_yellow', 'f5_blue']
+        for k, counts in summary_counts.items():
+            ws.append(styled_row(ws, [
+                k.capitalize(),
+                counts.get("available", 0),
+                counts.get("offline", 0),
+                counts.get("online", 0),
+                counts.get("unknown", 0),
+                sum(counts.values())
+            ], summary_styles))
+
+        # Create List sheet
+        list_sheet = book.create_sheet("List")
+
+        # Add list headers with hierarchical structure
+        headers = [
+            # Virtual Server Information
+            "Virtual Server", "VS Description", "VS Destination", "VS Service Port",
+            "VS Status", "VS Status Reason",
+            # Pool Information
+            "Pool Name", "Pool Status", "Pool Status Reason",
+            "Pool Active Members", "Pool Total Members",
+            # Member Information
+            "Member Name", "Member Address", "Member Port",
+            "Member State", "Member Session"
+        ]
+        list_sheet.append(headers)
+
+        # Add list data with hierarchical structure
+        for data in report_data:
+            pool_members = []
+            if data.pool in pool_data:
+                pool_members = pool_data[data.pool].members
+
+            vs_and_pool = [
                 # Virtual Server Information
-                "Virtual Server", "VS Description", "VS Destination", "VS Service Port",
-                "VS Status", "VS Status Reason",
+                data.name,
+                data.description,
+                f"{data.destination_ip}:{data.destination_port}" if data.destination_ip else '',
+                data.destination_port,
+                data.vs_availabilityState,
+                data.vs_statusReason,
                 # Pool Information
-                "Pool Name", "Pool Status", "Pool Status Reason",
-                "Pool Active Members", "Pool Total Members",
-                # Member Information
-                "Member Name", "Member Address", "Member Port",
-                "Member State", "Member Session"
+                data.pool_name,
+                data.pool_availabilityState,
+                data.pool_statusReason,
+                data.active_members,
+                data.total_members
             ]
-            list_sheet.append(headers)
-            
-            # Add list data with hierarchical structure
-            for data in report_data:
-                pool_info = data.get('pool', '')
-                pool_members = []
-                if pool_info in pool_data:
-                    pool_members = pool_data[pool_info].get('members', [])
-                
-                # If there are no pool members, add one row with blank values
-                if not pool_members:
-                    row = [
-                        # Virtual Server Information
-                        data['name'],
-                        data['description'],
-                        f"{data['destination_ip']}:{data['destination_port']}" if data['destination_ip'] else '',
-                        data['destination_port'],
-                        data['vs_availabilityState'],
-                        data['vs_statusReason'],
-                        # Pool Information
-                        data['pool_name'],
-                        data['pool_availabilityState'],
-                        data['pool_statusReason'],
-                        data.get('active_members', ''),
-                        data.get('total_members', ''),
-                        # Member Information
-                        '',  # Member Name
-                        '',  # Member Address
-                        '',  # Member Port
-                        '',  # Member State
-                        ''   # Member Session
-                    ]
-                    list_sheet.append(row)
-                else:
-                    # Add a row for each pool member
-                    for member in pool_members:
-                        member_address = member.get('address', '')
-                        # Remove route domain if present
-                        if '%' in member_address:
-                            member_address = member_address.split('%')[0]
-                        
-                        row = [
-                            # Virtual Server Information
-                            data['name'],
-                            data['description'],
-                            f"{data['destination_ip']}:{data['destination_port']}" if data['destination_ip'] else '',
-                            data['destination_port'],
-                            data['vs_availabilityState'],
-                            data['vs_statusReason'],
-                            # Pool Information
-                            data['pool_name'],
-                            data['pool_availabilityState'],
-                            data['pool_statusReason'],
-                            data.get('active_members', ''),
-                            data.get('total_members', ''),
-                            # Member Information
-                            member.get('name', ''),
-                            member_address,  # Cleaned member address
-                            member.get('port', ''),
-                            member.get('state', ''),
-                            member.get('session', '')
-                        ]
-                        list_sheet.append(row)
-            
-            # Save the workbook
-            writer.save()
-        
+
+            # If there are no pool members, add one row with blank member values
+            if not pool_members:
+                list_sheet.append(vs_and_pool + ['', '', '', '', ''])
+                continue
+
+            # Add a row for each pool member
+            for member in pool_members:
+                member_address = member.address
+                # Remove route domain if present
+                if '%' in member_address:
+                    member_address = member_address.split('%')[0]
+
+                list_sheet.append(vs_and_pool + [
+                    # Member Information
+                    member.name,
+                    member_address,  # Cleaned member address
+                    member.port,
+                    member.state,
+                    member.session
+                ])
+
+        # Save the workbook
+        book.save(excel_filename)
+
         logger.info(f"Excel report generated: {excel_filename}")
         return excel_filename
-        
+
     except Exception as e:
         logger.error(f"Error generating Excel report: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
         raise
 
+def snapshot_tables(vs_data, pool_data, node_data):
+    """Flatten the collected data into virtual/pool/member/node tables for a columnar snapshot."""
+    pools = []
+    members = []
+    for fullPath, pool in pool_data.items():
+        pools.append(record_dict(pool, exclude=('members',)))
+        for member in pool.members:
+            members.append({'pool': fullPath, **record_dict(member)})
+    virtuals = [record_dict(vs) for vs in vs_data]
+    nodes = [record_dict(node) for node in node_data.values()]
+    return {'virtual': virtuals, 'pool': pools, 'member': members, 'node': nodes}
+
+# /stats endpoint polled for each object kind in monitor mode
+STATUS_ENDPOINTS = (
+    ('virtual', '/mgmt/tm/ltm/virtual/stats'),
+    ('pool', '/mgmt/tm/ltm/pool/stats'),
+    ('node', '/mgmt/tm/ltm/node/stats'),
+)
+STATUS_FIELDS = ('availabilityState', 'enabledState', 'statusReason')
+
+def status_baseline(vs_data, pool_data, node_data):
+    """Build the initial {kind: {fullPath: status}} snapshot from the processed report data."""
+    def status(item):
+        return {field: getattr(item, field) for field in STATUS_FIELDS}
+    return {
+        'virtual': {vs.fullPath: status(vs) for vs in vs_data},
+        'pool': {fullPath: status(pool) for fullPath, pool in pool_data.items()},
+        'node': {node.fullPath: status(node) for node in node_data.values()}
+    }
+
+def collect_status(f5_config):
+    """Poll the three /stats endpoints and return {kind: {fullPath: status}}.
+
+    Kinds whose endpoint could not be fetched are left out, so a failed poll
+    is not reported as every object disappearing.
+    """
+    snapshot = {}
+    for kind, endpoint in STATUS_ENDPOINTS:
+        stats = f5_config.get_json(endpoint)
+        if not stats:
+            logger.warning(f"Skipping {kind} status this cycle, {endpoint} could not be fetched")
+            continue
+        states = {}
+        for entry in stats.get('entries', {}).values():
+            nested = entry.get('nestedStats', {}).get('entries', {})
+            tm_name = nested.get('tmName', {}).get('description', '')
+            if tm_name:
+                states[tm_name] = {
+                    field: nested.get(f'status.{field}', {}).get('description', 'N/A') for field in STATUS_FIELDS
+                }
+        snapshot[kind] = states
+    return snapshot
+
+def status_transitions(previous, current):
+    """Yield one event per object whose status changed, appeared or disappeared between two snapshots."""
+    for kind, states in current.items():
+        before = previous.get(kind)
+        if before is None:
+            continue
+        for fullPath, state in states.items():
+            old = before.get(fullPath)
+            if old != state:
+                yield {'kind': kind, 'fullPath': fullPath, 'from': old, 'to': state}
+        for fullPath in before.keys() - states.keys():
+            yield {'kind': kind, 'fullPath': fullPath, 'from': before[fullPath], 'to': None}
+
+def monitor(f5_config, interval, output=sys.stdout, cycles=None):
+    """Poll object status every interval seconds and write state transitions as JSON lines.
+
+    The first snapshot comes from process_virtual_servers/process_pools/
+    process_nodes; afterwards only the three /stats endpoints are polled and
+    the previous snapshot is kept in memory. Runs until interrupted, or for
+    the given number of cycles.
+    """
+    device = f5_config.F5_HOST.replace("https://", "").replace("http://", "")
+    vs_data, summary_counts = process_virtual_servers(f5_config)
+    pool_data = process_pools(f5_config, summary_counts)
+    node_data = process_nodes(f5_config, summary_counts)
+    previous = status_baseline(vs_data, pool_data, node_data)
+    logger.info(f"Monitoring {sum(len(states) for states in previous.values())} objects on {device} every {interval}s")
+
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        cycle += 1
+        started = time.monotonic()
+        # Keep request timings from growing without bound in a long-running monitor
+        f5_config.request_timings.clear()
+        current = collect_status(f5_config)
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        for event in status_transitions(previous, current):
+            output.write(json.dumps({'time': timestamp, 'device': device, **event}) + '\n')
+        output.flush()
+        previous.update(current)
+        if cycles is None or cycle < cycles:
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+
 def generate_report(vs_data, pool_data, node_data):
-    """Generate combined report data."""
+    """Generate combined report data as ReportRow records."""
     report_data = []
     
     for vs in vs_data:
-        pool_path = vs.get('pool', '')
-        pool_info = pool_data.get(pool_path, {})
+        pool_path = vs.pool
+        pool_info = pool_data.get(pool_path)
         
-        # Get node information for pool members
-        node_names = []
-        node_addresses = []
-        node_availability_states = []
-        node_enabled_states = []
-        node_status_reasons = []
+        # Get member information for pool members that have a known node
         member_states = []
         member_sessions = []
         
-        for member in pool_info.get('members', []):
-            member_address = member.get('address', '')
-            node_info = node_data.get(member_address, {})
-            
-            if node_info:
-                node_names.append(node_info['name'])
-                node_addresses.append(member_address)
-                node_availability_states.append(node_info['availabilityState'])
-                node_enabled_states.append(node_info['enabledState'])
-                node_status_reasons.append(node_info['statusReason'])
-                member_states.append(member.get('state', ''))
-                member_sessions.append(member.get('session', ''))
+        for member in (pool_info.members if pool_info else []):
+            if member.address in node_data:
+                member_states.append(member.state)
+                member_sessions.append(member.session)
         
-        report_entry = {
+        report_data.append(ReportRow(
             # Virtual server info
-            'name': vs['name'],
-            'fullPath': vs['fullPath'],
-            'description': vs['description'],
-            'destination_ip': vs['destination_ip'],
-            'destination_port': vs['destination_port'],
+            name=vs.name,
+            fullPath=vs.fullPath,
+            description=vs.description,
+            destination_ip=vs.destination_ip,
+            destination_port=vs.destination_port,
             
             # Virtual server status
-            'vs_availabilityState': vs['availabilityState'],
-            'vs_enabledState': vs['enabledState'],
-            'vs_statusReason': vs['statusReason'],
+            vs_availabilityState=vs.availabilityState,
+            vs_enabledState=vs.enabledState,
+            vs_statusReason=vs.statusReason,
             
             # Pool info
-            'pool': pool_path,
-            'pool_name': pool_info.get('name', ''),
-            'pool_monitor': pool_info.get('monitor', ''),
-            'active_members': pool_info.get('activeMemberCount', ''),
-            'total_members': pool_info.get('totalMemberCount', ''),
+            pool=pool_path,
+            pool_name=pool_info.name if pool_info else '',
+            pool_monitor=pool_info.monitor if pool_info else '',
+            active_members=pool_info.activeMemberCount if pool_info else '',
+            total_members=pool_info.totalMemberCount if pool_info else '',
             
             # Pool status
-            'pool_availabilityState': pool_info.get('availabilityState', ''),
-            'pool_enabledState': pool_info.get('enabledState', ''),
-            'pool_statusReason': pool_info.get('statusReason', ''),
-            
-            # Node information
+            pool_availabilityState=pool_info.availabilityState if pool_info else '',
+            pool_enabledState=pool_info.enabledState if pool_info else '',
+            pool_statusReason=pool_info.statusReason if pool_info else '',
             
             # Member information
-            'member_states': '; '.join(member_states) if member_states else '',
-            'member_sessions': '; '.join(member_sessions) if member_sessions else ''
-        }
-        
-        report_data.append(report_entry)
+            member_states='; '.join(member_states),
+            member_sessions='; '.join(member_sessions)
+        ))
     
     return report_data
 
@@ -563,61 +988,83 @@ def main():
     parser.add_argument('--username', required=True, help='F5 username')
     parser.add_argument('--password', required=True, help='F5 password')
     parser.add_argument('--verify-ssl', action='store_true', help='Verify SSL certificate')
-    
+    parser.add_argument('--response-cache', nargs='?', const=DEFAULT_CACHE_FILE, metavar='PATH',
+                        help=f'Serve repeat requests from a local SQLite response cache (default file: {DEFAULT_CACHE_FILE})')
+    parser.add_argument('--config-ttl', type=int, default=CONFIG_TTL,
+                        help=f'Seconds cached config responses stay valid (default: {CONFIG_TTL})')
+    parser.add_argument('--stats-ttl', type=int, default=STATS_TTL,
+                        help=f'Seconds cached /stats, pool member and expanded pool responses stay valid (default: {STATS_TTL})')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help=f'Size of the response cache before least recently used entries are evicted (default: {DEFAULT_MAX_BYTES // (1024 * 1024)})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_MEMBER_WORKERS,
+                        help=f'Concurrent pool member requests (default: {DEFAULT_MEMBER_WORKERS})')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'Items per page when streaming config collections (default: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Fetch the virtual/pool/node list and stats collections concurrently (requires aiohttp)')
+    parser.add_argument('--snapshot', choices=SNAPSHOT_FORMATS,
+                        help='Also write a columnar snapshot of the virtual/pool/member/node tables')
+    parser.add_argument('--snapshot-dir', default='.', help='Directory for snapshot files (default: current directory)')
+    parser.add_argument('--cache-dir', nargs='?', const=DEFAULT_CACHE_DIR, metavar='PATH',
+                        help=f'Keep a per-device config cache and only refetch changed objects (default directory: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--full-refresh', action='store_true',
+                        help='Ignore the config cache and refetch all config (the cache is rewritten)')
+    parser.add_argument('--monitor', type=float, metavar='SECONDS',
+                        help='Instead of a report, poll status every SECONDS and print state transitions as JSON lines')
+    parser.add_argument('--monitor-output', help='Append monitor events to this file instead of stdout')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Write a JSON summary of phase timings, endpoint latencies, bytes and object counts')
+    parser.add_argument('--profile', metavar='PATH', help='Run under cProfile and write the stats to PATH')
+    parser.add_argument('--fleet-index', nargs='?', const=DEFAULT_INDEX_FILE, metavar='PATH',
+                        help=f'Also record the collected objects in the fleet-wide query index (default file: {DEFAULT_INDEX_FILE})')
+
     args = parser.parse_args()
+
+    response_cache = None
+    if args.response_cache:
+        response_cache = ResponseCache(args.response_cache, args.config_ttl, args.stats_ttl,
+                                       args.cache_max_mb * 1024 * 1024)
     
+    if args.monitor:
+        # stdout carries the JSON lines, so console logging moves to stderr
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+                handler.setStream(sys.stderr)
+        f5_config = F5Config(args.host, args.username, args.password, args.verify_ssl, args.workers, args.page_size,
+                             cache_dir=args.cache_dir, full_refresh=args.full_refresh, run_report=False)
+        output = open(args.monitor_output, 'a') if args.monitor_output else sys.stdout
+        try:
+            monitor(f5_config, args.monitor, output)
+        except KeyboardInterrupt:
+            logger.info("Monitor stopped")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        return
+
+    profiler = None
+    if args.profile:
+        # Profiles the f5-collect/f5-fetch worker threads as well as this one
+        profiler = ThreadProfiler()
+        profiler.enable()
+
     try:
-        # Initialize F5 config
-        f5_config = F5Config(args.host, args.username, args.password, args.verify_ssl)
-        
-        # Fetch and process data
-        logger.info("Fetching virtual server data...")
-        vs_data, summary_counts = process_virtual_servers(f5_config)
-        
-        logger.info("Fetching pool data...")
-        pool_data = process_pools(f5_config, summary_counts)
-        
-        logger.info("Fetching node data...")
-        node_data = process_nodes(f5_config, summary_counts)
-        
-        # Generate report
-        logger.info("Generating report...")
-        report_data = generate_report(vs_data, pool_data, node_data)
-        
-        # Generate output filename prefix
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        f5_hostname = args.host.replace("https://", "").replace("http://", "")
-        output_prefix = f"{f5_hostname}_{timestamp}_f5_report"
-        
-        # Generate Excel report
-        excel_filename = generate_excel_report(report_data, summary_counts, output_prefix, pool_data)
-        logger.info(f"Report generated in: {os.path.abspath(os.path.dirname(excel_filename))}")
-        
-        # Print summary
-        print("\nSummary of F5 Components:")
-        print("-" * 50)
-        print("Virtual Servers:")
-        for status, count in summary_counts['virtual'].items():
-            print(f"  {status}: {count}")
-        
-        print("\nPools:")
-        for status, count in summary_counts['pool'].items():
-            print(f"  {status}: {count}")
-        
-        print("\nNodes:")
-        for status, count in summary_counts['node'].items():
-            print(f"  {status}: {count}")
-        
-        print(f"\nTotal virtual servers: {len(report_data)}")
-        print(f"Total pools with members: {sum(1 for item in report_data if item.get('active_members', 0) > 0)}")
-        print(f"Total pools: {len(pool_data)}")
-        print(f"Total nodes: {len(node_data)}")
-        
+        # The constructor collects through the pipeline (F5Config.collect),
+        # writes the report and prints the summary
+        F5Config(args.host, args.username, args.password, args.verify_ssl, args.workers, args.page_size,
+                 args.snapshot, args.snapshot_dir, args.cache_dir, args.full_refresh,
+                 response_cache, metrics_file=args.metrics, use_async=args.use_async,
+                 fleet_index=FleetIndex(args.fleet_index) if args.fleet_index else None)
     except Exception as e:
         logger.error(f"Error generating report: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            logger.info(f"Profile written: {args.profile} (view with: python -m pstats {args.profile})")
 
 if __name__ == "__main__":
     main() 
@@ -3,33 +3,37 @@
 Standalone script to generate a CSV report of F5 virtual servers with pool and node information.
 Exports only the 'List' data (as in the Excel report) to a CSV file with semicolon delimiter.
 """
-import requests
 import csv
 import argparse
 from datetime import datetime
-from requests.auth import HTTPBasicAuth
+from f5_session import (get_session_pool, with_select, decode_json, get_pools_expanded,
+                        VIRTUAL_FIELDS, POOL_FIELDS, MEMBER_FIELDS, NODE_FIELDS,
+                        PREFETCH_ENDPOINTS)
 from collections import Counter
 import os
 import json
 
 # --- F5 API Client and Data Processing ---
 class F5Config:
-    def __init__(self, host, username, password, verify_ssl=False):
+    def __init__(self, host, username, password, verify_ssl=False, prefetched=None):
         if not host.startswith('http'):
             self.F5_HOST = f"https://{host}"
         else:
             self.F5_HOST = host
         self.USERNAME = username
         self.PASSWORD = password
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.USERNAME, self.PASSWORD)
-        self.session.verify = verify_ssl
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Shared token-authenticated session (see f5_session.py)
+        self.session = get_session_pool(self.USERNAME, self.PASSWORD, verify_ssl).session(self.F5_HOST)
+        # Responses fetched ahead with --async (see f5_async_client.iter_fleet), each served once
+        self.prefetched = dict(prefetched or {})
     def get_json(self, endpoint):
+        prefetched = self.prefetched.pop(endpoint, None)
+        if prefetched is not None:
+            return prefetched
         url = f"{self.F5_HOST}{endpoint}"
         resp = self.session.get(url)
         resp.raise_for_status()
-        return resp.json()
+        return decode_json(resp)
 
 def parse_destination(destination):
     ip = ""
@@ -51,7 +55,7 @@ def parse_destination(destination):
     return ip, port
 
 def process_virtual_servers(f5_config):
-    virtuals = f5_config.get_json('/mgmt/tm/ltm/virtual')
+    virtuals = f5_config.get_json(with_select('/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS))
     vstats = f5_config.get_json('/mgmt/tm/ltm/virtual/stats')
     stats_map = {}
     for entry in vstats.get('entries', {}).values():
@@ -89,8 +93,24 @@ def process_virtual_servers(f5_config):
         vs_data.append(vs_info)
     return vs_data, summary_counts
 
+def get_pool_member_items(f5_config, pool, expanded):
+    """Return the raw member items of a pool, inline when expanded, otherwise from membersReference.link."""
+    members_ref = pool.get('membersReference', {})
+    if expanded:
+        return members_ref.get('items', [])
+    link = members_ref.get('link')
+    if not link:
+        return []
+    link = link.split('?')[0]
+    if link.startswith('https://localhost'):
+        link = link.replace('https://localhost', '')
+    members_data = f5_config.get_json(with_select(link, MEMBER_FIELDS))
+    if members_data and 'items' in members_data:
+        return members_data['items']
+    return []
+
 def process_pools(f5_config, summary_counts):
-    pools = f5_config.get_json('/mgmt/tm/ltm/pool')
+    pools, expanded = get_pools_expanded(f5_config, POOL_FIELDS)
     pstats = f5_config.get_json('/mgmt/tm/ltm/pool/stats')
     stats_map = {}
     for entry in pstats.get('entries', {}).values():
@@ -119,24 +139,17 @@ def process_pools(f5_config, summary_counts):
             'totalMemberCount': stats.get('memberCnt', {}).get('value', 0),
             'members': []
         }
-        members_ref = pool.get('membersReference', {}).get('link')
-        if members_ref:
-            members_ref = members_ref.split('?')[0]
-            if members_ref.startswith('https://localhost'):
-                members_ref = members_ref.replace('https://localhost', '')
-            members_data = f5_config.get_json(members_ref)
-            if members_data and 'items' in members_data:
-                for member in members_data['items']:
-                    pool_data[fullPath]['members'].append({
-                        'name': member.get('name', ''),
-                        'address': member.get('address', ''),
-                        'state': member.get('state', ''),
-                        'session': member.get('session', '')
-                    })
+        for member in get_pool_member_items(f5_config, pool, expanded):
+            pool_data[fullPath]['members'].append({
+                'name': member.get('name', ''),
+                'address': member.get('address', ''),
+                'state': member.get('state', ''),
+                'session': member.get('session', '')
+            })
     return pool_data
 
 def process_nodes(f5_config, summary_counts):
-    nodes = f5_config.get_json('/mgmt/tm/ltm/node')
+    nodes = f5_config.get_json(with_select('/mgmt/tm/ltm/node', NODE_FIELDS))
     nstats = f5_config.get_json('/mgmt/tm/ltm/node/stats')
     stats_map = {}
     for entry in nstats.get('entries', {}).values():
@@ -206,6 +219,10 @@ def main():
     parser = argparse.ArgumentParser(description='Export F5 List data to CSV')
     parser.add_argument('--verify-ssl', action='store_true', help='Verify SSL certificate')
     parser.add_argument('--output-dir', default='.', help='Directory to save CSV files')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Fetch the list/stats collections of several devices concurrently on one event loop (requires aiohttp)')
+    parser.add_argument('--async-devices', type=int, default=8,
+                        help='Devices fetched together with --async (default: 8)')
     args = parser.parse_args()
 
     username = os.environ.get('F5_USERNAME')
@@ -216,12 +233,23 @@ def main():
     with open('inventory.json', 'r') as f:
         devices = json.load(f)
 
+    targets = []
     for device in devices:
         host = device.get('mgmt_ip') or device.get('device')
         if not host:
             print(f"Skipping device with missing mgmt_ip or device field: {device}")
             continue
-        f5_config = F5Config(host, username, password, args.verify_ssl)
+        targets.append((device, host))
+
+    if args.use_async:
+        from f5_async_client import iter_fleet
+        fleet = iter_fleet([host for _, host in targets], username, password, PREFETCH_ENDPOINTS,
+                           args.async_devices, args.verify_ssl)
+    else:
+        fleet = ((host, None) for _, host in targets)
+
+    for (device, host), (_, prefetched) in zip(targets, fleet):
+        f5_config = F5Config(host, username, password, args.verify_ssl, prefetched)
         vs_data, summary_counts = process_virtual_servers(f5_config)
         pool_data = process_pools(f5_config, summary_counts)
         node_data = process_nodes(f5_config, summary_counts)
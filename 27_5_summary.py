@@ -3,11 +3,11 @@
 Standalone script to generate a CSV report of F5 virtual servers with pool and node information.
 Exports only the 'List' data (as in the Excel report) to a CSV file with semicolon delimiter.
 """
-import requests
 import csv
 import argparse
 from datetime import datetime
-from requests.auth import HTTPBasicAuth
+from f5_session import (get_session_pool, with_select, decode_json, get_pools_expanded,
+                        VIRTUAL_FIELDS, POOL_FIELDS, MEMBER_FIELDS, NODE_FIELDS)
 from collections import Counter
 import os
 import json
@@ -24,15 +24,13 @@ class F5Config:
             self.F5_HOST = host
         self.USERNAME = username
         self.PASSWORD = password
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.USERNAME, self.PASSWORD)
-        self.session.verify = verify_ssl
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Shared token-authenticated session (see f5_session.py)
+        self.session = get_session_pool(self.USERNAME, self.PASSWORD, verify_ssl).session(self.F5_HOST)
     def get_json(self, endpoint):
         url = f"{self.F5_HOST}{endpoint}"
         resp = self.session.get(url)
         resp.raise_for_status()
-        return resp.json()
+        return decode_json(resp)
 
 def parse_destination(destination):
     ip = ""
@@ -54,7 +52,7 @@ def parse_destination(destination):
     return ip, port
 
 def process_virtual_servers(f5_config):
-    virtuals = f5_config.get_json('/mgmt/tm/ltm/virtual')
+    virtuals = f5_config.get_json(with_select('/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS))
     vstats = f5_config.get_json('/mgmt/tm/ltm/virtual/stats')
     stats_map = {}
     for entry in vstats.get('entries', {}).values():
@@ -92,8 +90,24 @@ def process_virtual_servers(f5_config):
         vs_data.append(vs_info)
     return vs_data, summary_counts
 
+def get_pool_member_items(f5_config, pool, expanded):
+    """Return the raw member items of a pool, inline when expanded, otherwise from membersReference.link."""
+    members_ref = pool.get('membersReference', {})
+    if expanded:
+        return members_ref.get('items', [])
+    link = members_ref.get('link')
+    if not link:
+        return []
+    link = link.split('?')[0]
+    if link.startswith('https://localhost'):
+        link = link.replace('https://localhost', '')
+    members_data = f5_config.get_json(with_select(link, MEMBER_FIELDS))
+    if members_data and 'items' in members_data:
+        return members_data['items']
+    return []
+
 def process_pools(f5_config, summary_counts):
-    pools = f5_config.get_json('/mgmt/tm/ltm/pool')
+    pools, expanded = get_pools_expanded(f5_config, POOL_FIELDS)
     pstats = f5_config.get_json('/mgmt/tm/ltm/pool/stats')
     stats_map = {}
     for entry in pstats.get('entries', {}).values():
@@ -122,24 +136,17 @@ def process_pools(f5_config, summary_counts):
             'totalMemberCount': stats.get('memberCnt', {}).get('value', 0),
             'members': []
         }
-        members_ref = pool.get('membersReference', {}).get('link')
-        if members_ref:
-            members_ref = members_ref.split('?')[0]
-            if members_ref.startswith('https://localhost'):
-                members_ref = members_ref.replace('https://localhost', '')
-            members_data = f5_config.get_json(members_ref)
-            if members_data and 'items' in members_data:
-                for member in members_data['items']:
-                    pool_data[fullPath]['members'].append({
-                        'name': member.get('name', ''),
-                        'address': member.get('address', ''),
-                        'state': member.get('state', ''),
-                        'session': member.get('session', '')
-                    })
+        for member in get_pool_member_items(f5_config, pool, expanded):
+            pool_data[fullPath]['members'].append({
+                'name': member.get('name', ''),
+                'address': member.get('address', ''),
+                'state': member.get('state', ''),
+                'session': member.get('session', '')
+            })
     return pool_data
 
 def process_nodes(f5_config, summary_counts):
-    nodes = f5_config.get_json('/mgmt/tm/ltm/node')
+    nodes = f5_config.get_json(with_select('/mgmt/tm/ltm/node', NODE_FIELDS))
     nstats = f5_config.get_json('/mgmt/tm/ltm/node/stats')
     stats_map = {}
     for entry in nstats.get('entries', {}).values():
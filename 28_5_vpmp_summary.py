@@ -2,37 +2,51 @@
 """
 Standalone script to generate a CSV report of F5 virtual servers with pool and node information.
 Exports only the 'List' data (as in the Excel report) to a CSV file with semicolon delimiter.
+
+Rows are written to <output>.part as each device completes, optionally gzip
+compressed, and the file is renamed to <output> once every device is done.
+Progress is recorded in <output>.progress so an interrupted run can be
+continued with --resume --output-file <output>.
 """
-import requests
 import csv
 import argparse
 from datetime import datetime
-from requests.auth import HTTPBasicAuth
+from f5_session import (get_session_pool, with_select, decode_json, get_pools_expanded,
+                        VIRTUAL_FIELDS, POOL_FIELDS, MEMBER_FIELDS, NODE_FIELDS,
+                        PREFETCH_ENDPOINTS)
 from collections import Counter
 import os
 import json
+import gzip
+import io
 import urllib3
+import pandas as pd
+from f5_snapshot import write_snapshot, SNAPSHOT_FORMATS
+from f5_fleet_index import FleetIndex, DEFAULT_INDEX_FILE
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # --- F5 API Client and Data Processing ---
 class F5Config:
-    def __init__(self, host, username, password, verify_ssl=False):
+    def __init__(self, host, username, password, verify_ssl=False, prefetched=None):
         if not host.startswith('http'):
             self.F5_HOST = f"https://{host}"
         else:
             self.F5_HOST = host
         self.USERNAME = username
         self.PASSWORD = password
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.USERNAME, self.PASSWORD)
-        self.session.verify = verify_ssl
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Shared token-authenticated session (see f5_session.py)
+        self.session = get_session_pool(self.USERNAME, self.PASSWORD, verify_ssl).session(self.F5_HOST)
+        # Responses fetched ahead with --async (see f5_async_client.iter_fleet), each served once
+        self.prefetched = dict(prefetched or {})
     def get_json(self, endpoint):
+        prefetched = self.prefetched.pop(endpoint, None)
+        if prefetched is not None:
+            return prefetched
         url = f"{self.F5_HOST}{endpoint}"
         resp = self.session.get(url)
         resp.raise_for_status()
-        return resp.json()
+        return decode_json(resp)
 
 def parse_destination(destination):
     ip = ""
@@ -54,7 +68,7 @@ def parse_destination(destination):
     return ip, port
 
 def process_virtual_servers(f5_config):
-    virtuals = f5_config.get_json('/mgmt/tm/ltm/virtual')
+    virtuals = f5_config.get_json(with_select('/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS))
     vstats = f5_config.get_json('/mgmt/tm/ltm/virtual/stats')
     stats_map = {}
     for entry in vstats.get('entries', {}).values():
@@ -92,8 +106,24 @@ def process_virtual_servers(f5_config):
         vs_data.append(vs_info)
     return vs_data, summary_counts
 
+def get_pool_member_items(f5_config, pool, expanded):
+    """Return the raw member items of a pool, inline when expanded, otherwise from membersReference.link."""
+    members_ref = pool.get('membersReference', {})
+    if expanded:
+        return members_ref.get('items', [])
+    link = members_ref.get('link')
+    if not link:
+        return []
+    link = link.split('?')[0]
+    if link.startswith('https://localhost'):
+        link = link.replace('https://localhost', '')
+    members_data = f5_config.get_json(with_select(link, MEMBER_FIELDS))
+    if members_data and 'items' in members_data:
+        return members_data['items']
+    return []
+
 def process_pools(f5_config, summary_counts):
-    pools = f5_config.get_json('/mgmt/tm/ltm/pool')
+    pools, expanded = get_pools_expanded(f5_config, POOL_FIELDS)
     pstats = f5_config.get_json('/mgmt/tm/ltm/pool/stats')
     stats_map = {}
     for entry in pstats.get('entries', {}).values():
@@ -122,24 +152,17 @@ def process_pools(f5_config, summary_counts):
             'totalMemberCount': stats.get('memberCnt', {}).get('value', 0),
             'members': []
         }
-        members_ref = pool.get('membersReference', {}).get('link')
-        if members_ref:
-            members_ref = members_ref.split('?')[0]
-            if members_ref.startswith('https://localhost'):
-                members_ref = members_ref.replace('https://localhost', '')
-            members_data = f5_config.get_json(members_ref)
-            if members_data and 'items' in members_data:
-                for member in members_data['items']:
-                    pool_data[fullPath]['members'].append({
-                        'name': member.get('name', ''),
-                        'address': member.get('address', ''),
-                        'state': member.get('state', ''),
-                        'session': member.get('session', '')
-                    })
+        for member in get_pool_member_items(f5_config, pool, expanded):
+            pool_data[fullPath]['members'].append({
+                'name': member.get('name', ''),
+                'address': member.get('address', ''),
+                'state': member.get('state', ''),
+                'session': member.get('session', '')
+            })
     return pool_data
 
 def process_nodes(f5_config, summary_counts):
-    nodes = f5_config.get_json('/mgmt/tm/ltm/node')
+    nodes = f5_config.get_json(with_select('/mgmt/tm/ltm/node', NODE_FIELDS))
     nstats = f5_config.get_json('/mgmt/tm/ltm/node/stats')
     stats_map = {}
     for entry in nstats.get('entries', {}).values():
@@ -205,102 +228,199 @@ CSV_HEADERS = [
     "Node Status", "Node Status Reason", "Node Enabled State"
 ]
 
+def device_rows(device, f5_config, fleet_index=None):
+    """Yield the CSV rows for one device, recording its objects in fleet_index if given.
+
+    The index keys the device by the host it was collected from, as 23_5_summary does.
+    """
+    vs_data, summary_counts = process_virtual_servers(f5_config)
+    pool_data = process_pools(f5_config, summary_counts)
+    node_data = process_nodes(f5_config, summary_counts)
+    report_data = generate_report(vs_data, pool_data, node_data)
+    if fleet_index is not None:
+        fleet_index.replace_device(f5_config.F5_HOST, vs_data, pool_data, node_data,
+                                   device.get('dc', ''), device.get('tier', ''))
+
+    for data in report_data:
+        pool_info = data.get('pool', '')
+        pool_members = []
+        if pool_info in pool_data:
+            pool_members = pool_data[pool_info].get('members', [])
+        if not pool_members:
+            yield [
+                device.get('device', ''),
+                device.get('dc', ''),
+                device.get('tier', ''),
+                data['name'],
+                data['description'],
+                f"{data['destination_ip']}:{data['destination_port']}" if data['destination_ip'] else '',
+                data['destination_port'],
+                data['vs_availabilityState'],
+                data['vs_statusReason'],
+                data['pool_name'],
+                data['pool_availabilityState'],
+                data['pool_statusReason'],
+                data.get('active_members', ''),
+                data.get('total_members', ''),
+                '',  # Member Name
+                '',  # Member Address
+                '',  # Member State
+                '',  # Member Session
+                '',  # Node Status
+                '',  # Node Status Reason
+                ''   # Node Enabled State
+            ]
+        else:
+            for member in pool_members:
+                member_address = member.get('address', '')
+                node_info = node_data.get(member_address, {})
+                yield [
+                    device.get('device', ''),
+                    device.get('dc', ''),
+                    device.get('tier', ''),
+                    data['name'],
+                    data['description'],
+                    f"{data['destination_ip']}:{data['destination_port']}" if data['destination_ip'] else '',
+                    data['destination_port'],
+                    data['vs_availabilityState'],
+                    data['vs_statusReason'],
+                    data['pool_name'],
+                    data['pool_availabilityState'],
+                    data['pool_statusReason'],
+                    data.get('active_members', ''),
+                    data.get('total_members', ''),
+                    member.get('name', ''),
+                    member.get('address', ''),
+                    member.get('state', ''),
+                    member.get('session', ''),
+                    node_info.get('availabilityState', ''),
+                    node_info.get('statusReason', ''),
+                    node_info.get('enabledState', '')
+                ]
+
+def append_rows(part_file, rows, compress):
+    """Append rows to the partial output file and return its size afterwards.
+
+    Each call writes a complete gzip member when compressing, so the file is
+    a valid (multi-member) gzip stream after every device.
+    """
+    with open(part_file, 'ab') as raw:
+        stream = gzip.GzipFile(fileobj=raw, mode='wb') if compress else raw
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        writer = csv.writer(text, delimiter=';')
+        writer.writerows(rows)
+        text.flush()
+        text.detach()
+        if compress:
+            stream.close()
+        raw.flush()
+        os.fsync(raw.fileno())
+        return raw.tell()
+
+def load_progress(progress_file):
+    """Return the saved progress ({'completed': [...], 'offset': n}) or None."""
+    try:
+        with open(progress_file, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_progress(progress_file, progress):
+    """Write the progress file atomically."""
+    tmp_file = f"{progress_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(progress, f)
+    os.replace(tmp_file, progress_file)
+
 def main():
     parser = argparse.ArgumentParser(description='Export F5 List data to CSV')
     parser.add_argument('--verify-ssl', action='store_true', help='Verify SSL certificate')
     parser.add_argument('--output-dir', default='.', help='Directory to save CSV files')
+    parser.add_argument('--output-file', help='Output file name (default: timestamped f5vpmn_summary CSV)')
+    parser.add_argument('--gzip', action='store_true', help='Compress the CSV with gzip')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run of --output-file, skipping completed devices')
+    parser.add_argument('--snapshot', choices=SNAPSHOT_FORMATS,
+                        help='Also write a columnar snapshot of each device\'s rows to <output>_snapshot/')
+    parser.add_argument('--fleet-index', nargs='?', const=DEFAULT_INDEX_FILE, metavar='PATH',
+                        help=f'Also record each device\'s objects in the fleet-wide query index (default file: {DEFAULT_INDEX_FILE})')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Fetch the list/stats collections of several devices concurrently on one event loop (requires aiohttp)')
+    parser.add_argument('--async-devices', type=int, default=8,
+                        help='Devices fetched together with --async; rows are still written device by device (default: 8)')
     args = parser.parse_args()
 
     username = os.environ.get('API_USERNAME')
     password = os.environ.get('API_PASSWORD')
     if not username or not password:
         raise ValueError("API_USERNAME and API_PASSWORD environment variables must be set")
+    if args.resume and not args.output_file:
+        raise ValueError("--resume requires --output-file")
 
     with open('inventory.json', 'r') as f:
         devices = json.load(f)
 
-    all_rows = []
+    if args.output_file:
+        output_name = args.output_file
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_name = f"f5vpmn_summary{timestamp}.csv"
+    if args.gzip and not output_name.endswith('.gz'):
+        output_name += '.gz'
+    output_file = os.path.join(args.output_dir, output_name)
+    part_file = f"{output_file}.part"
+    progress_file = f"{output_file}.progress"
+    snapshot_dir = f"{output_file.rsplit('.csv', 1)[0]}_snapshot"
+
+    fleet_index = FleetIndex(args.fleet_index) if args.fleet_index else None
 
+    progress = load_progress(progress_file) if args.resume else None
+    if progress and os.path.exists(part_file):
+        # Drop rows from a device that was interrupted part way through
+        with open(part_file, 'r+b') as f:
+            f.truncate(progress['offset'])
+        print(f"Resuming {output_file}: {len(progress['completed'])} devices already exported")
+    else:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+        offset = append_rows(part_file, [CSV_HEADERS], args.gzip)
+        progress = {'completed': [], 'offset': offset}
+        save_progress(progress_file, progress)
+
+    targets = []
     for device in devices:
         host = device.get('mgmt_ip') or device.get('device')
         if not host:
             print(f"Skipping device with missing mgmt_ip or device field: {device}")
             continue
-        f5_config = F5Config(host, username, password, args.verify_ssl)
-        vs_data, summary_counts = process_virtual_servers(f5_config)
-        pool_data = process_pools(f5_config, summary_counts)
-        node_data = process_nodes(f5_config, summary_counts)
-        report_data = generate_report(vs_data, pool_data, node_data)
+        if host in progress['completed']:
+            continue
+        targets.append((device, host))
 
-        for data in report_data:
-            pool_info = data.get('pool', '')
-            pool_members = []
-            if pool_info in pool_data:
-                pool_members = pool_data[pool_info].get('members', [])
-            if not pool_members:
-                row = [
-                    device.get('device', ''),
-                    device.get('dc', ''),
-                    device.get('tier', ''),
-                    data['name'],
-                    data['description'],
-                    f"{data['destination_ip']}:{data['destination_port']}" if data['destination_ip'] else '',
-                    data['destination_port'],
-                    data['vs_availabilityState'],
-                    data['vs_statusReason'],
-                    data['pool_name'],
-                    data['pool_availabilityState'],
-                    data['pool_statusReason'],
-                    data.get('active_members', ''),
-                    data.get('total_members', ''),
-                    '',  # Member Name
-                    '',  # Member Address
-                    '',  # Member State
-                    '',  # Member Session
-                    '',  # Node Status
-                    '',  # Node Status Reason
-                    ''   # Node Enabled State
-                ]
-                all_rows.append(row)
-            else:
-                for member in pool_members:
-                    member_address = member.get('address', '')
-                    node_info = node_data.get(member_address, {})
-                    row = [
-                        device.get('device', ''),
-                        device.get('dc', ''),
-                        device.get('tier', ''),
-                        data['name'],
-                        data['description'],
-                        f"{data['destination_ip']}:{data['destination_port']}" if data['destination_ip'] else '',
-                        data['destination_port'],
-                        data['vs_availabilityState'],
-                        data['vs_statusReason'],
-                        data['pool_name'],
-                        data['pool_availabilityState'],
-                        data['pool_statusReason'],
-                        data.get('active_members', ''),
-                        data.get('total_members', ''),
-                        member.get('name', ''),
-                        member.get('address', ''),
-                        member.get('state', ''),
-                        member.get('session', ''),
-                        node_info.get('availabilityState', ''),
-                        node_info.get('statusReason', ''),
-                        node_info.get('enabledState', '')
-                    ]
-                    all_rows.append(row)
+    if args.use_async:
+        from f5_async_client import iter_fleet
+        fleet = iter_fleet([host for _, host in targets], username, password, PREFETCH_ENDPOINTS,
+                           args.async_devices, args.verify_ssl)
+    else:
+        fleet = ((host, None) for _, host in targets)
+
+    for (device, host), (_, prefetched) in zip(targets, fleet):
+        f5_config = F5Config(host, username, password, args.verify_ssl, prefetched)
+        rows = device_rows(device, f5_config, fleet_index)
+        if args.snapshot:
+            # Keep this device's rows (only) for the snapshot as well as the CSV
+            rows = list(rows)
+            safe_host = str(host).replace("https://", "").replace("http://", "").replace("/", "_")
+            write_snapshot({'list': pd.DataFrame(rows, columns=CSV_HEADERS)},
+                           os.path.join(snapshot_dir, safe_host), args.snapshot)
+        progress['offset'] = append_rows(part_file, rows, args.gzip)
+        progress['completed'].append(host)
+        save_progress(progress_file, progress)
+        print(f"Exported {host}")
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = os.path.join(
-        args.output_dir,
-        f"f5vpmn_summary{timestamp}.csv"
-    )
-    with open(output_file, mode='w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile, delimiter=';')
-        writer.writerow(CSV_HEADERS)
-        writer.writerows(all_rows)
+    os.replace(part_file, output_file)
+    os.remove(progress_file)
     print(f"CSV file created: {output_file}")
 
 if __name__ == "__main__":
-    main() 
+    main()
@@ -1,5 +1,5 @@
 import requests
-from requests.auth import HTTPBasicAuth
+from f5_session import get_session_pool, decode_json, with_select, get_pools_expanded
 from openpyxl import Workbook
 from collections import Counter
 from urllib3.exceptions import InsecureRequestWarning
@@ -9,6 +9,10 @@ import os
 # Disable SSL warnings
 requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
 
+# Pool and member fields the report reads; members are matched to node stats by partition
+POOL_FIELDS = ('fullPath', 'membersReference')
+MEMBER_FIELDS = ('name', 'partition')
+
 class F5Config:
     def __init__(self, f5_host, username, password):
         if not f5_host.startswith('http'):
@@ -18,11 +22,8 @@ class F5Config:
         self.USERNAME = username
         self.PASSWORD = password
         
-        # Create session
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.USERNAME, self.PASSWORD)
-        self.session.verify = False
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Shared token-authenticated session (see f5_session.py)
+        self.session = get_session_pool(self.USERNAME, self.PASSWORD, False).session(self.F5_HOST)
         
         # Generate the report automatically when initialized
         self.generate_report()
@@ -31,11 +32,39 @@ class F5Config:
         url = f"{self.F5_HOST}{endpoint}"
         resp = self.session.get(url)
         resp.raise_for_status()
-        return resp.json()
+        return decode_json(resp)
+
+    def get_stats_map(self, endpoint):
+        """Fetch a collection-level stats endpoint and index its entries by tmName (fullPath)."""
+        stats_map = {}
+        for entry in self.get_json(endpoint).get('entries', {}).values():
+            nested = entry.get('nestedStats', {}).get('entries', {})
+            tm_name = nested.get('tmName', {}).get('description', '')
+            if tm_name:
+                stats_map[tm_name] = nested
+        return stats_map
+
+    def get_pool_members_map(self):
+        """Return pool fullPath -> member items, using one expanded pool request when supported."""
+        pools, expanded = get_pools_expanded(self, POOL_FIELDS)
+        members_map = {}
+        for pool in pools.get('items', []):
+            if expanded:
+                members_map[pool['fullPath']] = pool.get('membersReference', {}).get('items', [])
+            else:
+                pool_uri_path = pool['fullPath'].replace('/', '~')
+                members = self.get_json(with_select(f"/mgmt/tm/ltm/pool/{pool_uri_path}/members", MEMBER_FIELDS))
+                members_map[pool['fullPath']] = members.get('items', [])
+        return members_map
 
     def generate_report(self):
         # ==== DATA COLLECTION ====
+        # Collection-level requests only; per-object data is joined in memory by fullPath
         vs_list = self.get_json("/mgmt/tm/ltm/virtual")['items']
+        vs_stats_map = self.get_stats_map("/mgmt/tm/ltm/virtual/stats")
+        pool_stats_map = self.get_stats_map("/mgmt/tm/ltm/pool/stats")
+        node_stats_map = self.get_stats_map("/mgmt/tm/ltm/node/stats")
+        pool_members_map = self.get_pool_members_map()
         summary_counts = {
             "virtual": Counter(),
             "pool": Counter(),
@@ -50,9 +79,10 @@ class F5Config:
             vs_port = vs_dest.split(":")[-1] if ":" in vs_dest else ""
             vs_desc = vs.get('description', '')
 
-            vs_stats = self.get_json(f"/mgmt/tm/ltm/virtual/{vs_name}/stats")
-            vs_key = list(vs_stats['entries'].keys())[0]
-            vs_data = vs_stats['entries'][vs_key]['nestedStats']['entries']
+            vs_data = vs_stats_map.get(vs['fullPath'])
+            if not vs_data:
+                print(f"Could not get stats for virtual server: {vs_name} ({vs['fullPath']})")
+                continue
             vs_status = vs_data['status.availabilityState']['description']
             vs_reason = vs_data['status.statusReason']['description']
             summary_counts["virtual"][vs_status] += 1
@@ -61,39 +91,35 @@ class F5Config:
             if not pool_path:
                 continue
 
-            # Extract pool name and handle the path properly
+            # Normalise the pool reference to its fullPath
             if pool_path.startswith('/'):
-                # Convert '/partition/pool_name' format to API format
-                pool_uri_path = pool_path.replace('/', '~')
-                if pool_uri_path.startswith('~'):
-                    pool_uri_path = pool_uri_path[1:]  # Remove leading ~
+                pool_full_path = pool_path
                 pool_name = pool_path.split('/')[-1]
             else:
                 # Handle case where pool might not have partition prefix
                 pool_name = pool_path
-                pool_uri_path = f"~Common~{pool_name}"
-            
-            pool_uri = f"/mgmt/tm/ltm/pool/{pool_uri_path}"
-            pool_stats = self.get_json(f"{pool_uri}/stats")
-            pool_key = list(pool_stats['entries'].keys())[0]
-            pool_data = pool_stats['entries'][pool_key]['nestedStats']['entries']
+                pool_full_path = f"/Common/{pool_name}"
+
+            pool_data = pool_stats_map.get(pool_full_path)
+            if not pool_data:
+                print(f"Could not get stats for pool: {pool_name} ({pool_full_path})")
+                continue
             pool_status = pool_data['status.availabilityState']['description']
             pool_reason = pool_data['status.statusReason']['description']
             active_members = pool_data.get('activeMemberCnt', {}).get('value', 0)
             total_members = pool_data.get('memberCnt', {}).get('value', 0)
             summary_counts["pool"][pool_status] += 1
 
-            members = self.get_json(f"{pool_uri}/members")['items']
+            members = pool_members_map.get(pool_full_path, [])
 
             for member in members:
                 member_name = member['name']
                 node_ip = member_name.split(":")[0]
 
-                node_stats = self.get_json(f"/mgmt/tm/ltm/node/{node_ip}/stats")
-                node_key = list(node_stats['entries'].keys())[0]
-                node_data = node_stats['entries'][node_key]['nestedStats']['entries']
-                node_status = node_data['status.availabilityState']['description']
-                node_reason = node_data['status.statusReason']['description']
+                node_partition = member.get('partition', 'Common')
+                node_data = node_stats_map.get(f"/{node_partition}/{node_ip}", {})
+                node_status = node_data.get('status.availabilityState', {}).get('description', 'unknown')
+                node_reason = node_data.get('status.statusReason', {}).get('description', '')
                 summary_counts["node"][node_status] += 1
 
                 details.append([
@@ -7,11 +7,17 @@ import json
 from urllib3.exceptions import InsecureRequestWarning
 import warnings
 import base64
+from f5_session import get_session_pool, with_select, decode_json
+from f5_summary_stats import status_summary
 from datetime import datetime
 
 # Suppress only the single warning from urllib3 needed.
 warnings.filterwarnings('ignore', category=InsecureRequestWarning)
 
+# The only stats fields the summary reads; requesting just these skips the
+# bytes/connections/packets counters of every object
+STATUS_FIELDS = ('tmName', 'status.availabilityState', 'status.enabledState')
+
 def get_credentials():
     """
     Get F5 credentials from environment variables (GitHub secrets).
@@ -45,58 +51,43 @@ def load_inventory(inventory_file):
 def get_auth_token(address, username, password):
     """
     Get authentication token from F5 device using username and password.
+    The token is cached in the shared session pool and only renewed shortly
+    before it expires, so repeated calls for the same device do not log in again.
     """
-    auth_url = f"https://{address}/mgmt/shared/authn/login"
-    auth_data = {
-        "username": username,
-        "password": password,
-        "loginProviderName": "tmos"
-    }
-    headers = {'Content-Type': 'application/json'}
-    
     try:
-        response = requests.post(auth_url, json=auth_data, headers=headers, verify=False)
-        response.raise_for_status()
-        return response.json()['token']['token']
-    except requests.exceptions.RequestException as e:
+        return get_session_pool(username, password).token(address)
+    except (requests.exceptions.RequestException, KeyError) as e:
         print(f"Authentication failed for {address}: {e}")
         return None
 
-def fetch_f5_summary(address):
+def fetch_f5_summary(address, status_only=True):
     """
     Fetches F5 summary stats using credentials from environment variables.
+    With status_only, the stats endpoints are asked for tmName and status
+    only ($select), falling back to the full stats if the device rejects it.
     """
+    full_stats = not status_only
+
     def get_stats(url, token):
-        headers = {'X-F5-Auth-Token': token, 'Content-Type': 'application/json'}
-        r = requests.get(url, headers=headers, verify=False)
+        # The shared session attaches (and renews) the auth token itself
+        r = get_session_pool(*get_credentials()).session(address).get(url)
         r.raise_for_status()
-        return r.json()
+        return decode_json(r)
 
-    def parse_stats_entries(stats_json):
-        entries = stats_json.get('entries', {})
-        total = len(entries)
-        available = unavailable = offline = unknown = 0
-        available_disabled = offline_disabled = unknown_disabled = 0
-        for entry in entries.values():
-            nested = entry.get('nestedStats', {}).get('entries', {})
-            status = nested.get('status.availabilityState', {}).get('description', '').lower()
-            enabled = nested.get('status.enabledState', {}).get('description', '').lower()
-            disabled = enabled == 'disabled'
-            if status == 'available':
-                available += 1
-                if disabled:
-                    available_disabled += 1
-            elif status == 'unavailable':
-                unavailable += 1
-            elif status == 'offline':
-                offline += 1
-                if disabled:
-                    offline_disabled += 1
-            elif status == 'unknown':
-                unknown += 1
-                if disabled:
-                    unknown_disabled += 1
-        return total, available, available_disabled, unavailable, offline, offline_disabled, unknown, unknown_disabled
+    def get_status_stats(url, token):
+        nonlocal full_stats
+        if not full_stats:
+            try:
+                stats_json = get_stats(with_select(url, STATUS_FIELDS), token)
+                entries = list(stats_json.get('entries', {}).values())
+                # Some versions accept $select on stats but drop the nested fields
+                if not entries or 'status.availabilityState' in entries[0].get('nestedStats', {}).get('entries', {}):
+                    return stats_json
+            except requests.exceptions.HTTPError:
+                pass
+            print(f"Status-only stats not supported by {address}, falling back to full stats")
+            full_stats = True
+        return get_stats(url, token)
 
     try:
         # Get credentials from environment variables
@@ -109,45 +100,21 @@ def fetch_f5_summary(address):
         
         # Virtual Servers
         vs_url = f"https://{address}/mgmt/tm/ltm/virtual/stats"
-        vs_stats_json = get_stats(vs_url, token)
-        vs_total, vs_avail, vs_avail_dis, vs_unavail, vs_off, vs_off_dis, vs_unk, vs_unk_dis = parse_stats_entries(vs_stats_json)
+        vs_stats_json = get_status_stats(vs_url, token)
 
         # Pools
         pool_url = f"https://{address}/mgmt/tm/ltm/pool/stats"
-        pool_stats_json = get_stats(pool_url, token)
-        pool_total, pool_avail, pool_avail_dis, pool_unavail, pool_off, pool_off_dis, pool_unk, pool_unk_dis = parse_stats_entries(pool_stats_json)
+        pool_stats_json = get_status_stats(pool_url, token)
 
         # Nodes
         node_url = f"https://{address}/mgmt/tm/ltm/node/stats"
-        node_stats_json = get_stats(node_url, token)
-        node_total, node_avail, node_avail_dis, node_unavail, node_off, node_off_dis, node_unk, node_unk_dis = parse_stats_entries(node_stats_json)
+        node_stats_json = get_status_stats(node_url, token)
 
         # Build summary DataFrame
-        summary_df = pd.DataFrame([
-            {
-                "Object Type": "Virtual Servers",
-                "Total": vs_total,
-                "Available": f"{vs_avail} ({vs_avail_dis} Disabled)",
-                "Unavailable": vs_unavail,
-                "Offline": f"{vs_off} ({vs_off_dis} Disabled)",
-                "Unknown": f"{vs_unk} ({vs_unk_dis} Disabled)"
-            },
-            {
-                "Object Type": "Pools",
-                "Total": pool_total,
-                "Available": f"{pool_avail} ({pool_avail_dis} Disabled)",
-                "Unavailable": pool_unavail,
-                "Offline": f"{pool_off} ({pool_off_dis} Disabled)",
-                "Unknown": f"{pool_unk} ({pool_unk_dis} Disabled)"
-            },
-            {
-                "Object Type": "Nodes",
-                "Total": node_total,
-                "Available": f"{node_avail} ({node_avail_dis} Disabled)",
-                "Unavailable": node_unavail,
-                "Offline": f"{node_off} ({node_off_dis} Disabled)",
-                "Unknown": f"{node_unk} ({node_unk_dis} Disabled)"
-            }
+        summary_df = status_summary([
+            ("Virtual Servers", vs_stats_json),
+            ("Pools", pool_stats_json),
+            ("Nodes", node_stats_json)
         ])
         return summary_df
     except requests.exceptions.RequestException as e:
@@ -163,6 +130,8 @@ def main():
                       help='Path to inventory JSON file (default: inventory.json)')
     parser.add_argument('--output', '-o', default='f5_status_summary',
                       help='Output CSV file base name (default: f5_status_summary)')
+    parser.add_argument('--full-stats', action='store_true',
+                      help='Download the full stats instead of only the status fields')
     
     args = parser.parse_args()
     
@@ -182,7 +151,7 @@ def main():
         print(f"\nProcessing device: {device}")
         print(f"Datacenter: {dc}")
         
-        summary_df = fetch_f5_summary(device)
+        summary_df = fetch_f5_summary(device, status_only=not args.full_stats)
         
         if summary_df is not None:
             # Add only dc and device information columns
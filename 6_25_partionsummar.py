@@ -7,11 +7,21 @@ import json
 from urllib3.exceptions import InsecureRequestWarning
 import warnings
 import base64
+from f5_session import get_session_pool, decode_json
+from f5_summary_stats import status_summary
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
 # Suppress only the single warning from urllib3 needed.
 warnings.filterwarnings('ignore', category=InsecureRequestWarning)
 
+# Defaults for the parallel inventory runner
+DEFAULT_WORKERS = 10
+DEFAULT_DEVICE_TIMEOUT = 300
+# Requests made per device (login and three stats calls); each gets this share of the device timeout
+REQUESTS_PER_DEVICE = 4
+
 def get_credentials():
     """
     Get F5 credentials from environment variables (GitHub secrets).
@@ -42,23 +52,15 @@ def load_inventory(inventory_file):
         print(f"Error: Invalid JSON in {inventory_file}")
         sys.exit(1)
 
-def get_auth_token(address, username, password):
+def get_auth_token(address, username, password, timeout=None):
     """
     Get authentication token from F5 device using username and password.
+    The token is cached in the shared session pool and only renewed shortly
+    before it expires, so repeated calls for the same device do not log in again.
     """
-    auth_url = f"https://{address}/mgmt/shared/authn/login"
-    auth_data = {
-        "username": username,
-        "password": password,
-        "loginProviderName": "tmos"
-    }
-    headers = {'Content-Type': 'application/json'}
-    
     try:
-        response = requests.post(auth_url, json=auth_data, headers=headers, verify=False)
-        response.raise_for_status()
-        return response.json()['token']['token']
-    except requests.exceptions.RequestException as e:
+        return get_session_pool(username, password).token(address, timeout=timeout)
+    except (requests.exceptions.RequestException, KeyError) as e:
         print(f"Authentication failed for {address}: {e}")
         return None
 
@@ -67,36 +69,10 @@ def fetch_f5_summary(address):
     Fetches F5 summary stats using credentials from environment variables.
     """
     def get_stats(url, token):
-        headers = {'X-F5-Auth-Token': token, 'Content-Type': 'application/json'}
-        r = requests.get(url, headers=headers, verify=False)
+        # The shared session attaches (and renews) the auth token itself
+        r = get_session_pool(*get_credentials()).session(address).get(url)
         r.raise_for_status()
-        return r.json()
-
-    def parse_stats_entries(stats_json):
-        entries = stats_json.get('entries', {})
-        total = len(entries)
-        available = unavailable = offline = unknown = 0
-        available_disabled = offline_disabled = unknown_disabled = 0
-        for entry in entries.values():
-            nested = entry.get('nestedStats', {}).get('entries', {})
-            status = nested.get('status.availabilityState', {}).get('description', '').lower()
-            enabled = nested.get('status.enabledState', {}).get('description', '').lower()
-            disabled = enabled == 'disabled'
-            if status == 'available':
-                available += 1
-                if disabled:
-                    available_disabled += 1
-            elif status == 'unavailable':
-                unavailable += 1
-            elif status == 'offline':
-                offline += 1
-                if disabled:
-                    offline_disabled += 1
-            elif status == 'unknown':
-                unknown += 1
-                if disabled:
-                    unknown_disabled += 1
-        return total, available, available_disabled, unavailable, offline, offline_disabled, unknown, unknown_disabled
+        return decode_json(r)
 
     try:
         # Get credentials from environment variables
@@ -110,44 +86,20 @@ def fetch_f5_summary(address):
         # Virtual Servers
         vs_url = f"https://{address}/mgmt/tm/ltm/virtual/stats"
         vs_stats_json = get_stats(vs_url, token)
-        vs_total, vs_avail, vs_avail_dis, vs_unavail, vs_off, vs_off_dis, vs_unk, vs_unk_dis = parse_stats_entries(vs_stats_json)
 
         # Pools
         pool_url = f"https://{address}/mgmt/tm/ltm/pool/stats"
         pool_stats_json = get_stats(pool_url, token)
-        pool_total, pool_avail, pool_avail_dis, pool_unavail, pool_off, pool_off_dis, pool_unk, pool_unk_dis = parse_stats_entries(pool_stats_json)
 
         # Nodes
         node_url = f"https://{address}/mgmt/tm/ltm/node/stats"
         node_stats_json = get_stats(node_url, token)
-        node_total, node_avail, node_avail_dis, node_unavail, node_off, node_off_dis, node_unk, node_unk_dis = parse_stats_entries(node_stats_json)
 
         # Build summary DataFrame
-        summary_df = pd.DataFrame([
-            {
-                "Object Type": "Virtual Servers",
-                "Total": vs_total,
-                "Available": f"{vs_avail} ({vs_avail_dis} Disabled)",
-                "Unavailable": vs_unavail,
-                "Offline": f"{vs_off} ({vs_off_dis} Disabled)",
-                "Unknown": f"{vs_unk} ({vs_unk_dis} Disabled)"
-            },
-            {
-                "Object Type": "Pools",
-                "Total": pool_total,
-                "Available": f"{pool_avail} ({pool_avail_dis} Disabled)",
-                "Unavailable": pool_unavail,
-                "Offline": f"{pool_off} ({pool_off_dis} Disabled)",
-                "Unknown": f"{pool_unk} ({pool_unk_dis} Disabled)"
-            },
-            {
-                "Object Type": "Nodes",
-                "Total": node_total,
-                "Available": f"{node_avail} ({node_avail_dis} Disabled)",
-                "Unavailable": node_unavail,
-                "Offline": f"{node_off} ({node_off_dis} Disabled)",
-                "Unknown": f"{node_unk} ({node_unk_dis} Disabled)"
-            }
+        summary_df = status_summary([
+            ("Virtual Servers", vs_stats_json),
+            ("Pools", pool_stats_json),
+            ("Nodes", node_stats_json)
         ])
         return summary_df
     except requests.exceptions.RequestException as e:
@@ -157,124 +109,55 @@ def fetch_f5_summary(address):
         print(f"Unexpected error for device {address}: {e}")
         return None
 
-def fetch_f5_summary_by_partition(address):
+def fetch_f5_summary_by_partition(address, timeout=None):
     """
     Fetches F5 summary stats by partition using credentials from environment variables.
+    timeout is the budget for the whole device: each request gets at most
+    1/REQUESTS_PER_DEVICE of it, and no request is started once it is spent.
     """
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def request_timeout():
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout(f"device timeout of {timeout}s exceeded")
+        return min(remaining, timeout / REQUESTS_PER_DEVICE)
+
     def get_stats(url, token):
-        headers = {'X-F5-Auth-Token': token, 'Content-Type': 'application/json'}
-        r = requests.get(url, headers=headers, verify=False)
+        # The shared session attaches (and renews) the auth token itself
+        r = get_session_pool(*get_credentials()).session(address).get(url, timeout=request_timeout())
         r.raise_for_status()
-        return r.json()
-
-    def parse_stats_entries_by_partition(stats_json):
-        entries = stats_json.get('entries', {})
-        partition_stats = {}
-        
-        for entry in entries.values():
-            nested = entry.get('nestedStats', {}).get('entries', {})
-            tm_name = nested.get('tmName', {}).get('description', '')
-            
-            # Extract partition from tmName (format: /partition/name)
-            if '/' in tm_name:
-                partition = tm_name.split('/')[1]  # Get partition name
-            else:
-                partition = 'Common'
-            
-            if partition not in partition_stats:
-                partition_stats[partition] = {
-                    'total': 0, 'available': 0, 'available_disabled': 0,
-                    'unavailable': 0, 'offline': 0, 'offline_disabled': 0,
-                    'unknown': 0, 'unknown_disabled': 0
-                }
-            
-            partition_stats[partition]['total'] += 1
-            
-            status = nested.get('status.availabilityState', {}).get('description', '').lower()
-            enabled = nested.get('status.enabledState', {}).get('description', '').lower()
-            disabled = enabled == 'disabled'
-            
-            if status == 'available':
-                partition_stats[partition]['available'] += 1
-                if disabled:
-                    partition_stats[partition]['available_disabled'] += 1
-            elif status == 'unavailable':
-                partition_stats[partition]['unavailable'] += 1
-            elif status == 'offline':
-                partition_stats[partition]['offline'] += 1
-                if disabled:
-                    partition_stats[partition]['offline_disabled'] += 1
-            elif status == 'unknown':
-                partition_stats[partition]['unknown'] += 1
-                if disabled:
-                    partition_stats[partition]['unknown_disabled'] += 1
-        
-        return partition_stats
+        return decode_json(r)
 
     try:
         # Get credentials from environment variables
         username, password = get_credentials()
         
         # Get authentication token
-        token = get_auth_token(address, username, password)
+        token = get_auth_token(address, username, password, timeout=request_timeout())
         if not token:
             return None
         
         # Virtual Servers by partition
         vs_url = f"https://{address}/mgmt/tm/ltm/virtual/stats"
         vs_stats_json = get_stats(vs_url, token)
-        vs_partition_stats = parse_stats_entries_by_partition(vs_stats_json)
 
         # Pools by partition
         pool_url = f"https://{address}/mgmt/tm/ltm/pool/stats"
         pool_stats_json = get_stats(pool_url, token)
-        pool_partition_stats = parse_stats_entries_by_partition(pool_stats_json)
 
         # Nodes by partition
         node_url = f"https://{address}/mgmt/tm/ltm/node/stats"
         node_stats_json = get_stats(node_url, token)
-        node_partition_stats = parse_stats_entries_by_partition(node_stats_json)
 
         # Build summary DataFrame with partition information
-        summary_rows = []
-        
-        # Add Virtual Servers by partition
-        for partition, stats in vs_partition_stats.items():
-            summary_rows.append({
-                "Object Type": "Virtual Servers",
-                "Total": stats['total'],
-                "Available": f"{stats['available']} ({stats['available_disabled']} Disabled)",
-                "Unavailable": stats['unavailable'],
-                "Offline": f"{stats['offline']} ({stats['offline_disabled']} Disabled)",
-                "Unknown": f"{stats['unknown']} ({stats['unknown_disabled']} Disabled)",
-                "Partition": partition
-            })
-        
-        # Add Pools by partition
-        for partition, stats in pool_partition_stats.items():
-            summary_rows.append({
-                "Object Type": "Pools",
-                "Total": stats['total'],
-                "Available": f"{stats['available']} ({stats['available_disabled']} Disabled)",
-                "Unavailable": stats['unavailable'],
-                "Offline": f"{stats['offline']} ({stats['offline_disabled']} Disabled)",
-                "Unknown": f"{stats['unknown']} ({stats['unknown_disabled']} Disabled)",
-                "Partition": partition
-            })
-        
-        # Add Nodes by partition
-        for partition, stats in node_partition_stats.items():
-            summary_rows.append({
-                "Object Type": "Nodes",
-                "Total": stats['total'],
-                "Available": f"{stats['available']} ({stats['available_disabled']} Disabled)",
-                "Unavailable": stats['unavailable'],
-                "Offline": f"{stats['offline']} ({stats['offline_disabled']} Disabled)",
-                "Unknown": f"{stats['unknown']} ({stats['unknown_disabled']} Disabled)",
-                "Partition": partition
-            })
-        
-        return pd.DataFrame(summary_rows)
+        return status_summary([
+            ("Virtual Servers", vs_stats_json),
+            ("Pools", pool_stats_json),
+            ("Nodes", node_stats_json)
+        ], by_partition=True)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching data from F5 device {address}: {e}")
         return None
@@ -282,52 +165,116 @@ def fetch_f5_summary_by_partition(address):
         print(f"Unexpected error for device {address}: {e}")
         return None
 
+def run_inventory(devices, on_result, workers=DEFAULT_WORKERS, device_timeout=DEFAULT_DEVICE_TIMEOUT):
+    """
+    Run fetch_f5_summary_by_partition for every device on a thread pool.
+
+    on_result(device_info, summary_df) is called from the calling thread as
+    each device completes, so results can be streamed to the output. A device
+    still running after device_timeout seconds is reported as timed out and
+    not waited for. Returns a list of per-device status rows.
+    """
+    status_rows = []
+    started = {}
+
+    def run(device_info):
+        started[device_info.get('device')] = time.monotonic()
+        return fetch_f5_summary_by_partition(device_info.get('device'), timeout=device_timeout)
+
+    def record(device_info, status, rows=0):
+        device = device_info.get('device')
+        elapsed = time.monotonic() - started.get(device, time.monotonic())
+        status_rows.append({
+            'Datacenter': device_info.get('dc', 'Unknown'),
+            'Device': device,
+            'Status': status,
+            'Seconds': round(elapsed, 2),
+            'Rows': rows
+        })
+        print(f"{device}: {status} in {elapsed:.2f}s")
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    pending = {executor.submit(run, device_info): device_info for device_info in devices}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                device_info = pending.pop(future)
+                try:
+                    summary_df = future.result()
+                except Exception as e:
+                    print(f"Unexpected error for device {device_info.get('device')}: {e}")
+                    summary_df = None
+                if summary_df is None:
+                    record(device_info, 'failed')
+                    continue
+                on_result(device_info, summary_df)
+                record(device_info, 'ok', len(summary_df))
+
+            # Give up on devices that have been running longer than the timeout
+            now = time.monotonic()
+            for future, device_info in list(pending.items()):
+                start = started.get(device_info.get('device'))
+                if start is not None and now - start > device_timeout:
+                    pending.pop(future)
+                    record(device_info, 'timeout')
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return status_rows
+
 def main():
     parser = argparse.ArgumentParser(description='Fetch F5 device status summary and save to CSV')
     parser.add_argument('--inventory', '-i', default='inventory.json',
                       help='Path to inventory JSON file (default: inventory.json)')
     parser.add_argument('--output', '-o', default='f5_status_summary',
                       help='Output CSV file base name (default: f5_status_summary)')
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                      help=f'Maximum devices processed concurrently (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--timeout', '-t', type=int, default=DEFAULT_DEVICE_TIMEOUT,
+                      help=f'Per-device timeout in seconds (default: {DEFAULT_DEVICE_TIMEOUT})')
     
     args = parser.parse_args()
     
     # Generate timestamp for filename
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     output_file = f"{args.output}_{timestamp}.csv"
+    status_file = f"{args.output}_{timestamp}_devices.csv"
     
-    # Load device inventory using default inventory.json in the same directory
-    devices = load_inventory('inventory.json')
+    # Load device inventory (inventory.json in the working directory by default)
+    devices = load_inventory(args.inventory)
     
-    # Process each device
-    all_summaries = []
-    for device_info in devices:
-        dc = device_info.get('dc', 'Unknown')
-        device = device_info.get('device')
-        
-        print(f"\nProcessing device: {device}")
-        print(f"Datacenter: {dc}")
-        
-        summary_df = fetch_f5_summary_by_partition(device)
-        
-        if summary_df is not None:
+    # Stream each device's summary into the combined CSV as soon as it completes
+    written = {'rows': 0, 'header': False}
+    with open(output_file, 'w', newline='') as out:
+        def write_summary(device_info, summary_df):
             # Add device information columns
-            summary_df['Datacenter'] = dc
-            summary_df['Device'] = device
-            
-            # Add to combined summary
-            all_summaries.append(summary_df)
-    
+            summary_df['Datacenter'] = device_info.get('dc', 'Unknown')
+            summary_df['Device'] = device_info.get('device')
+            # Reorder columns to put device information first and Total last
+            device_cols = ['Datacenter', 'Device', 'Partition']
+            other_cols = [col for col in summary_df.columns if col not in device_cols and col != 'Total']
+            summary_df = summary_df[device_cols + other_cols + ['Total']]
+            # An empty summary still writes the header, so track it separately from the row count
+            summary_df.to_csv(out, index=False, sep=';', header=not written['header'])
+            written['header'] = True
+            out.flush()
+            written['rows'] += len(summary_df)
+
+        status_rows = run_inventory(devices, write_summary, args.workers, args.timeout)
+
+    status_df = pd.DataFrame(status_rows, columns=['Datacenter', 'Device', 'Status', 'Seconds', 'Rows'])
+    status_df = status_df.sort_values('Seconds', ascending=False)
+    print("\nPer-device results:")
+    print(status_df.to_string(index=False))
+    status_df.to_csv(status_file, index=False, sep=';')
+    print(f"\nDevice status saved to {status_file}")
+
     # Save combined summary if we have any successful results
-    if all_summaries:
-        combined_df = pd.concat(all_summaries, ignore_index=True)
-        # Reorder columns to put device information first and Total last
-        device_cols = ['Datacenter', 'Device', 'Partition']
-        other_cols = [col for col in combined_df.columns if col not in device_cols and col != 'Total']
-        combined_df = combined_df[device_cols + other_cols + ['Total']]
-        combined_df.to_csv(output_file, index=False, sep=';')
+    if written['rows']:
         print(f"\nSummary saved to {output_file}")
     else:
+        os.remove(output_file)
         print("\nNo successful device summaries were generated")
 
 if __name__ == "__main__":
-    main() 
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the BIG-IP iControl REST API, for benchmarking the collectors.
+
+Synthesizes a device with a configurable number of virtual servers, one pool
+per virtual server and members_per_pool members (each with its own node),
+spread over a few partitions, and serves:
+
+- POST /mgmt/shared/authn/login
+- GET  /mgmt/tm/ltm/virtual[/stats], /mgmt/tm/ltm/virtual/~P~name
+- GET  /mgmt/tm/ltm/pool[/stats] (with expandSubcollections=true),
+       /mgmt/tm/ltm/pool/~P~name/members
+- GET  /mgmt/tm/ltm/node[/stats], /mgmt/tm/ltm/node/~P~name
+
+Collections honour $select, $top/$skip (with nextLink) like the device does.
+Every request can be delayed by a fixed latency, requests above max_rps per
+second are shed with a 503 like an overloaded restjavad, and the server
+counts the requests it served so a harness can report them per run.
+
+Usage:
+    python bench/mock_icontrol.py --virtuals 1000 --port 8443 --tls
+"""
+
+import argparse
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+LTM = '/mgmt/tm/ltm'
+# Availability states cycled through the synthetic objects
+STATES = (('available', 'enabled', 'The virtual server is available'),
+          ('available', 'enabled', 'The virtual server is available'),
+          ('available', 'enabled', 'The virtual server is available'),
+          ('offline', 'enabled', 'The children pool member(s) are down'),
+          ('unknown', 'enabled', 'The children pool member(s) either don\'t have service checking enabled'),
+          ('available', 'disabled', 'The virtual server is disabled'))
+
+
+def uri_name(full_path):
+    """Return the URI form of a fullPath, e.g. /Common/vs_web -> ~Common~vs_web."""
+    return full_path.replace('/', '~')
+
+
+def stat_value(value):
+    return {'value': value}
+
+
+def stat_description(description):
+    return {'description': description}
+
+
+class MockDevice:
+    """Synthetic LTM configuration and stats, with response bodies cached per URL."""
+
+    def __init__(self, virtuals=100, members_per_pool=4, partitions=4):
+        self.virtuals = virtuals
+        self.members_per_pool = members_per_pool
+        self.partitions = ['Common'] + [f"Tenant{i}" for i in range(1, max(1, partitions))]
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self._build()
+
+    def _build(self):
+        self.collections = {'virtual': [], 'pool': [], 'node': []}
+        self.members = {}
+        self.stats = {'virtual': {}, 'pool': {}, 'node': {}}
+        for i in range(self.virtuals):
+            partition = self.partitions[i % len(self.partitions)]
+            state, enabled, reason = STATES[i % len(STATES)]
+            pool_path = f"/{partition}/pool_{i}"
+            vs_path = f"/{partition}/vs_{i}"
+            address = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+            destination = f"/{partition}/{address}:{443 if i % 2 else 80}"
+
+            virtual = {
+                'kind': 'tm:ltm:virtual:virtualstate', 'name': f"vs_{i}", 'partition': partition,
+                'fullPath': vs_path, 'generation': 1, 'description': f"service {i}",
+                'destination': destination, 'ipProtocol': 'tcp', 'mask': '255.255.255.255',
+                'source': '0.0.0.0/0', 'sourcePort': 'preserve', 'translateAddress': 'enabled',
+                'translatePort': 'enabled', 'lastModifiedTime': '2025-01-01T00:00:00Z',
+                'selfLink': f"https://localhost{LTM}/virtual/{uri_name(vs_path)}?ver=17.1.1",
+                'profilesReference': {'link': f"https://localhost{LTM}/virtual/{uri_name(vs_path)}/profiles",
+                                      'isSubcollection': True}
+            }
+            # Every tenth virtual server has no pool
+            if i % 10 != 9:
+                virtual['pool'] = pool_path
+            self.collections['virtual'].append(virtual)
+            self.stats['virtual'][vs_path] = self._stats_entry('virtual', vs_path, state, enabled, reason, {
+                'destination': stat_description(f"{address}:{443 if i % 2 else 80}"),
+                'clientside.curConns': stat_value(i % 50),
+                'clientside.bytesIn': stat_value(i * 1024),
+                'clientside.bytesOut': stat_value(i * 4096),
+                'clientside.pktsIn': stat_value(i * 10),
+                'clientside.pktsOut': stat_value(i * 12),
+                'clientside.totConns': stat_value(i * 3)
+            })
+
+            members = []
+            for j in range(self.members_per_pool):
+                node_address = f"172.{16 + j % 16}.{(i >> 8) & 255}.{i & 255}"
+                node_path = f"/{partition}/{node_address}"
+                member_state = 'down' if (i + j) % 7 == 0 else 'up'
+                members.append({
+                    'kind': 'tm:ltm:pool:members:membersstate', 'name': f"{node_address}:80",
+                    'partition': partition, 'fullPath': f"{node_path}:80", 'generation': 1,
+                    'address': node_address, 'state': member_state, 'session': 'monitor-enabled',
+                    'monitor': 'default', 'ratio': 1, 'priorityGroup': 0
+                })
+                if node_path not in self.stats['node']:
+                    self.collections['node'].append({
+                        'kind': 'tm:ltm:node:nodestate', 'name': node_address, 'partition': partition,
+                        'fullPath': node_path, 'generation': 1, 'address': node_address,
+                        'monitor': 'default', 'session': 'monitor-enabled',
+                        'state': member_state, 'lastModifiedTime': '2025-01-01T00:00:00Z'
+                    })
+                    node_state = 'offline' if member_state == 'down' else 'available'
+                    self.stats['node'][node_path] = self._stats_entry('node', node_path, node_state, 'enabled',
+                                                                      'Node address is available', {
+                        'addr': stat_description(node_address),
+                        'serverside.curConns': stat_value(j),
+                        'serverside.bytesIn': stat_value(i * j)
+                    })
+            self.members[pool_path] = members
+            self.collections['pool'].append({
+                'kind': 'tm:ltm:pool:poolstate', 'name': f"pool_{i}", 'partition': partition,
+                'fullPath': pool_path, 'generation': 1, 'monitor': '/Common/http',
+                'loadBalancingMode': 'round-robin', 'lastModifiedTime': '2025-01-01T00:00:00Z',
+                'membersReference': {'link': f"https://localhost{LTM}/pool/{uri_name(pool_path)}/members?ver=17.1.1",
+                                     'isSubcollection': True}
+            })
+            active = sum(1 for member in members if member['state'] == 'up')
+            self.stats['pool'][pool_path] = self._stats_entry('pool', pool_path, state, enabled, reason, {
+                'activeMemberCnt': stat_value(active),
+                'memberCnt': stat_value(len(members)),
+                'serverside.curConns': stat_value(i % 30),
+                'serverside.bytesIn': stat_value(i * 2048)
+            })
+        self.objects = {kind: {item['fullPath']: item for item in items} for kind, items in self.collections.items()}
+
+    @staticmethod
+    def _stats_entry(kind, full_path, state, enabled, reason, counters):
+        entries = {
+            'tmName': stat_description(full_path),
+            'status.availabilityState': stat_description(state),
+            'status.enabledState': stat_description(enabled),
+            'status.statusReason': stat_description(reason)
+        }
+        entries.update(counters)
+        link = f"https://localhost{LTM}/{kind}/{uri_name(full_path)}/stats"
+        return link, {'nestedStats': {'kind': f"tm:ltm:{kind}:{kind}stats", 'selfLink': f"{link}?ver=17.1.1",
+                                      'entries': entries}}
+
+    def body(self, path, query):
+        """Return (status, JSON bytes) for a GET, caching the body of each distinct URL."""
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in query.items())))
+        with self._lock:
+            cached = self._bodies.get(key)
+        if cached is None:
+            cached = self._render(path, query)
+            with self._lock:
+                self._bodies[key] = cached
+        return cached
+
+    def _render(self, path, query):
+        parts = path[len(LTM) + 1:].split('/') if path.startswith(LTM + '/') else []
+        if not parts or parts[0] not in self.collections:
+            return 404, b'{"code":404,"message":"Public URI path not registered"}'
+        kind = parts[0]
+        if len(parts) == 1:
+            items = self.collections[kind]
+            if kind == 'pool' and query.get('expandSubcollections') == ['true']:
+                items = [dict(pool, membersReference={**pool['membersReference'],
+                                                      'items': self.members[pool['fullPath']]})
+                         for pool in items]
+            return self._collection(kind, items, path, query)
+        if parts[1] == 'stats':
+            entries = dict(self.stats[kind].values())
+            return 200, json.dumps({'kind': f"tm:ltm:{kind}:{kind}collectionstats",
+                                    'selfLink': f"https://localhost{path}?ver=17.1.1",
+                                    'entries': entries}).encode()
+        full_path = parts[1].replace('~', '/')
+        if kind == 'pool' and len(parts) > 2 and parts[2] == 'members':
+            members = self.members.get(full_path)
+            if members is None:
+                return 404, b'{"code":404,"message":"Object not found"}'
+            return self._collection('pool:members', members, path, query)
+        item = self.objects[kind].get(full_path)
+        if item is None:
+            return 404, b'{"code":404,"message":"Object not found"}'
+        return 200, json.dumps(self._select(item, query)).encode()
+
+    @staticmethod
+    def _select(item, query):
+        if '$select' not in query:
+            return item
+        fields = query['$select'][0].split(',')
+        return {k: v for k, v in item.items() if k in fields}
+
+    def _collection(self, kind, items, path, query):
+        page = {'kind': f"tm:ltm:{kind}:{kind.split(':')[-1]}collectionstate",
+                'selfLink': f"https://localhost{path}?ver=17.1.1"}
+        if '$top' in query:
+            top = int(query['$top'][0])
+            skip = int(query.get('$skip', ['0'])[0])
+            if skip + top < len(items):
+                rest = {k: v[0] for k, v in query.items() if k not in ('$top', '$skip')}
+                rest_query = ''.join(f"{k}={v}&" for k, v in rest.items())
+                page['nextLink'] = f"https://localhost{path}?{rest_query}$top={top}&$skip={skip + top}"
+            items = items[skip:skip + top]
+            page.update({'currentItemCount': len(items), 'totalItems': len(items), 'skip': skip})
+        page['items'] = [self._select(item, query) for item in items]
+        return 200, json.dumps(page).encode()
+
+
+class MockServer:
+    """Threaded HTTP(S) server for a MockDevice, with a request counter, injectable latency and load shedding."""
+
+    def __init__(self, device, port=0, latency=0.0, tls=False, max_rps=None):
+        self.device = device
+        self.latency = latency
+        self.max_rps = max_rps
+        self.requests = 0
+        self.shed = 0
+        self._recent = deque()
+        self._count_lock = threading.Lock()
+        self._tls_dir = None
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.httpd.daemon_threads = True
+        self.scheme = 'http'
+        if tls:
+            self._wrap_tls()
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"{self.scheme}://127.0.0.1:{self.port}"
+
+    @property
+    def address(self):
+        return f"127.0.0.1:{self.port}"
+
+    def _wrap_tls(self):
+        """Serve HTTPS with a throwaway self-signed certificate made with the openssl CLI."""
+        if not shutil.which('openssl'):
+            raise RuntimeError("openssl is required to serve the mock over TLS")
+        self._tls_dir = tempfile.mkdtemp(prefix='mock_icontrol_')
+        cert = os.path.join(self._tls_dir, 'cert.pem')
+        key = os.path.join(self._tls_dir, 'key.pem')
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=127.0.0.1', '-keyout', key, '-out', cert],
+                       check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.scheme = 'https'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle on, the body
+            # waits for the client's delayed ACK (~40 ms) on keep-alive connections
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _begin(self):
+                """Count the request; return False (after answering 503) when it is shed."""
+                with server._count_lock:
+                    server.requests += 1
+                    overloaded = False
+                    if server.max_rps:
+                        now = time.monotonic()
+                        while server._recent and now - server._recent[0] > 1:
+                            server._recent.popleft()
+                        overloaded = len(server._recent) >= server.max_rps
+                        if overloaded:
+                            server.shed += 1
+                        else:
+                            server._recent.append(now)
+                if server.latency:
+                    time.sleep(server.latency)
+                if overloaded:
+                    self._send(503, b'{"code":503,"message":"Service Unavailable"}')
+                return not overloaded
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not self._begin():
+                    return
+                if urlsplit(self.path).path != '/mgmt/shared/authn/login':
+                    return self._send(404, b'{"code":404}')
+                self._send(200, json.dumps({'token': {'token': 'MOCKTOKEN', 'timeout': 1200}}).encode())
+
+            def do_GET(self):
+                if not self._begin():
+                    return
+                url = urlsplit(self.path)
+                status, body = server.device.body(url.path, parse_qs(url.query))
+                self._send(status, body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def reset_count(self):
+        with self._count_lock:
+            self.requests = 0
+            self.shed = 0
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._tls_dir:
+            shutil.rmtree(self._tls_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic BIG-IP iControl REST API')
+    parser.add_argument('--port', type=int, default=8443, help='Port to listen on (default: 8443)')
+    parser.add_argument('--virtuals', type=int, default=100, help='Number of virtual servers (and pools)')
+    parser.add_argument('--members-per-pool', type=int, default=4, help='Members (and nodes) per pool')
+    parser.add_argument('--partitions', type=int, default=4, help='Number of partitions')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+    parser.add_argument('--tls', action='store_true', help='Serve HTTPS with a self-signed certificate')
+    parser.add_argument('--max-rps', type=int, help='Answer 503 to requests above this many per second')
+    args = parser.parse_args()
+
+    device = MockDevice(args.virtuals, args.members_per_pool, args.partitions)
+    server = MockServer(device, args.port, args.latency, args.tls, args.max_rps)
+    print(f"Mock iControl REST serving {args.virtuals} virtual servers on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
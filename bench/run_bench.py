@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Benchmark the F5 collectors against a local mock iControl REST server.
+
+For every scale (number of virtual servers) a synthetic device is started
+(see mock_icontrol.py) and each collector is run against it in a fresh
+working directory. Per run the harness records:
+
+- exit status
+- wall time
+- requests served by the mock (login included), and how many of them it
+  shed with a 503 when --max-rps is set
+- peak RSS of the collector process
+
+Targets:
+    23_5_summary        --host/--username/--password CLI
+    41_5_vip            driven through F5Config(host, user, password)
+    bkp_pool_vip        driven through F5Config(address, user, password); needs TLS
+    6_25_partionsummar  inventory.json + API_USERNAME/API_PASSWORD; needs TLS
+
+bkp_pool_vip.py and 6_25_partionsummar.py build https:// URLs themselves, so
+they are only run when the mock can serve TLS (openssl on PATH).
+
+Usage:
+    python bench/run_bench.py --scale 10,1000,10000 --latency 0.005
+    python bench/run_bench.py --targets 23_5_summary --scale 50000 --json results.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_icontrol import MockDevice, MockServer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERNAME = 'bench'
+PASSWORD = 'bench'
+
+# Runs a collector that has no command line entry point by constructing its F5Config
+DRIVER = (
+    "import runpy, sys; sys.path.insert(0, {repo!r}); "
+    "module = runpy.run_path({script!r}); module['F5Config']({host!r}, {user!r}, {password!r})"
+)
+
+
+def driver_command(script, host):
+    return [sys.executable, '-c', DRIVER.format(repo=REPO_DIR, script=os.path.join(REPO_DIR, script),
+                                                host=host, user=USERNAME, password=PASSWORD)]
+
+
+def command_23_5(server, workdir):
+    return [sys.executable, os.path.join(REPO_DIR, '23_5_summary.py'), '--host', server.url,
+            '--username', USERNAME, '--password', PASSWORD]
+
+
+def command_41_5(server, workdir):
+    return driver_command('41_5_vip.py', server.url)
+
+
+def command_bkp_pool_vip(server, workdir):
+    return driver_command('bkp_pool_vip.py', server.address)
+
+
+def command_6_25(server, workdir):
+    # The script always reads inventory.json from its working directory
+    with open(os.path.join(workdir, 'inventory.json'), 'w') as f:
+        json.dump([{'dc': 'bench', 'device': server.address}], f)
+    return [sys.executable, os.path.join(REPO_DIR, '6_25_partionsummar.py'), '--workers', '1']
+
+
+# name -> (command builder, needs TLS)
+TARGETS = {
+    '23_5_summary': (command_23_5, False),
+    '41_5_vip': (command_41_5, False),
+    'bkp_pool_vip': (command_bkp_pool_vip, True),
+    '6_25_partionsummar': (command_6_25, True),
+}
+
+
+def run_target(name, server, timeout):
+    """Run one collector against the server and return its result row."""
+    build, _ = TARGETS[name]
+    workdir = tempfile.mkdtemp(prefix=f'bench_{name}_')
+    env = dict(os.environ, API_USERNAME=USERNAME, API_PASSWORD=PASSWORD, PYTHONPATH=REPO_DIR)
+    # requests lets these override session.verify = False, which would reject the self-signed mock
+    for variable in ('REQUESTS_CA_BUNDLE', 'CURL_CA_BUNDLE'):
+        env.pop(variable, None)
+    command = build(server, workdir)
+    server.reset_count()
+    log_path = os.path.join(workdir, 'output.log')
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        proc = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        deadline = start + timeout
+        status, rusage = None, None
+        while status is None:
+            pid, wait_status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                status, rusage = os.waitstatus_to_exitcode(wait_status), usage
+            elif time.perf_counter() > deadline:
+                proc.kill()
+                _, wait_status, rusage = os.wait4(proc.pid, 0)
+                status = 'timeout'
+            else:
+                time.sleep(0.01)
+        # os.wait4 reaped the child; keep Popen from trying again
+        proc.returncode = status if isinstance(status, int) else -9
+    elapsed = time.perf_counter() - start
+
+    with open(log_path) as log:
+        tail = log.read().strip().splitlines()[-1:] or ['']
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'target': name,
+        'status': 'ok' if status == 0 else (status if status == 'timeout' else f"exit {status}"),
+        'seconds': round(elapsed, 3),
+        'requests': server.requests,
+        'shed': server.shed,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': round(rusage.ru_maxrss / 1024, 1) if rusage else None,
+        'last_output': tail[0][:200] if status != 0 else ''
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the F5 collectors against a mock iControl REST server')
+    parser.add_argument('--scale', default='10,1000',
+                        help='Comma separated numbers of virtual servers to benchmark (default: 10,1000)')
+    parser.add_argument('--members-per-pool', type=int, default=4, help='Members (and nodes) per pool (default: 4)')
+    parser.add_argument('--partitions', type=int, default=4, help='Number of partitions (default: 4)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every mock request (default: 0)')
+    parser.add_argument('--max-rps', type=int, help='Have the mock answer 503 to requests above this many per second')
+    parser.add_argument('--targets', default=','.join(TARGETS),
+                        help=f"Comma separated collectors to run (default: {','.join(TARGETS)})")
+    parser.add_argument('--timeout', type=int, default=1800, help='Seconds before a run is killed (default: 1800)')
+    parser.add_argument('--no-tls', action='store_true',
+                        help='Serve plain HTTP; targets that need https:// are skipped')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    targets = [name.strip() for name in args.targets.split(',') if name.strip()]
+    unknown = [name for name in targets if name not in TARGETS]
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(unknown)}")
+    tls = not args.no_tls and shutil.which('openssl') is not None
+    if not tls and not args.no_tls:
+        print("openssl not found, serving plain HTTP")
+
+    results = []
+    header = f"{'scale':>7}  {'target':<20} {'status':<10} {'seconds':>9} {'requests':>9} {'shed':>6} {'peak RSS MB':>12}"
+    print(header)
+    print('-' * len(header))
+    for scale in (int(value) for value in args.scale.split(',')):
+        device = MockDevice(scale, args.members_per_pool, args.partitions)
+        server = MockServer(device, latency=args.latency, tls=tls, max_rps=args.max_rps).start()
+        try:
+            for name in targets:
+                if TARGETS[name][1] and not tls:
+                    row = {'target': name, 'status': 'skipped (needs TLS)', 'seconds': None,
+                           'requests': None, 'shed': None, 'peak_rss_mb': None, 'last_output': ''}
+                else:
+                    row = run_target(name, server, args.timeout)
+                row['scale'] = scale
+                results.append(row)
+                print(f"{scale:>7}  {name:<20} {row['status']:<10} {row['seconds'] or '-':>9} "
+                      f"{row['requests'] if row['requests'] is not None else '-':>9} "
+                      f"{row['shed'] if row['shed'] is not None else '-':>6} {row['peak_rss_mb'] or '-':>12}")
+                if row['last_output']:
+                    print(f"{'':>9}{row['last_output']}")
+        finally:
+            server.stop()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'latency': args.latency, 'max_rps': args.max_rps, 'members_per_pool': args.members_per_pool,
+                       'tls': tls, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,29 @@
 #!/usr/bin/env python
 
-from base64 import b64encode
 import json
 import os
 import sys
 import time
 import requests
-from urllib3.exceptions import InsecureRequestWarning
 from datetime import datetime
 import pprint
 import pandas as pd
+from f5_index import build_pool_vs_index, build_stats_index, canonical_path, PathIndex
+from f5_session import get_session_pool
+from f5_snapshot import write_snapshot
 
 
 class F5Config:
     
-    def __init__(self, bigip_address, username, password, debug=False):
+    def __init__(self, bigip_address, username, password, debug=False, snapshot=None):
         
         self.token = f5_auth_token(bigip_address, username, password, uri='/mgmt/shared/authn/login')
         self.debug = debug
         self.address= bigip_address
         self.username= username
         self.password= password
+        # Optional columnar snapshot format ('parquet' or 'arrow') written next to the Excel file
+        self.snapshot = snapshot
         
 
         vip_status(self)
@@ -29,28 +32,18 @@ class F5Config:
 def f5_auth_token(address, user, password,
                    uri='/mgmt/shared/authn/login'):  # -> unicode
     """Get and auth token( to be used but other requests"""
-    credentials_list = [user, ":", password]
-    credentials = ''.join(credentials_list)
-    user_and_pass = b64encode(credentials.encode()).decode("ascii")
-    headers = { 'Authorization':'Basic {}'.format(user_and_pass), 'Content-Type':'application/json'}
-    post_data = '{"username":"' + user + '","password":"' + password +'"}'
-    url_list = ['https://', address, uri]
-    url = ''.join(url_list)
-    requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+    # Tokens are cached per host by the shared session pool and refreshed before
+    # they expire, so this only logs in when there is no valid token yet
     try:
-        request_result = requests.post(url, headers=headers, data=post_data, verify=False)
+        return get_session_pool(user, password).token(address)
     except requests.exceptions.ConnectionError as connection_error:
         print(connection_error)
         sys.exit(connection_error)
     except requests.exceptions.RequestException as request_exception:
         print(request_exception)
         sys.exit(request_exception)
-    print (request_result.json())
-    if "token" not in request_result.json().keys(): 
-      #print ("issue in generating token")
-       sys.exit("issue in generating token")   
-    #returns an instance of unicode that is an auth token with 300 dec timeout
-    return request_result.json()['token']['token']
+    except KeyError:
+        sys.exit("issue in generating token")
 
 
 def  connectToF5(url, auth_token, debug=True, return_encoding='json'):
@@ -69,32 +62,28 @@ def  connectToF5(url, auth_token, debug=True, return_encoding='json'):
 
 def vip_status(self):
     BIGIP_IP = self.address
-    AUTH_TOKEN = self.token
    
-    # Headers with authentication token
-    headers = {
-        "X-F5-Auth-Token": AUTH_TOKEN,
-        "Content-Type": "application/json"
-    }
+    # Shared session; attaches (and renews) the auth token itself
+    session = get_session_pool(self.username, self.password).session(BIGIP_IP)
 
     # --- Fetch virtual server list ---
     def get_virtuals():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/virtual"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('items', [])
   
     # --- Fetch virtual server stats ---
     def get_virtual_stats():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/virtual/stats"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('entries', {})
   
     # --- Fetch all pools ---
     def get_pools():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('items', [])
   
@@ -102,7 +91,7 @@ def vip_status(self):
     def get_pool_members(pool_full_path):
         pool_uri = pool_full_path.replace('/', '~')
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool/{pool_uri}/members"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         if r.status_code == 200:
             return r.json().get('items', [])
         return []
@@ -141,6 +130,9 @@ def vip_status(self):
             vs_pool_map[vs_name] = pool
         vs_desc_map[vs_name] = desc
 
+    # Invert vs_pool_map once so each pool finds its virtual servers in O(1)
+    pool_vs_index = build_pool_vs_index(vs_pool_map)
+
     # --- Collect all data ---
     all_rows = []
     for pool in pools:
@@ -149,7 +141,7 @@ def vip_status(self):
         members = get_pool_members(pool_path)
 
         # Find which VSs use this pool
-        linked_vs_names = [k for k, v in vs_pool_map.items() if v == pool_path]
+        linked_vs_names = pool_vs_index.get(pool_path, [])
         if not linked_vs_names:
             linked_vs_names = ['Unlinked']
 
@@ -190,45 +182,46 @@ def vip_status(self):
     df.to_excel(filename, index=False)
     print(f"Excel file saved: {filename}")
 
------------------------------------------------------------------------------------------
+    # --- Optional columnar snapshot ---
+    if getattr(self, 'snapshot', None):
+        snapshot_files = write_snapshot({'vip_status': df}, filename.rsplit('.', 1)[0], self.snapshot, device=BIGIP_IP)
+        print(f"Snapshot saved: {', '.join(snapshot_files)}")
+
+# -----------------------------------------------------------------------------------------
 
 
 
 def vip_status(self):
     BIGIP_IP = self.address
-    AUTH_TOKEN = self.token
    
-    # Headers with authentication token
-    headers = {
-        "X-F5-Auth-Token": AUTH_TOKEN,
-        "Content-Type": "application/json"
-    }
+    # Shared session; attaches (and renews) the auth token itself
+    session = get_session_pool(self.username, self.password).session(BIGIP_IP)
 
     # --- Fetch virtual server list ---
     def get_virtuals():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/virtual"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('items', [])
   
     # --- Fetch virtual server stats ---
     def get_virtual_stats():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/virtual/stats"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('entries', {})
   
     # --- Fetch all pools ---
     def get_pools():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('items', [])
   
     # --- Fetch pool stats ---
     def get_pool_stats():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool/stats"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('entries', {})
 
@@ -236,7 +229,7 @@ def vip_status(self):
     def get_pool_members(pool_full_path):
         pool_uri = pool_full_path.replace('/', '~')
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool/{pool_uri}/members"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         if r.status_code == 200:
             return r.json().get('items', [])
         return []
@@ -247,115 +240,73 @@ def vip_status(self):
     pools = get_pools()
     pool_stats = get_pool_stats()
 
-    # --- Build virtual server info map (name → details) ---
-    vs_info_map = {}
-    for stat in stats.values():
-        nested = stat.get('nestedStats', {}).get('entries', {})
-        name = nested.get('tmName', {}).get('description', '')
-        # Handle both partition/name and name formats
-        if '/' in name:
-            partition, vs_name = name.split('/', 1)
-            full_path = f"/{partition}/{vs_name}"
-        else:
-            vs_name = name
-            full_path = f"/Common/{name}"
-        
+    # --- Build virtual server info map (fullPath → details) ---
+    def parse_vs_stats(nested):
         dest = nested.get('destination', {}).get('description', '')
-        status = nested.get('status.availabilityState', {}).get('description', '')
-        status_desc = nested.get('status.statusReason', {}).get('description', '')
-        port = dest.split(':')[-1] if ':' in dest else 'N/A'
-        
-        # Store with all possible name formats
-        vs_info_map[name] = {
+        return {
             'destination': dest,
-            'port': port,
-            'status': status,
-            'status_desc': status_desc
+            'port': dest.split(':')[-1] if ':' in dest else 'N/A',
+            'status': nested.get('status.availabilityState', {}).get('description', ''),
+            'status_desc': nested.get('status.statusReason', {}).get('description', '')
         }
-        vs_info_map[vs_name] = vs_info_map[name]
-        vs_info_map[full_path] = vs_info_map[name]
 
-    # --- Build pool info map (name → details) ---
-    pool_info_map = {}
-    for stat in pool_stats.values():
-        nested = stat.get('nestedStats', {}).get('entries', {})
-        name = nested.get('tmName', {}).get('description', '')
-        # Handle both partition/name and name formats
-        if '/' in name:
-            partition, pool_name = name.split('/', 1)
-            full_path = f"/{partition}/{pool_name}"
-        else:
-            pool_name = name
-            full_path = f"/Common/{name}"
-        
-        status = nested.get('status.availabilityState', {}).get('description', '')
-        status_desc = nested.get('status.statusReason', {}).get('description', '')
-        active_members = nested.get('activeMemberCount', {}).get('value', 0)
-        total_members = nested.get('memberCount', {}).get('value', 0)
-        
-        # Store with all possible name formats
-        pool_info_map[name] = {
-            'status': status,
-            'status_desc': status_desc,
-            'active_members': active_members,
-            'total_members': total_members
+    # --- Build pool info map (fullPath → details) ---
+    def parse_pool_stats(nested):
+        return {
+            'status': nested.get('status.availabilityState', {}).get('description', ''),
+            'status_desc': nested.get('status.statusReason', {}).get('description', ''),
+            'active_members': nested.get('activeMemberCount', {}).get('value', 0),
+            'total_members': nested.get('memberCount', {}).get('value', 0)
         }
-        pool_info_map[pool_name] = pool_info_map[name]
-        pool_info_map[full_path] = pool_info_map[name]
 
-    # Map virtual server name to its pool and description
-    vs_pool_map = {}
-    vs_desc_map = {}
+    # Each entry is stored once under its canonical fullPath; lookups by
+    # name, partition/name, /Common/name, route domain or iApp path all
+    # resolve to the same key
+    vs_info_map = build_stats_index(stats, parse_vs_stats)
+    pool_info_map = build_stats_index(pool_stats, parse_pool_stats)
+
+    # Map virtual server fullPath to its name, pool and description
+    vs_pool_map = PathIndex()
+    vs_name_map = PathIndex()
+    vs_desc_map = PathIndex()
     for vs in virtuals:
         full_path = vs['fullPath']  # e.g., /Common/vs_web
-        vs_name = vs['name']
         pool = vs.get('pool', None)  # e.g., /Common/pool_web
         
-        # Handle pool path
         if pool:
-            if not pool.startswith('/'):
-                pool = f"/Common/{pool}"
-            vs_pool_map[vs_name] = pool
-            vs_pool_map[full_path] = pool
+            vs_pool_map[full_path] = canonical_path(pool)
         
-        desc = vs.get('description', '')
-        vs_desc_map[vs_name] = desc
-        vs_desc_map[full_path] = desc
+        vs_name_map[full_path] = vs['name']
+        vs_desc_map[full_path] = vs.get('description', '')
+
+    # Invert vs_pool_map once so each pool finds its virtual servers in O(1)
+    pool_vs_index = build_pool_vs_index(vs_pool_map)
 
     # --- Collect all data ---
     all_rows = []
     for pool in pools:
-        pool_path = pool['fullPath']
-        if not pool_path.startswith('/'):
-            pool_path = f"/Common/{pool_path}"
+        pool_path = canonical_path(pool['fullPath'])
             
         members = get_pool_members(pool_path)
         
-        # Get pool stats - try all possible name formats
-        pool_info = (
-            pool_info_map.get(pool_path) or 
-            pool_info_map.get(pool['name']) or 
-            pool_info_map.get(f"/Common/{pool['name']}") or 
-            {}
-        )
+        pool_info = pool_info_map.get(pool_path, {})
 
-        # Find which VSs use this pool
-        linked_vs_names = [k for k, v in vs_pool_map.items() if v == pool_path]
-        if not linked_vs_names:
-            linked_vs_names = ['Unlinked']
+        # Find which VSs use this pool; None stands for a pool no VS uses,
+        # so 'Unlinked' is never looked up (and canonicalised) in the indexes
+        linked_vs_paths = pool_vs_index.get(pool_path) or [None]
 
-        for vs_name in linked_vs_names:
-            # Try all possible name formats for virtual server info
-            vs_info = (
-                vs_info_map.get(f"/Common/{vs_name}") or 
-                vs_info_map.get(vs_name) or 
-                vs_info_map.get(f"/{vs_name}") or 
-                {}
-            )
+        for vs_path in linked_vs_paths:
+            if vs_path is None:
+                vs_name, vs_desc, vs_info = 'Unlinked', '', {}
+            else:
+                # Rows are keyed by fullPath but the column keeps the bare name
+                vs_name = vs_name_map.get(vs_path, vs_path)
+                vs_desc = vs_desc_map.get(vs_path, '')
+                vs_info = vs_info_map.get(vs_path, {})
             
             row_base = {
                 'Virtual Server': vs_name,
-                'VS Description': vs_desc_map.get(vs_name, ''),
+                'VS Description': vs_desc,
                 'Destination': vs_info.get('destination', ''),
                 'Service Port': vs_info.get('port', ''),
                 'VS Status': vs_info.get('status', ''),
@@ -391,3 +342,8 @@ def vip_status(self):
     filename = f"{BIGIP_IP}_f5_summary_{timestamp}.xlsx"
     df.to_excel(filename, index=False)
     print(f"Excel file saved: {filename}")
+
+    # --- Optional columnar snapshot ---
+    if getattr(self, 'snapshot', None):
+        snapshot_files = write_snapshot({'vip_status': df}, filename.rsplit('.', 1)[0], self.snapshot, device=BIGIP_IP)
+        print(f"Snapshot saved: {', '.join(snapshot_files)}")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+"""
+asyncio iControl REST client for the F5 collector scripts.
+
+F5Config.get_json is synchronous, so the virtual/pool/node list and stats
+collections are fetched one after another. AsyncF5Client has the same
+get_json contract (decoded JSON, or None after logging the failure) on top
+of aiohttp:
+
+- one keep-alive connection pool per host, capped at limit_per_host
+- the X-F5-Auth-Token is cached and renewed once on a 401, as in f5_session
+- requests pass through the device's HostGuard (f5_throttle), so the rate
+  limit, retries and circuit breaker are shared with the sync sessions
+- prefetch() fetches many collections at once, following nextLink paging,
+  so the six list/stats calls of a report cost about as much as the slowest one
+- fetch_fleet() multiplexes many BIG-IPs on a single event loop
+
+The synchronous collectors use it through prefetch_device() (one device,
+23_5_summary and 15_5_vip with --async) and iter_fleet() (a batch of
+inventory devices at a time, 27_5_csv and 28_5_vpmp_summary with --async):
+the responses are handed to F5Config, whose get_json serves them first.
+
+Requires aiohttp; the collectors only import it when async fetching is requested.
+
+Usage:
+    from f5_async_client import AsyncF5Client, fetch_fleet
+    async with AsyncF5Client('10.1.1.245', username, password) as client:
+        data = await client.get_json('/mgmt/tm/ltm/virtual')
+        pages = await client.prefetch(['/mgmt/tm/ltm/virtual/stats', '/mgmt/tm/ltm/pool/stats'])
+
+    results = asyncio.run(fetch_fleet(hosts, username, password, endpoints))
+
+    from f5_async_client import iter_fleet
+    for host, prefetched in iter_fleet(hosts, username, password, endpoints):
+        ...
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+
+from f5_session import (LOGIN_URI, DEFAULT_TOKEN_TIMEOUT, TOKEN_REFRESH_MARGIN, DEFAULT_POOL_MAXSIZE,
+                        base_url, json_loads, next_page_endpoint)
+from f5_throttle import host_guard
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a single request is abandoned
+DEFAULT_TIMEOUT = 120
+# Seconds an idle keep-alive connection is kept open
+KEEPALIVE_TIMEOUT = 30
+# Devices prefetched together by iter_fleet; bounds the responses held in memory
+DEFAULT_FLEET_BATCH = 8
+
+
+def create_session(verify_ssl=False, limit_per_host=DEFAULT_POOL_MAXSIZE, timeout=DEFAULT_TIMEOUT):
+    """Create an aiohttp session whose connector keeps at most limit_per_host connections per device."""
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=limit_per_host,
+                                     ssl=None if verify_ssl else False,
+                                     keepalive_timeout=KEEPALIVE_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, json_serialize=json.dumps,
+                                 timeout=aiohttp.ClientTimeout(total=timeout),
+                                 headers={'Content-Type': 'application/json'})
+
+
+class AsyncF5Client:
+    """asyncio client for one BIG-IP; several clients may share one aiohttp session."""
+
+    def __init__(self, host, username, password, verify_ssl=False, limit_per_host=DEFAULT_POOL_MAXSIZE,
+                 session=None, response_cache=None, metrics=None, login_provider='tmos'):
+        self.F5_HOST = base_url(host)
+        self.USERNAME = username
+        self.PASSWORD = password
+        self.login_provider = login_provider
+        self.verify_ssl = verify_ssl
+        self.limit_per_host = limit_per_host
+        # A session passed in is shared with other clients and closed by its owner
+        self.session = session
+        self._owns_session = session is None
+        self.response_cache = response_cache
+        self.metrics = metrics
+        # Rate limit, retries and circuit breaker shared with the sync sessions (see f5_throttle.py)
+        self.guard = host_guard(self.F5_HOST)
+        # (endpoint, seconds) for every request, as F5Config.request_timings
+        self.request_timings = []
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        if self.session is None:
+            self.session = create_session(self.verify_ssl, self.limit_per_host)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def token(self):
+        """Return a valid auth token, logging in only when needed."""
+        if self._token and self._token_expires - TOKEN_REFRESH_MARGIN > time.monotonic():
+            return self._token
+        async with self._token_lock:
+            # Another request may have logged in while we waited
+            if self._token and self._token_expires - TOKEN_REFRESH_MARGIN > time.monotonic():
+                return self._token
+            auth_data = {
+                "username": self.USERNAME,
+                "password": self.PASSWORD,
+                "loginProviderName": self.login_provider
+            }
+            resp, body = await self._request('POST', f"{self.F5_HOST}{LOGIN_URI}", json=auth_data)
+            resp.raise_for_status()
+            token = json_loads(body)['token']
+            self._token = token['token']
+            self._token_expires = time.monotonic() + int(token.get('timeout') or DEFAULT_TOKEN_TIMEOUT)
+            return self._token
+
+    def invalidate(self):
+        """Drop the cached token so the next request logs in again."""
+        self._token = None
+
+    async def _request(self, method, url, **kwargs):
+        """Send a request through the device's HostGuard and return (response, body)."""
+        for attempt in self.guard.attempts():
+            await asyncio.sleep(self.guard.before_request(attempt))
+            start = time.perf_counter()
+            try:
+                async with self.session.request(method, url, **kwargs) as resp:
+                    seconds = time.perf_counter() - start
+                    body = await resp.read()
+            except aiohttp.ClientConnectionError as e:
+                delay = self.guard.after_error(attempt, retry=not isinstance(e, aiohttp.ClientSSLError))
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.guard.after_error(attempt, retry=False)
+                raise
+            delay = self.guard.after_response(attempt, seconds, resp.status, resp.headers.get('Retry-After'))
+            if delay is None:
+                return resp, body
+            await asyncio.sleep(delay)
+
+    async def get_body(self, endpoint):
+        """GET an endpoint and return the raw response body, renewing the token once on a 401."""
+        url = f"{self.F5_HOST}{endpoint}"
+        for attempt in range(2):
+            headers = {'X-F5-Auth-Token': await self.token()}
+            resp, body = await self._request('GET', url, headers=headers)
+            if resp.status == 401 and attempt == 0:
+                self.invalidate()
+                continue
+            resp.raise_for_status()
+            return body
+
+    async def get_json(self, endpoint):
+        """Get data from F5 API endpoint."""
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.F5_HOST, endpoint)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        nbytes = 0
+        decode_seconds = 0.0
+        failed = False
+        try:
+            body = await self.get_body(endpoint)
+            nbytes = len(body)
+            decode_start = time.perf_counter()
+            data = json_loads(body)
+            decode_seconds = time.perf_counter() - decode_start
+            if self.response_cache is not None:
+                self.response_cache.put(self.F5_HOST, endpoint, body)
+            return data
+        except Exception as e:
+            failed = True
+            logger.error(f"Failed to get data from {self.F5_HOST}{endpoint}: {str(e)}")
+            return None
+        finally:
+            elapsed = time.perf_counter() - start
+            self.request_timings.append((endpoint, elapsed))
+            if self.metrics is not None:
+                self.metrics.record_request(endpoint, elapsed, nbytes, decode_seconds, failed)
+
+    async def get_pages(self, endpoint):
+        """Return [(endpoint, page), ...] for an endpoint and every page reached through nextLink."""
+        pages = []
+        while endpoint:
+            page = await self.get_json(endpoint)
+            if page is None:
+                break
+            pages.append((endpoint, page))
+            endpoint = next_page_endpoint(page)
+        return pages
+
+    async def prefetch(self, endpoints):
+        """Fetch many endpoints concurrently, following paging.
+
+        Returns a dict mapping every fetched endpoint (each page under the
+        endpoint the sync client would request it by) to its decoded JSON.
+        Endpoints that fail are left out.
+        """
+        results = {}
+        for pages in await asyncio.gather(*(self.get_pages(endpoint) for endpoint in endpoints)):
+            results.update(pages)
+        return results
+
+
+async def fetch_fleet(hosts, username, password, endpoints, verify_ssl=False,
+                      limit_per_host=DEFAULT_POOL_MAXSIZE):
+    """Prefetch the same endpoints from many devices on one event loop.
+
+    All devices share one aiohttp session; the connector caps the
+    connections to each device at limit_per_host. Returns a dict mapping
+    each host to its prefetch() result ({} if the device could not be reached).
+    """
+    async with create_session(verify_ssl, limit_per_host) as session:
+        clients = [AsyncF5Client(host, username, password, verify_ssl, limit_per_host, session=session)
+                   for host in hosts]
+        results = await asyncio.gather(*(client.prefetch(endpoints) for client in clients),
+                                       return_exceptions=True)
+    fleet = {}
+    for host, result in zip(hosts, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Failed to fetch {host}: {str(result)}")
+            result = {}
+        fleet[host] = result
+    return fleet
+
+
+def prefetch_device(host, username, password, endpoints, verify_ssl=False, limit_per_host=DEFAULT_POOL_MAXSIZE,
+                    response_cache=None, metrics=None, request_timings=None):
+    """Run AsyncF5Client.prefetch for one device from synchronous code and return its result.
+
+    request_timings, if given, is extended with the (endpoint, seconds) of every request made.
+    """
+    async def fetch():
+        async with AsyncF5Client(host, username, password, verify_ssl, limit_per_host,
+                                 response_cache=response_cache, metrics=metrics) as client:
+            try:
+                return await client.prefetch(endpoints)
+            finally:
+                if request_timings is not None:
+                    request_timings.extend(client.request_timings)
+
+    return asyncio.run(fetch())
+
+
+def iter_fleet(hosts, username, password, endpoints, batch_size=DEFAULT_FLEET_BATCH, verify_ssl=False,
+               limit_per_host=DEFAULT_POOL_MAXSIZE):
+    """Yield (host, prefetched) for every host, fetching batch_size devices at a time with fetch_fleet.
+
+    Only one batch of responses is held in memory, so a collector can still
+    write its output device by device.
+    """
+    hosts = list(hosts)
+    batch_size = max(1, int(batch_size))
+    for start in range(0, len(hosts), batch_size):
+        batch = hosts[start:start + batch_size]
+        fleet = asyncio.run(fetch_fleet(batch, username, password, endpoints, verify_ssl, limit_per_host))
+        for host in batch:
+            yield host, fleet[host]
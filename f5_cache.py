@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Persistent SQLite cache of iControl REST responses.
+
+Sits in front of F5Config.get_json so ad-hoc reruns of a report (during an
+incident, say) are answered locally instead of hitting the same device
+again. Entries are keyed by device and endpoint and expire per endpoint:
+
+- config endpoints (/mgmt/tm/ltm/virtual, .../node, ...) live CONFIG_TTL seconds
+- endpoints carrying live status live STATS_TTL seconds: /stats, pool
+  /members, and pool collections with expandSubcollections=true (member
+  state and session are monitor results)
+- change-detection requests, which $select generation/lastModifiedTime
+  (see f5_incremental.py), are never cached; a cached answer would hide
+  the very changes they look for
+
+When the stored bodies exceed max_bytes the least recently used entries
+are evicted.
+
+Usage:
+    from f5_cache import ResponseCache
+    cache = ResponseCache('.f5_response_cache.sqlite')
+    data = cache.get(host, endpoint)
+    if data is None:
+        ...
+        cache.put(host, endpoint, resp.content)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qs
+
+from f5_session import json_loads
+
+DEFAULT_CACHE_FILE = '.f5_response_cache.sqlite'
+# Seconds a cached config response stays valid
+CONFIG_TTL = 900
+# Seconds a cached /stats (or other live status) response stays valid
+STATS_TTL = 30
+# $select fields that mark a change-detection request
+CHANGE_MARKER_FIELDS = ('generation', 'lastModifiedTime')
+# Total size of the cached bodies before LRU eviction kicks in
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _split(endpoint):
+    path, _, query = endpoint.partition('?')
+    return path.rstrip('/'), parse_qs(query)
+
+
+def is_live_endpoint(endpoint):
+    """Return True for endpoints whose data changes from second to second.
+
+    That is /stats, pool members and expanded pool collections, whose
+    member state and session carry the monitor status.
+    """
+    path, query = _split(endpoint)
+    if path.endswith('/stats') or path.endswith('/members'):
+        return True
+    return path.endswith('/ltm/pool') and query.get('expandSubcollections', [''])[0] == 'true'
+
+
+def is_cacheable(endpoint):
+    """Return False for change-detection requests, which must always reach the device."""
+    _, query = _split(endpoint)
+    selected = ','.join(query.get('$select', [])).split(',')
+    return not any(field in selected for field in CHANGE_MARKER_FIELDS)
+
+
+class ResponseCache:
+    """SQLite-backed response cache with per-endpoint TTL and LRU eviction by size."""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, config_ttl=CONFIG_TTL, stats_ttl=STATS_TTL,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.config_ttl = config_ttl
+        self.stats_ttl = stats_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the worker threads, serialised by a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' device TEXT NOT NULL,'
+            ' endpoint TEXT NOT NULL,'
+            ' body BLOB NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' stored_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL,'
+            ' PRIMARY KEY (device, endpoint))'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+
+    def ttl(self, endpoint):
+        """Return how long a response of this endpoint may be served from the cache."""
+        return self.stats_ttl if is_live_endpoint(endpoint) else self.config_ttl
+
+    def get(self, device, endpoint):
+        """Return the decoded cached response, or None if missing, expired or not cacheable."""
+        if not is_cacheable(endpoint):
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body, stored_at FROM responses WHERE device = ? AND endpoint = ?',
+                (device, endpoint)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl(endpoint):
+                self.misses += 1
+                return None
+            self._db.execute(
+                'UPDATE responses SET accessed_at = ? WHERE device = ? AND endpoint = ?',
+                (now, device, endpoint)
+            )
+            self.hits += 1
+        return json_loads(row[0])
+
+    def put(self, device, endpoint, body):
+        """Store a raw JSON response body (bytes) and evict old entries if over max_bytes."""
+        now = time.time()
+        size = len(body)
+        if size > self.max_bytes or not is_cacheable(endpoint):
+            return
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (device, endpoint, body, size, stored_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (device, endpoint, body, size, now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for device, endpoint, size in self._db.execute(
+                'SELECT device, endpoint, size FROM responses ORDER BY accessed_at'):
+            victims.append((device, endpoint))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._db.executemany('DELETE FROM responses WHERE device = ? AND endpoint = ?', victims)
+
+    def clear(self, device=None):
+        """Drop all cached responses, or only those of one device."""
+        with self._lock:
+            if device is None:
+                self._db.execute('DELETE FROM responses')
+            else:
+                self._db.execute('DELETE FROM responses WHERE device = ?', (device,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""
+Fleet-wide SQLite index of virtual servers, pools, members and nodes.
+
+During an incident the question is usually "which VIPs depend on this
+node?" across every BIG-IP, which used to mean grepping through one Excel
+or CSV report per device. The collectors (23_5_summary.py and
+28_5_vpmp_summary.py with --fleet-index) write what they collected into one
+local SQLite file, replacing the previous rows of the device, and the
+query command answers from indexes in milliseconds:
+
+- virtual server name (exact, or a glob such as 'app_*')
+- destination ip or ip:port
+- pool name or full path
+- member / node address (route domain suffixes such as %2 are stripped)
+- partition and device
+
+Devices are keyed by their management host (see device_key), so the same
+BIG-IP collected by either collector, by IP, URL or host:443, replaces one
+set of rows instead of being indexed twice.
+
+Usage:
+    python f5_fleet_index.py query --member 10.1.20.15
+    python f5_fleet_index.py query --destination 10.10.1.80:443
+    python f5_fleet_index.py query --vs 'app_*' --partition Tenant1 --json
+    python f5_fleet_index.py devices
+
+    from f5_fleet_index import FleetIndex
+    index = FleetIndex()
+    index.replace_device('https://bigip1.example.com', vs_data, pool_data, node_data, dc='DC1')
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_INDEX_FILE = 'f5_fleet_index.sqlite'
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS devices ('
+    ' device TEXT PRIMARY KEY, dc TEXT, tier TEXT, indexed_at TEXT,'
+    ' virtuals INTEGER, pools INTEGER, members INTEGER, nodes INTEGER)',
+    'CREATE TABLE IF NOT EXISTS virtuals ('
+    ' device TEXT NOT NULL, name TEXT, full_path TEXT, partition TEXT, description TEXT,'
+    ' destination_ip TEXT, destination_port TEXT, pool TEXT,'
+    ' availability TEXT, enabled TEXT, status_reason TEXT)',
+    'CREATE TABLE IF NOT EXISTS pools ('
+    ' device TEXT NOT NULL, full_path TEXT, name TEXT, partition TEXT, monitor TEXT,'
+    ' availability TEXT, enabled TEXT, status_reason TEXT, active_members INTEGER, total_members INTEGER)',
+    'CREATE TABLE IF NOT EXISTS members ('
+    ' device TEXT NOT NULL, pool TEXT, name TEXT, address TEXT, port TEXT, state TEXT, session TEXT)',
+    'CREATE TABLE IF NOT EXISTS nodes ('
+    ' device TEXT NOT NULL, address TEXT, name TEXT, full_path TEXT, partition TEXT,'
+    ' availability TEXT, enabled TEXT, status_reason TEXT)',
+    'CREATE INDEX IF NOT EXISTS virtuals_name ON virtuals (name)',
+    'CREATE INDEX IF NOT EXISTS virtuals_destination ON virtuals (destination_ip, destination_port)',
+    'CREATE INDEX IF NOT EXISTS virtuals_pool ON virtuals (device, pool)',
+    'CREATE INDEX IF NOT EXISTS virtuals_partition ON virtuals (partition)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS pools_path ON pools (device, full_path)',
+    'CREATE INDEX IF NOT EXISTS pools_name ON pools (name)',
+    'CREATE INDEX IF NOT EXISTS members_address ON members (address)',
+    'CREATE INDEX IF NOT EXISTS members_pool ON members (device, pool)',
+    'CREATE INDEX IF NOT EXISTS nodes_address ON nodes (address)',
+    'CREATE INDEX IF NOT EXISTS nodes_device ON nodes (device)',
+)
+
+# Columns returned by query(); member columns are only filled for --member queries
+RESULT_COLUMNS = ('device', 'dc', 'name', 'full_path', 'partition', 'destination_ip', 'destination_port',
+                  'availability', 'enabled', 'pool', 'pool_availability',
+                  'member_address', 'member_port', 'member_state', 'member_session', 'node_availability')
+
+
+def field(item, name, default=''):
+    """Read a field from a collector record (slotted dataclass) or a plain dict."""
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def device_key(host):
+    """Return the key a device is indexed under: its management host:port, without scheme, path or :443.
+
+    'https://10.1.1.245/', '10.1.1.245:443' and '10.1.1.245' all give '10.1.1.245'.
+    """
+    key = str(host).strip().lower()
+    if '://' in key:
+        key = key.split('://', 1)[1]
+    key = key.split('/', 1)[0]
+    if key.endswith(':443'):
+        key = key[:-len(':443')]
+    return key
+
+
+def strip_route_domain(address):
+    """Drop a %<route domain> suffix so 10.1.1.5%2 is found as 10.1.1.5."""
+    return address.split('%', 1)[0] if address else address
+
+
+def member_port(member):
+    """Return a member's port, falling back to the part after the last ':' of its name."""
+    port = field(member, 'port')
+    if port in ('', None):
+        name = field(member, 'name')
+        port = name.rsplit(':', 1)[-1] if ':' in name else ''
+    return str(port)
+
+
+def split_destination(value):
+    """Split 'ip:port' (or a bare ip / IPv6 address) into (ip, port or None)."""
+    if value.count(':') == 1:
+        ip, port = value.split(':')
+        return ip, port or None
+    return value, None
+
+
+def match(column, value):
+    """Return a (condition, parameter) pair: GLOB for patterns with * ? or [, otherwise equality."""
+    if any(char in value for char in '*?['):
+        return f"{column} GLOB ?", value
+    return f"{column} = ?", value
+
+
+class FleetIndex:
+    """SQLite store of the virtual server / pool / member / node tables of many devices."""
+
+    def __init__(self, path=DEFAULT_INDEX_FILE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        # Queries keep working while a collector replaces a device
+        self._db.execute('PRAGMA journal_mode=WAL')
+        for statement in SCHEMA:
+            self._db.execute(statement)
+
+    def replace_device(self, device, vs_data, pool_data, node_data, dc='', tier=''):
+        """Replace everything indexed for a device with freshly collected data.
+
+        device is the management host or URL the device was collected from,
+        stored as device_key(device). vs_data is the collector's list of
+        virtual servers, pool_data maps pool fullPath to a pool with a
+        members list, and node_data maps node address to a node; records and
+        dicts are both accepted.
+        """
+        device = device_key(device)
+        virtuals = [
+            (device, field(vs, 'name'), field(vs, 'fullPath'), field(vs, 'partition'), field(vs, 'description'),
+             field(vs, 'destination_ip'), str(field(vs, 'destination_port')), field(vs, 'pool'),
+             field(vs, 'availabilityState'), field(vs, 'enabledState'), field(vs, 'statusReason'))
+            for vs in vs_data
+        ]
+        pools = []
+        members = []
+        for full_path, pool in pool_data.items():
+            pools.append((device, full_path, field(pool, 'name'), field(pool, 'partition'), field(pool, 'monitor'),
+                          field(pool, 'availabilityState'), field(pool, 'enabledState'),
+                          field(pool, 'statusReason'), field(pool, 'activeMemberCount', None),
+                          field(pool, 'totalMemberCount', None)))
+            for member in field(pool, 'members', []):
+                members.append((device, full_path, field(member, 'name'),
+                                strip_route_domain(field(member, 'address')), member_port(member),
+                                field(member, 'state'), field(member, 'session')))
+        nodes = [
+            (device, strip_route_domain(address), field(node, 'name'), field(node, 'fullPath'),
+             field(node, 'partition'), field(node, 'availabilityState'), field(node, 'enabledState'),
+             field(node, 'statusReason'))
+            for address, node in node_data.items()
+        ]
+
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                for table in ('virtuals', 'pools', 'members', 'nodes'):
+                    self._db.execute(f'DELETE FROM {table} WHERE device = ?', (device,))
+                self._db.executemany('INSERT INTO virtuals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', virtuals)
+                self._db.executemany('INSERT INTO pools VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', pools)
+                self._db.executemany('INSERT INTO members VALUES (?, ?, ?, ?, ?, ?, ?)', members)
+                self._db.executemany('INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)', nodes)
+                # 23_5_summary has no inventory; keep the dc/tier 28_5_vpmp_summary recorded
+                known = self._db.execute('SELECT dc, tier FROM devices WHERE device = ?', (device,)).fetchone()
+                if known is not None:
+                    dc = dc or known['dc'] or ''
+                    tier = tier or known['tier'] or ''
+                self._db.execute(
+                    'INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (device, dc, tier, datetime.now().isoformat(timespec='seconds'),
+                     len(virtuals), len(pools), len(members), len(nodes))
+                )
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def query(self, vs=None, destination=None, pool=None, member=None, partition=None, device=None):
+        """Return the virtual servers matching every given filter, as dicts with RESULT_COLUMNS.
+
+        With member, there is one row per matching pool member, showing
+        which VIPs depend on that address.
+        """
+        conditions = []
+        params = []
+
+        def add(condition_param):
+            conditions.append(condition_param[0])
+            params.append(condition_param[1])
+
+        if vs:
+            add(match('v.name', vs))
+        if destination:
+            ip, port = split_destination(destination)
+            add(match('v.destination_ip', ip))
+            if port:
+                add(match('v.destination_port', port))
+        if pool:
+            # A full path (/Common/web_pool) matches the VS's pool, a bare name the pool's name
+            add(match('v.pool' if pool.startswith('/') else 'p.name', pool))
+        if member:
+            add(match('m.address', strip_route_domain(member)))
+        if partition:
+            add(match('v.partition', partition))
+        if device:
+            add(match('v.device', device if any(char in device for char in '*?[') else device_key(device)))
+
+        member_columns = ('m.address, m.port, m.state, m.session, n.availability' if member
+                          else "'', '', '', '', ''")
+        sql = (
+            f"SELECT v.device, d.dc, v.name, v.full_path, v.partition, v.destination_ip, v.destination_port,"
+            f" v.availability, v.enabled, v.pool, p.availability, {member_columns}"
+            f" FROM virtuals v"
+            f" LEFT JOIN devices d ON d.device = v.device"
+            f" LEFT JOIN pools p ON p.device = v.device AND p.full_path = v.pool"
+        )
+        if member:
+            sql += (" JOIN members m ON m.device = v.device AND m.pool = v.pool"
+                    " LEFT JOIN nodes n ON n.device = m.device AND n.address = m.address")
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY v.device, v.full_path'
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [dict(zip(RESULT_COLUMNS, ('' if value is None else value for value in row))) for row in rows]
+
+    def devices(self):
+        """Return the indexed devices with when they were last indexed and their object counts."""
+        with self._lock:
+            rows = self._db.execute('SELECT * FROM devices ORDER BY device').fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def print_table(rows, columns):
+    """Print rows as an aligned text table."""
+    widths = {column: max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns}
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    print('  '.join('-' * widths[column] for column in columns))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the fleet-wide F5 VIP/pool/member index')
+    parser.add_argument('--index', default=DEFAULT_INDEX_FILE, help=f'Index file (default: {DEFAULT_INDEX_FILE})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', help='Find virtual servers by name, destination, pool, member or partition')
+    query.add_argument('--vs', help="Virtual server name, or a glob such as 'app_*'")
+    query.add_argument('--destination', help='Destination ip or ip:port')
+    query.add_argument('--pool', help='Pool name, or full path such as /Common/web_pool')
+    query.add_argument('--member', help='Pool member / node address: which VIPs depend on it')
+    query.add_argument('--partition', help='Partition')
+    query.add_argument('--device', help='Limit to one device (management host or URL)')
+    query.add_argument('--json', action='store_true', help='Print the matches as JSON')
+
+    commands.add_parser('devices', help='List the indexed devices')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        parser.error(f"Index {args.index} not found; collect with --fleet-index first")
+    index = FleetIndex(args.index)
+    try:
+        if args.command == 'devices':
+            devices = index.devices()
+            if devices:
+                print_table(devices, list(devices[0].keys()))
+            return
+
+        filters = {name: getattr(args, name) for name in ('vs', 'destination', 'pool', 'member', 'partition', 'device')}
+        if not any(filters.values()):
+            parser.error('query needs at least one of --vs, --destination, --pool, --member, --partition, --device')
+        start = time.perf_counter()
+        rows = index.query(**filters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if args.json:
+            json.dump(rows, sys.stdout, indent=2)
+            print()
+            return
+        columns = ['device', 'dc', 'name', 'partition', 'destination_ip', 'destination_port', 'availability', 'pool',
+                   'pool_availability']
+        if args.member:
+            columns += ['member_address', 'member_port', 'member_state', 'node_availability']
+        if rows:
+            print_table(rows, columns)
+        print(f"\n{len(rows)} matches in {elapsed_ms:.1f} ms")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+On-disk cache of the last collected F5 config, for incremental collection.
+
+Every config object returned by iControl REST carries a `generation` and a
+`lastModifiedTime`. The cache keeps the last collected items of each
+collection keyed by device and fullPath, so a collector can first probe a
+collection with $select=fullPath,generation,lastModifiedTime and then only
+refetch the objects whose markers changed. Stats are never cached.
+
+One JSON file is kept per device:
+
+    <cache_dir>/<device>_config.json
+    {"virtual": {"/Common/vs_web": {...item...}, ...}, "node": {...}}
+
+Usage:
+    from f5_incremental import ConfigCache, CHANGE_FIELDS
+    cache = ConfigCache('.f5_config_cache', '10.1.1.245')
+    cached = cache.items('virtual')
+    ...
+    cache.update('virtual', items)
+    cache.save()
+"""
+
+import json
+import os
+import re
+import threading
+
+# Fields compared to decide whether an object changed since the last run
+CHANGE_FIELDS = ('generation', 'lastModifiedTime')
+# Fields requested when probing a collection for changes
+PROBE_FIELDS = ('fullPath',) + CHANGE_FIELDS
+DEFAULT_CACHE_DIR = '.f5_config_cache'
+
+
+def change_marker(item):
+    """Return the (generation, lastModifiedTime) pair of a config item."""
+    return tuple(item.get(field) for field in CHANGE_FIELDS)
+
+
+def item_endpoint(collection_endpoint, full_path):
+    """Return the endpoint of a single object, e.g. /mgmt/tm/ltm/virtual/~Common~vs_web."""
+    return f"{collection_endpoint}/{full_path.replace('/', '~')}"
+
+
+class ConfigCache:
+    """Last collected config items of one device, keyed by collection and fullPath."""
+
+    def __init__(self, cache_dir, device):
+        self.cache_dir = cache_dir
+        safe_device = re.sub(r'[^A-Za-z0-9_.-]', '_', device.replace('https://', '').replace('http://', ''))
+        self.path = os.path.join(cache_dir, f"{safe_device}_config.json")
+        self._collections = self._load()
+        # Collections may be collected (and saved) from several threads at once
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def items(self, kind):
+        """Return the cached {fullPath: item} map of a collection (empty if never collected)."""
+        return self._collections.get(kind, {})
+
+    def update(self, kind, items):
+        """Replace the cached items of a collection; objects no longer present are dropped."""
+        collection = {item['fullPath']: item for item in items if item.get('fullPath')}
+        with self._lock:
+            self._collections[kind] = collection
+
+    def save(self):
+        """Write the cache file atomically."""
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = f"{self.path}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(self._collections, f)
+            os.replace(tmp_file, self.path)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+In-memory lookup indexes shared by the VIP/pool report scripts.
+
+Usage:
+    from f5_index import build_pool_vs_index
+    pool_vs_index = build_pool_vs_index(vs_pool_map)
+    linked_vs_names = pool_vs_index.get(pool_path, [])
+
+    from f5_index import build_stats_index
+    vs_info_map = build_stats_index(stats_entries, parse_vs_stats)
+    vs_info = vs_info_map.get('vs_web', {})   # same entry as '/Common/vs_web'
+"""
+
+import re
+import sys
+from collections import defaultdict
+
+DEFAULT_PARTITION = 'Common'
+# Route domain 0 is the default and is omitted by the device in most places
+_DEFAULT_ROUTE_DOMAIN = re.compile(r'%0(?=$|:|\.)')
+
+
+def canonical_path(name, partition=DEFAULT_PARTITION):
+    """
+    Return the canonical /Partition/[folder.app/]name fullPath for an object name.
+
+    Accepts the forms the REST API hands out for the same object:
+    'vs_web', 'Common/vs_web', '/Common/vs_web', '~Common~vs_web',
+    iApp members such as 'app.app/app_vs' and route domain addresses
+    such as '10.1.1.10%0' (the default route domain suffix is dropped).
+    """
+    if not name:
+        return ''
+    path = name.strip()
+    if path.startswith('~'):
+        path = path.replace('~', '/')
+    path = _DEFAULT_ROUTE_DOMAIN.sub('', path)
+    if path.startswith('/'):
+        return path
+    head = path.split('/', 1)[0]
+    if '/' not in path or head.endswith('.app'):
+        # Bare name or an iApp folder in the default partition
+        return f"/{partition}/{path}"
+    return f"/{path}"
+
+
+class PathIndex:
+    """
+    Dict-like index keyed by canonical fullPath.
+
+    Every entry is stored once under an interned canonical key, and lookups
+    normalize the requested name the same way, so any accepted spelling of
+    a name is a single hash probe.
+    """
+
+    __slots__ = ('partition', '_items')
+
+    def __init__(self, partition=DEFAULT_PARTITION):
+        self.partition = partition
+        self._items = {}
+
+    def key(self, name):
+        return canonical_path(name, self.partition)
+
+    def __setitem__(self, name, value):
+        self._items[sys.intern(self.key(name))] = value
+
+    def __getitem__(self, name):
+        return self._items[self.key(name)]
+
+    def __contains__(self, name):
+        return self.key(name) in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def get(self, name, default=None):
+        return self._items.get(self.key(name), default)
+
+    def items(self):
+        return self._items.items()
+
+
+def build_stats_index(entries, parse, partition=DEFAULT_PARTITION):
+    """
+    Index a /stats 'entries' dict by the canonical fullPath of each tmName.
+
+    parse(nested) turns one entry's nestedStats entries into the stored
+    value. Works for virtual, pool and node stats alike.
+    """
+    index = PathIndex(partition)
+    for stat in entries.values():
+        nested = stat.get('nestedStats', {}).get('entries', {})
+        name = nested.get('tmName', {}).get('description', '')
+        if name:
+            index[name] = parse(nested)
+    return index
+
+
+def build_pool_vs_index(vs_pool_map):
+    """
+    Invert a {virtual server: pool} map into {pool: [virtual servers]}.
+
+    Built in a single pass over the virtual servers, so finding the virtual
+    servers of every pool is O(virtuals + pools) instead of rescanning all
+    virtual servers per pool. Virtual servers keep their vs_pool_map order.
+    """
+    index = defaultdict(list)
+    for vs_name, pool in vs_pool_map.items():
+        index[pool].append(vs_name)
+    return dict(index)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""
+Lightweight instrumentation for the F5 collection pipeline.
+
+Records, per run:
+
+- wall time of each phase (fetch virtual/pool/node, join, Excel, ...)
+- per-endpoint request latency histograms, with the time spent decoding JSON
+  kept separate from the time waiting on the device/network
+- bytes received per endpoint
+- object counts (virtual servers, pools, members, nodes, report rows)
+
+and writes them as one JSON summary. Endpoints are grouped by shape, so
+/mgmt/tm/ltm/pool/~Common~web/members and .../~Common~app/members both count
+under /mgmt/tm/ltm/pool/{name}/members.
+
+ThreadProfiler runs cProfile over every thread of the process, so the
+collectors running on the pipeline's worker threads show up in --profile.
+
+Usage:
+    from f5_metrics import Metrics
+    metrics = Metrics()
+    with metrics.phase('fetch_virtual'):
+        ...
+    metrics.record_request(endpoint, seconds, nbytes, decode_seconds)
+    metrics.count('virtual', len(vs_data))
+    metrics.write('report_metrics.json')
+
+    profiler = ThreadProfiler()
+    profiler.enable()
+    ...
+    profiler.disable()
+    profiler.dump_stats('report.prof')
+"""
+
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open ended
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def endpoint_group(endpoint):
+    """Collapse object names out of an endpoint, e.g. /mgmt/tm/ltm/pool/~Common~x/members -> /mgmt/tm/ltm/pool/{name}/members."""
+    path = endpoint.split('?', 1)[0]
+    return '/'.join('{name}' if part.startswith('~') else part for part in path.split('/'))
+
+
+def bucket_label(upper):
+    return f"<={upper}s"
+
+
+class EndpointStats:
+    """Latency histogram, byte and decode totals of one endpoint group."""
+
+    __slots__ = ('count', 'errors', 'bytes', 'seconds', 'decode_seconds', 'max_seconds', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.decode_seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, seconds, nbytes, decode_seconds, error):
+        self.count += 1
+        self.errors += bool(error)
+        self.bytes += nbytes
+        self.seconds += seconds
+        self.decode_seconds += decode_seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for i, upper in enumerate(LATENCY_BUCKETS):
+            if seconds <= upper:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def as_dict(self):
+        labels = [bucket_label(upper) for upper in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            'requests': self.count,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'seconds': round(self.seconds, 4),
+            'mean_seconds': round(self.seconds / self.count, 4) if self.count else 0,
+            'max_seconds': round(self.max_seconds, 4),
+            'decode_seconds': round(self.decode_seconds, 4),
+            'histogram': dict(zip(labels, self.histogram))
+        }
+
+
+class Metrics:
+    """Thread-safe collector for phase timings, request stats and object counts."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.endpoints = defaultdict(EndpointStats)
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of work; repeated phases with the same name accumulate."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def record_request(self, endpoint, seconds, nbytes=0, decode_seconds=0.0, error=False):
+        """Record one request: total seconds, body size and the part spent decoding JSON."""
+        with self._lock:
+            self.endpoints[endpoint_group(endpoint)].add(seconds, nbytes, decode_seconds, error)
+
+    def count(self, name, value):
+        with self._lock:
+            self.counts[name] = value
+
+    def summary(self):
+        """Return the collected metrics as a JSON-serialisable dict."""
+        with self._lock:
+            endpoints = {name: stats.as_dict() for name, stats in sorted(self.endpoints.items())}
+            return {
+                'wall_seconds': round(time.perf_counter() - self.started, 4),
+                'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+                'requests': sum(stats['requests'] for stats in endpoints.values()),
+                'bytes': sum(stats['bytes'] for stats in endpoints.values()),
+                'decode_seconds': round(sum(stats['decode_seconds'] for stats in endpoints.values()), 4),
+                'endpoints': endpoints,
+                'counts': dict(self.counts)
+            }
+
+    def write(self, path):
+        """Write the summary as JSON and return it."""
+        summary = self.summary()
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+class ThreadProfiler:
+    """cProfile over the main thread and every thread started while it is enabled.
+
+    Before Python 3.12 a cProfile.Profile only sees the thread that enabled
+    it. threading.setprofile gives each new thread its own Profile and the
+    stats of all of them are merged when dumped. From 3.12 on cProfile
+    profiles all threads itself, so only the one Profile is used.
+    """
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def _new_profile(self):
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def _start_thread(self, frame, event, arg):
+        # Called on the first profile event of each new thread; replaces itself
+        self._new_profile()
+
+    def enable(self):
+        self._new_profile()
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._start_thread)
+
+    def disable(self):
+        threading.setprofile(None)
+        self._profiles[0].disable()
+
+    def dump_stats(self, path):
+        """Write the merged stats of all threads to path (for pstats/snakeviz)."""
+        with self._lock:
+            profiles = list(self._profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Compact record types for the virtual server / pool / member / node model.
+
+The collectors used to keep every object as a dict with 10-20 string keys;
+on a fleet run hundreds of thousands of them are alive at once. These
+slotted dataclasses have no per-instance __dict__, and the repeated status
+strings (availability, enabled state, member state, ...) are interned so
+all records share one copy of each value.
+
+Usage:
+    from f5_records import VirtualServer, Pool, PoolMember, Node, ReportRow, intern_state
+    vs = VirtualServer(name='vs_web', fullPath='/Common/vs_web', ...)
+    vs.availabilityState
+"""
+
+import sys
+from dataclasses import dataclass, field, fields
+
+
+def intern_state(value):
+    """Intern a repeated status/partition string so all records share one copy."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def record_dict(record, exclude=()):
+    """Return a flat dict of a record's fields (nested lists are kept as is)."""
+    return {f.name: getattr(record, f.name) for f in fields(record) if f.name not in exclude}
+
+
+@dataclass(slots=True)
+class VirtualServer:
+    name: str
+    fullPath: str
+    partition: str
+    description: str
+    destination_ip: str
+    destination_port: str
+    pool: str
+    availabilityState: str
+    enabledState: str
+    statusReason: str
+
+
+@dataclass(slots=True)
+class PoolMember:
+    name: str
+    address: str
+    port: str
+    state: str
+    session: str
+
+
+@dataclass(slots=True)
+class Pool:
+    fullPath: str
+    name: str
+    partition: str
+    monitor: str
+    availabilityState: str
+    enabledState: str
+    statusReason: str
+    activeMemberCount: int
+    totalMemberCount: int
+    members: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Node:
+    address: str
+    name: str
+    fullPath: str
+    partition: str
+    availabilityState: str
+    enabledState: str
+    statusReason: str
+
+
+@dataclass(slots=True)
+class ReportRow:
+    # Virtual server info
+    name: str
+    fullPath: str
+    description: str
+    destination_ip: str
+    destination_port: str
+    # Virtual server status
+    vs_availabilityState: str
+    vs_enabledState: str
+    vs_statusReason: str
+    # Pool info
+    pool: str
+    pool_name: str
+    pool_monitor: str
+    active_members: object
+    total_members: object
+    # Pool status
+    pool_availabilityState: str
+    pool_enabledState: str
+    pool_statusReason: str
+    # Member information
+    member_states: str
+    member_sessions: str
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+"""
+Shared iControl REST session pool for the F5 collector scripts.
+
+Every collector used to log in to the BIG-IP on each run (and some on every
+call), which floods restjavad with /mgmt/shared/authn/login requests. The
+pool keeps one requests.Session per host with:
+
+- a cached X-F5-Auth-Token that is refreshed shortly before it expires
+  (1200s by default) and transparently renewed once on a 401
+- a sized HTTPAdapter so keep-alive TLS connections are reused across
+  requests and threads
+- the device's HostGuard (see f5_throttle.py) in front of every request:
+  an adaptive per-device rate limit, jittered retries of 429/503 and a
+  circuit breaker
+
+Responses are decoded with decode_json(), which parses the raw body bytes
+with orjson or simdjson when one is installed and falls back to the stdlib
+json module otherwise.
+
+Usage:
+    from f5_session import get_session_pool
+    pool = get_session_pool(username, password)
+    session = pool.session('10.1.1.245')
+    r = session.get('https://10.1.1.245/mgmt/tm/ltm/virtual')
+    data = decode_json(r)
+"""
+
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.exceptions import InsecureRequestWarning
+
+from f5_throttle import host_guard
+
+requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+
+logger = logging.getLogger(__name__)
+
+# Fastest available JSON decoder; all of them accept the raw response bytes
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import simdjson
+        json_loads = simdjson.loads
+        JSON_BACKEND = 'simdjson'
+    except ImportError:
+        json_loads = json.loads
+        JSON_BACKEND = 'json'
+
+LOGIN_URI = '/mgmt/shared/authn/login'
+# Token lifetime used when the device does not report one
+DEFAULT_TOKEN_TIMEOUT = 1200
+# Refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 120
+# Keep-alive connections kept per host
+DEFAULT_POOL_MAXSIZE = 16
+# Pool collection with each pool's members inline
+EXPANDED_POOL_ENDPOINT = '/mgmt/tm/ltm/pool?expandSubcollections=true'
+# Fields each collection is read for; requested with $select so the device does
+# not serialise profiles, persistence, SNAT and other properties the reports ignore
+VIRTUAL_FIELDS = ('name', 'fullPath', 'partition', 'description', 'destination', 'pool')
+POOL_FIELDS = ('name', 'fullPath', 'partition', 'monitor', 'membersReference')
+MEMBER_FIELDS = ('name', 'address', 'state', 'session')
+NODE_FIELDS = ('name', 'fullPath', 'partition', 'address')
+
+
+def with_select(endpoint, fields):
+    """Append a $select projection so the device only returns the listed fields."""
+    separator = '&' if '?' in endpoint else '?'
+    return f"{endpoint}{separator}$select={','.join(fields)}"
+
+
+def list_stats_endpoints(virtual_endpoint=None, pool_endpoint=None, node_endpoint=None):
+    """Return the six list/stats requests a collector starts with, in the order it uses them.
+
+    The list requests default to the shared $select projections; a collector
+    that pages or probes its collections passes the endpoints it will request.
+    """
+    return [
+        virtual_endpoint or with_select('/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS),
+        '/mgmt/tm/ltm/virtual/stats',
+        pool_endpoint or with_select(EXPANDED_POOL_ENDPOINT, POOL_FIELDS),
+        '/mgmt/tm/ltm/pool/stats',
+        node_endpoint or with_select('/mgmt/tm/ltm/node', NODE_FIELDS),
+        '/mgmt/tm/ltm/node/stats'
+    ]
+
+
+# Fetched concurrently ahead of the process_* functions with --async
+PREFETCH_ENDPOINTS = list_stats_endpoints()
+
+
+def next_page_endpoint(page):
+    """Return the endpoint of the next page of a collection, or None on the last page."""
+    next_link = page.get('nextLink')
+    return next_link.replace('https://localhost', '') if next_link else None
+
+
+def members_inline(pool_items):
+    """Return True if the pool items carry their members inline, i.e. expandSubcollections was honoured."""
+    return not pool_items or any('items' in pool.get('membersReference', {}) for pool in pool_items)
+
+
+def get_pools_expanded(f5_config, fields):
+    """Fetch pools with their members inline using expandSubcollections.
+
+    f5_config is any collector client with a get_json(endpoint) method;
+    fields is the $select projection of the pool items. Returns (pools,
+    expanded). Falls back to the plain pool list when the device rejects or
+    ignores expandSubcollections, in which case members must be fetched per pool.
+    """
+    try:
+        pools = f5_config.get_json(with_select(EXPANDED_POOL_ENDPOINT, fields))
+    except requests.exceptions.HTTPError:
+        pools = None
+    if pools is None:
+        logger.info("expandSubcollections not supported, falling back to per-pool member requests")
+        return f5_config.get_json(with_select('/mgmt/tm/ltm/pool', fields)), False
+    expanded = members_inline(pools.get('items', []))
+    if not expanded:
+        logger.info("expandSubcollections ignored by device, falling back to per-pool member requests")
+    return pools, expanded
+
+
+def decode_json(response):
+    """Decode a JSON response from its raw bytes, without building an intermediate str."""
+    return json_loads(response.content)
+
+
+def base_url(host):
+    """Return the scheme://host base URL for a host given with or without a scheme."""
+    host = host.rstrip('/')
+    if not host.startswith('http'):
+        return f"https://{host}"
+    return host
+
+
+class F5HTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that sends every request through the HostGuard of its device."""
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        guard = host_guard(f"{parts.scheme}://{parts.netloc}")
+        for attempt in guard.attempts():
+            time.sleep(guard.before_request(attempt))
+            start = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # Certificate errors will not go away by retrying
+                delay = guard.after_error(attempt, retry=not isinstance(e, requests.exceptions.SSLError))
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except requests.exceptions.RequestException:
+                guard.after_error(attempt, retry=False)
+                raise
+            delay = guard.after_response(attempt, time.perf_counter() - start, response.status_code,
+                                         response.headers.get('Retry-After'))
+            if delay is None:
+                return response
+            # Consume the body so the connection can be released back to the pool
+            response.content
+            response.close()
+            time.sleep(delay)
+
+
+def guarded_session(verify_ssl=False, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """Return a plain session (no token handling) whose requests still pass through the HostGuards.
+
+    For callers that already hold an X-F5-Auth-Token and send it themselves.
+    """
+    session = requests.Session()
+    session.verify = verify_ssl
+    adapter = F5HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class F5TokenAuth(AuthBase):
+    """requests auth handler that attaches the pool's cached token for one host."""
+
+    def __init__(self, pool, url):
+        self.pool = pool
+        self.url = url
+
+    def __call__(self, r):
+        r.headers['X-F5-Auth-Token'] = self.pool.token(self.url)
+        r.register_hook('response', self.handle_401)
+        return r
+
+    def handle_401(self, r, **kwargs):
+        """Renew the token and resend the request once when the device rejects it."""
+        if r.status_code != 401 or r.request.headers.get('X-F5-Auth-Retry'):
+            return r
+        self.pool.invalidate(self.url)
+        # Consume the body so the connection can be released back to the pool
+        r.content
+        r.close()
+        prep = r.request.copy()
+        prep.headers['X-F5-Auth-Token'] = self.pool.token(self.url)
+        prep.headers['X-F5-Auth-Retry'] = '1'
+        retry = r.connection.send(prep, **kwargs)
+        retry.history.append(r)
+        retry.request = prep
+        return retry
+
+
+class F5SessionPool:
+    """Per-host sessions and auth tokens shared by all collectors in the process."""
+
+    def __init__(self, username, password, verify_ssl=False,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, login_provider='tmos'):
+        self.username = username
+        self.password = password
+        self.verify_ssl = verify_ssl
+        self.pool_maxsize = pool_maxsize
+        self.login_provider = login_provider
+        self._sessions = {}
+        self._tokens = {}  # base url -> (token, expires_at)
+        self._lock = threading.Lock()
+        self._host_locks = {}
+
+    def _host_lock(self, url):
+        with self._lock:
+            return self._host_locks.setdefault(url, threading.Lock())
+
+    def session(self, host):
+        """Return the shared session for a host, creating it on first use."""
+        url = base_url(host)
+        with self._lock:
+            session = self._sessions.get(url)
+            if session is None:
+                session = requests.Session()
+                session.verify = self.verify_ssl
+                session.headers.update({'Content-Type': 'application/json'})
+                self._mount(session)
+                session.auth = F5TokenAuth(self, url)
+                self._sessions[url] = session
+            return session
+
+    def _mount(self, session):
+        # Failed connections are retried by the device's HostGuard
+        adapter = F5HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    def grow(self, pool_maxsize):
+        """Raise the per-host connection limit to at least pool_maxsize.
+
+        Existing sessions get a new adapter; requests in flight finish on the old one.
+        """
+        with self._lock:
+            if pool_maxsize <= self.pool_maxsize:
+                return
+            self.pool_maxsize = pool_maxsize
+            for session in self._sessions.values():
+                self._mount(session)
+
+    def token(self, host, timeout=None):
+        """Return a valid auth token for a host, logging in only when needed."""
+        url = base_url(host)
+        cached = self._tokens.get(url)
+        if cached and cached[1] - TOKEN_REFRESH_MARGIN > time.monotonic():
+            return cached[0]
+        with self._host_lock(url):
+            # Another thread may have refreshed the token while we waited
+            cached = self._tokens.get(url)
+            if cached and cached[1] - TOKEN_REFRESH_MARGIN > time.monotonic():
+                return cached[0]
+            token, lifetime = self._login(url, timeout)
+            self._tokens[url] = (token, time.monotonic() + lifetime)
+            return token
+
+    def invalidate(self, host):
+        """Drop the cached token for a host so the next request logs in again."""
+        self._tokens.pop(base_url(host), None)
+
+    def _login(self, url, timeout=None):
+        """POST to the login endpoint and return (token, lifetime in seconds)."""
+        auth_data = {
+            "username": self.username,
+            "password": self.password,
+            "loginProviderName": self.login_provider
+        }
+        # Bypass F5TokenAuth for the login request itself
+        response = self.session(url).post(f"{url}{LOGIN_URI}", json=auth_data,
+                                          auth=lambda r: r, timeout=timeout)
+        response.raise_for_status()
+        token = decode_json(response)['token']
+        return token['token'], int(token.get('timeout') or DEFAULT_TOKEN_TIMEOUT)
+
+    def get(self, host, endpoint, **kwargs):
+        """GET an endpoint (e.g. /mgmt/tm/ltm/virtual) on a host through its shared session."""
+        return self.session(host).get(f"{base_url(host)}{endpoint}", **kwargs)
+
+    def close(self):
+        """Close all sessions and forget cached tokens."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._tokens.clear()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_session_pool(username, password, verify_ssl=False, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """Return the process-wide session pool for these credentials, creating it on first use.
+
+    A later call asking for a larger pool_maxsize grows the existing pool.
+    """
+    key = (username, password, verify_ssl)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = F5SessionPool(username, password, verify_ssl, pool_maxsize)
+            _pools[key] = pool
+    pool.grow(pool_maxsize)
+    return pool
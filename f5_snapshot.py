@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Columnar snapshots of the F5 collector tables.
+
+Writes the VS/pool/member/node tables gathered by a collector as Parquet or
+Arrow IPC (Feather v2) files next to the Excel/CSV report. Status-like
+columns are stored as categoricals, which pyarrow writes dictionary
+encoded, so months of snapshots stay small and load in milliseconds with
+pandas.read_parquet / pyarrow.dataset for trend analysis.
+
+Requires pyarrow; the collectors only import it when a snapshot is requested.
+
+Usage:
+    from f5_snapshot import write_snapshot
+    write_snapshot({'virtual': vs_rows, 'pool': pool_rows}, 'bigip1_20250601_120000', 'parquet')
+"""
+
+import os
+from datetime import datetime
+
+import pandas as pd
+
+SNAPSHOT_FORMATS = ('parquet', 'arrow')
+# Columns whose name contains one of these are dictionary encoded
+CATEGORY_MARKERS = ('state', 'status', 'session', 'partition', 'monitor')
+
+
+def snapshot_frame(rows, device=None, taken_at=None):
+    """Build a DataFrame for one snapshot table with categorical status columns."""
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    df = df.copy()
+    if device is not None:
+        df.insert(0, 'device', device)
+    if taken_at is not None:
+        df.insert(0, 'snapshot_time', pd.Timestamp(taken_at))
+    for column in df.columns:
+        name = str(column).lower()
+        if name == 'device' or any(marker in name for marker in CATEGORY_MARKERS):
+            df[column] = df[column].astype('string').astype('category')
+    return df
+
+
+def write_snapshot(tables, output_prefix, fmt='parquet', device=None, taken_at=None):
+    """
+    Write each table to <output_prefix>_<name>.<parquet|arrow>.
+
+    tables maps a table name (virtual, pool, member, node, ...) to a list of
+    row dicts or a DataFrame. Returns the list of files written.
+    """
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unsupported snapshot format {fmt!r}, expected one of {SNAPSHOT_FORMATS}")
+    try:
+        import pyarrow  # noqa: F401
+        from pyarrow import feather
+    except ImportError:
+        raise RuntimeError("pyarrow is required to write Parquet/Arrow snapshots (pip install pyarrow)")
+
+    taken_at = taken_at or datetime.now()
+    directory = os.path.dirname(output_prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    written = []
+    for name, rows in tables.items():
+        df = snapshot_frame(rows, device, taken_at)
+        if fmt == 'parquet':
+            filename = f"{output_prefix}_{name}.parquet"
+            df.to_parquet(filename, engine='pyarrow', index=False, compression='zstd')
+        else:
+            filename = f"{output_prefix}_{name}.arrow"
+            feather.write_feather(df, filename, compression='zstd')
+        written.append(filename)
+    return written
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Vectorized availability/enabled status counts for the F5 summary scripts.
+
+The /stats nestedStats entries of virtual servers, pools and nodes are
+flattened once into a DataFrame with categorical partition, availability and
+enabled columns. The "Available", "Offline" and "Unknown" counts, with their
+"(N Disabled)" breakdowns, then come from one groupby per object type
+instead of a Python loop that branches per entry.
+
+Usage:
+    from f5_summary_stats import status_summary
+    summary_df = status_summary([
+        ("Virtual Servers", vs_stats_json),
+        ("Pools", pool_stats_json),
+        ("Nodes", node_stats_json),
+    ], by_partition=True)
+"""
+
+import pandas as pd
+
+# Availability states counted in the summary, in column order
+AVAILABILITY_STATES = ('available', 'unavailable', 'offline', 'unknown')
+# States whose count is followed by "(N Disabled)"
+DISABLED_BREAKDOWN = ('available', 'offline', 'unknown')
+COUNT_COLUMNS = ('total', 'available', 'available_disabled', 'unavailable',
+                 'offline', 'offline_disabled', 'unknown', 'unknown_disabled')
+
+
+def lowercase_categorical(values, categories=None):
+    """Lower-case a column of repeated strings by working on its distinct values only."""
+    raw = pd.Categorical(values)
+    lowered = raw.categories.astype(str).str.lower().to_numpy()
+    return pd.Categorical(lowered[raw.codes] if len(raw) else [], categories=categories)
+
+
+def stats_frame(stats_json):
+    """Flatten a /stats response into a DataFrame of tmName, partition, availability and enabled."""
+    names = []
+    partitions = []
+    availability = []
+    enabled = []
+    for entry in stats_json.get('entries', {}).values():
+        nested = entry.get('nestedStats', {}).get('entries', {})
+        name = nested.get('tmName', {}).get('description', '')
+        names.append(name)
+        # Partition is the first path segment of tmName (format: /partition/name)
+        partitions.append(name.split('/', 2)[1] if '/' in name else 'Common')
+        availability.append(nested.get('status.availabilityState', {}).get('description', ''))
+        enabled.append(nested.get('status.enabledState', {}).get('description', ''))
+
+    return pd.DataFrame({
+        'tmName': names,
+        'partition': pd.Categorical(partitions),
+        # States outside AVAILABILITY_STATES become NaN: counted in total only
+        'availability': lowercase_categorical(availability, AVAILABILITY_STATES),
+        'enabled': lowercase_categorical(enabled)
+    })
+
+
+def status_counts(df, by=None):
+    """
+    Count objects per availability state, with disabled breakdowns.
+
+    Returns one row per value of the `by` column (in order of first
+    appearance), or a single row for the whole frame when by is None, with
+    the COUNT_COLUMNS columns.
+    """
+    if by is None:
+        keys = pd.Series('all', index=df.index, name='group')
+    else:
+        keys = df[by].astype('object')
+    total = keys.groupby(keys, sort=False).size()
+    if by is None:
+        total = total.reindex(['all'], fill_value=0)
+
+    disabled = (df['enabled'] == 'disabled').rename('disabled')
+    columns = pd.MultiIndex.from_product([AVAILABILITY_STATES, [False, True]])
+    if df.empty:
+        table = pd.DataFrame(0, index=total.index, columns=columns)
+    else:
+        # Rows with a state outside AVAILABILITY_STATES (NaN) are dropped here
+        availability = df['availability'].astype('object')
+        table = (df.groupby([keys, availability, disabled], sort=False).size()
+                 .unstack(['availability', 'disabled'], fill_value=0))
+        table = table.reindex(index=total.index, columns=columns, fill_value=0)
+
+    counts = pd.DataFrame({'total': total}, index=total.index)
+    for state in AVAILABILITY_STATES:
+        counts[state] = table[(state, False)] + table[(state, True)]
+        if state in DISABLED_BREAKDOWN:
+            counts[f'{state}_disabled'] = table[(state, True)]
+    return counts[list(COUNT_COLUMNS)].astype('int64')
+
+
+def format_counts(object_type, counts):
+    """Render status counts in the report layout, e.g. Available = "12 (1 Disabled)"."""
+    def with_disabled(state):
+        return counts[state].astype(str) + ' (' + counts[f'{state}_disabled'].astype(str) + ' Disabled)'
+
+    return pd.DataFrame({
+        'Object Type': object_type,
+        'Total': counts['total'],
+        'Available': with_disabled('available'),
+        'Unavailable': counts['unavailable'],
+        'Offline': with_disabled('offline'),
+        'Unknown': with_disabled('unknown')
+    })
+
+
+def status_summary(stats_by_type, by_partition=False):
+    """
+    Build the status summary DataFrame from (object type, /stats response) pairs.
+
+    With by_partition there is one row per object type and partition, and a
+    trailing Partition column.
+    """
+    frames = []
+    for object_type, stats_json in stats_by_type:
+        counts = status_counts(stats_frame(stats_json), by='partition' if by_partition else None)
+        summary = format_counts(object_type, counts)
+        if by_partition:
+            summary['Partition'] = counts.index
+        frames.append(summary)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+"""
+Per-device request throttling for the F5 collector scripts.
+
+Parallel collectors can push restjavad on the BIG-IP into answering 503
+(or 429) and, under sustained load, into restarting. Every request to a
+device passes through that device's HostGuard, which combines:
+
+- an adaptive token bucket, like TCP congestion control: the request rate
+  starts in slow start, doubling about every second of healthy responses,
+  until the first 429/503 or response slower than SLOW_LATENCY seconds;
+  from then on it grows additively and is halved on every such signal (AIMD)
+- retries of 429/503 responses and failed connections with full-jitter
+  exponential backoff, honouring Retry-After
+- a circuit breaker that fails requests fast for BREAKER_RESET seconds
+  after BREAKER_THRESHOLD consecutive failed requests, then lets a single
+  probe request through to decide whether to close again
+
+Guards are shared process-wide per base URL, so every session, thread and
+event loop talking to one device shares its budget. f5_session mounts
+them into the requests sessions; f5_async_client uses them directly.
+
+Usage:
+    from f5_throttle import host_guard
+    guard = host_guard('https://10.1.1.245')
+    for attempt in guard.attempts():
+        time.sleep(guard.before_request())
+        ...
+        delay = guard.after_response(attempt, seconds, status, retry_after)
+"""
+
+import random
+import threading
+import time
+
+import requests
+
+# Requests per second a device starts at, and the bounds the adaptive rate stays within
+DEFAULT_RATE = 20.0
+MIN_RATE = 1.0
+MAX_RATE = 200.0
+# Requests that may be sent back to back before the rate applies
+DEFAULT_BURST = 10
+# Responses slower than this (seconds to headers) mean restjavad is queueing
+SLOW_LATENCY = 2.0
+# The rate is halved at most once per this many seconds, so one burst of
+# 503s from requests already in flight counts as a single congestion signal
+DECREASE_INTERVAL = 1.0
+
+# Status codes the device uses to shed load; these are retried
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 5
+# Retries of requests that could not connect at all
+CONNECT_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Consecutive failed requests that open the circuit, and seconds it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while a device's circuit breaker is open."""
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Return the seconds to wait before retry number attempt (0-based): Retry-After or full jitter."""
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to the latency and load-shedding responses of the device."""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 slow_latency=SLOW_LATENCY):
+        self.rate = float(rate)
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.slow_latency = slow_latency
+        self.throttled = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        # Grow multiplicatively until the device first pushes back
+        self.slow_start = True
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how many seconds the caller must wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def record(self, seconds, status):
+        """Adapt the rate to one response: back off on 429/503 or slow answers, otherwise speed up."""
+        with self._lock:
+            if status in RETRY_STATUSES or seconds > self.slow_latency:
+                self.throttled += status in RETRY_STATUSES
+                self.slow_start = False
+                now = time.monotonic()
+                if now - self._last_decrease >= DECREASE_INTERVAL:
+                    self.rate = max(self.min_rate, self.rate / 2)
+                    self._last_decrease = now
+            elif status < 500:
+                if self.slow_start:
+                    # One more request per second per response: the rate doubles every second
+                    self.rate = min(self.max_rate, self.rate + 1)
+                else:
+                    # About one more request per second for every second of healthy responses
+                    self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker counting consecutive failed requests to one device."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_after=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = 'closed'
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self, url=''):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_after:
+                self.state = 'half-open'
+            if self.state == 'half-open' and not self._probing:
+                # Let exactly one probe request through
+                self._probing = True
+                return
+            raise CircuitOpenError(f"Circuit open after {self.failures} consecutive failures: {url}")
+
+    def success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half-open' or self.failures >= self.threshold:
+                if self.state != 'open':
+                    self.opened += 1
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+
+class HostGuard:
+    """Rate limiter, retry policy and circuit breaker of one device."""
+
+    def __init__(self, url, max_retries=MAX_RETRIES, connect_retries=CONNECT_RETRIES):
+        self.url = url
+        self.max_retries = max_retries
+        self.connect_retries = connect_retries
+        self.limiter = AdaptiveRateLimiter()
+        self.breaker = CircuitBreaker()
+        self.retries = 0
+
+    def attempts(self):
+        """Attempt numbers of one request: the first try plus its retries."""
+        return range(max(self.max_retries, self.connect_retries) + 1)
+
+    def before_request(self, attempt=0):
+        """Check the breaker (first attempt only) and return the seconds to wait for a token."""
+        if attempt == 0:
+            self.breaker.allow(self.url)
+        return self.limiter.reserve()
+
+    def after_response(self, attempt, seconds, status, retry_after=None):
+        """Record a response; return the seconds to wait before retrying it, or None to keep it."""
+        self.limiter.record(seconds, status)
+        if status in RETRY_STATUSES and attempt < self.max_retries:
+            self.retries += 1
+            return backoff_delay(attempt, retry_after)
+        if status >= 500:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        return None
+
+    def after_error(self, attempt, retry=True):
+        """Record a failed request; return the seconds to wait before retrying, or None to raise.
+
+        Only failed connections are retried (retry=True); a read timeout
+        means the device is already struggling and counts as a failure.
+        """
+        if retry and attempt < self.connect_retries:
+            self.retries += 1
+            return backoff_delay(attempt)
+        self.breaker.failure()
+        return None
+
+    def summary(self):
+        phase = 'slow start' if self.limiter.slow_start else 'congestion avoidance'
+        return (f"rate {self.limiter.rate:.1f} req/s ({phase}), {self.limiter.throttled} throttled responses, "
+                f"{self.retries} retries, circuit {self.breaker.state} (opened {self.breaker.opened}x)")
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def host_guard(url):
+    """Return the process-wide HostGuard of a device base URL (scheme://host[:port])."""
+    with _guards_lock:
+        guard = _guards.get(url)
+        if guard is None:
+            guard = HostGuard(url)
+            _guards[url] = guard
+        return guard
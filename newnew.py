@@ -1,13 +1,11 @@
 #!/usr/bin/env python
 
-from base64 import b64encode
-import json
 import os
 import sys
 import time
 import requests
-from urllib3.exceptions import InsecureRequestWarning
 import pandas as pd
+from f5_session import get_session_pool
 
 class F5Config:
     def _init_(self, bigip_address, username, password, debug=False):
@@ -20,41 +18,26 @@ class F5Config:
         vip_status(self)
 
 def f5_auth_token(address, user, password, uri='/mgmt/shared/authn/login'):
-    """Get an authentication token from the F5 device."""
-    credentials = f"{user}:{password}"
-    user_and_pass = b64encode(credentials.encode()).decode("ascii")
-    headers = {'Authorization': f'Basic {user_and_pass}', 'Content-Type': 'application/json'}
-    post_data = json.dumps({"username": user, "password": password})
-    url = f"https://{address}{uri}"
-
-    requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+    """Get an authentication token from the F5 device (cached by the shared session pool)."""
     try:
-        request_result = requests.post(url, headers=headers, data=post_data, verify=False)
-        request_result.raise_for_status()
+        return get_session_pool(user, password).token(address)
     except requests.exceptions.RequestException as err:
         print(f"Error: {err}")
         sys.exit(err)
-
-    response_data = request_result.json()
-    if "token" not in response_data:
+    except KeyError:
         sys.exit("Issue in generating token")
 
-    return response_data['token']['token']
-
 def vip_status(self):
     """Fetch and save VIP details including status."""
     BIGIP_IP = self.address
-    AUTH_TOKEN = self.token
 
-    headers = {
-        "X-F5-Auth-Token": AUTH_TOKEN,
-        "Content-Type": "application/json"
-    }
+    # Shared session; attaches (and renews) the auth token itself
+    session = get_session_pool(self.username, self.password).session(BIGIP_IP)
 
     url = f"https://{BIGIP_IP}/mgmt/tm/ltm/virtual"
 
     try:
-        response = requests.get(url, headers=headers, verify=False)
+        response = session.get(url)
         response.raise_for_status()
     except requests.exceptions.RequestException as err:
         print(f"Failed to retrieve data: {err}")
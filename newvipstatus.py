@@ -1,42 +1,32 @@
 #!/usr/bin/env python
 
-from base64 import b64encode
 import json
 import os
 import sys
 import time
 import requests
-from urllib3.exceptions import InsecureRequestWarning
 from datetime import datetime
 import pprint
 import pandas as pd
+from f5_index import build_pool_vs_index
+from f5_session import get_session_pool
 
 
 def f5_auth_token(address, user, password,
                    uri='/mgmt/shared/authn/login'):  # -> unicode
     """Get and auth token( to be used but other requests"""
-    credentials_list = [user, ":", password]
-    credentials = ''.join(credentials_list)
-    user_and_pass = b64encode(credentials.encode()).decode("ascii")
-    headers = { 'Authorization':'Basic {}'.format(user_and_pass), 'Content-Type':'application/json'}
-    post_data = '{"username":"' + user + '","password":"' + password +'"}'
-    url_list = ['https://', address, uri]
-    url = ''.join(url_list)
-    requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+    # Tokens are cached per host by the shared session pool and refreshed before
+    # they expire, so this only logs in when there is no valid token yet
     try:
-        request_result = requests.post(url, headers=headers, data=post_data, verify=False)
+        return get_session_pool(user, password).token(address)
     except requests.exceptions.ConnectionError as connection_error:
         print(connection_error)
         sys.exit(connection_error)
     except requests.exceptions.RequestException as request_exception:
         print(request_exception)
         sys.exit(request_exception)
-    print (request_result.json())
-    if "token" not in request_result.json().keys(): 
-      #print ("issue in generating token")
-       sys.exit("issue in generating token")   
-    #returns an instance of unicode that is an auth token with 300 dec timeout
-    return request_result.json()['token']['token']
+    except KeyError:
+        sys.exit("issue in generating token")
 
 
 def connectToF5(url, auth_token, debug=True, return_encoding='json'):
@@ -67,41 +57,38 @@ class F5Config:
 
 def vip_status(self):
     BIGIP_IP = self.address
-    AUTH_TOKEN = self.token
     
-    headers = {
-        "X-F5-Auth-Token": AUTH_TOKEN,
-        "Content-Type": "application/json"
-    }
+    # Shared session; attaches (and renews) the auth token itself
+    session = get_session_pool(self.username, self.password).session(BIGIP_IP)
     
     def get_virtuals():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/virtual"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('items', [])
     
     def get_virtual_stats():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/virtual/stats"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('entries', {})
     
     def get_pools():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('items', [])
     
     def get_pool_stats():
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool/stats"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         r.raise_for_status()
         return r.json().get('entries', {})
     
     def get_pool_members(pool_full_path):
         pool_uri = pool_full_path.replace('/', '~')
         url = f"https://{BIGIP_IP}/mgmt/tm/ltm/pool/{pool_uri}/members"
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url)
         if r.status_code == 200:
             return r.json().get('items', [])
         return []
@@ -158,6 +145,9 @@ def vip_status(self):
         desc = vs.get('description', '')
         vs_desc_map[vs_name] = desc
     
+    # Invert vs_pool_map once so each pool finds its virtual servers in O(1)
+    pool_vs_index = build_pool_vs_index(vs_pool_map)
+
     # Collect all data
     all_rows = []
     for pool in pools:
@@ -165,7 +155,7 @@ def vip_status(self):
         members = get_pool_members(pool['fullPath'])
         pool_info = pool_info_map.get(pool_name, {})
         # Find which VSs use this pool
-        linked_vs_names = [k for k, v in vs_pool_map.items() if v == pool_name]
+        linked_vs_names = pool_vs_index.get(pool_name, [])
         if not linked_vs_names:
             linked_vs_names = ['Unlinked']
         for vs_name in linked_vs_names:
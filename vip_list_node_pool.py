@@ -10,6 +10,7 @@ from urllib3.exceptions import InsecureRequestWarning
 from datetime import datetime
 import pprint
 import pandas as pd
+from f5_index import build_pool_vs_index
 
 
 def f5_auth_token(address, user, password,
@@ -158,6 +159,9 @@ for vs in virtuals:
     desc = vs.get('description', '')
     vs_desc_map[vs_name] = desc
 
+# Invert vs_pool_map once so each pool finds its virtual servers in O(1)
+pool_vs_index = build_pool_vs_index(vs_pool_map)
+
 # Collect all data
 all_rows = []
 for pool in pools:
@@ -165,7 +169,7 @@ for pool in pools:
     members = get_pool_members(pool['fullPath'])
     pool_info = pool_info_map.get(pool_name, {})
     # Find which VSs use this pool
-    linked_vs_names = [k for k, v in vs_pool_map.items() if v == pool_name]
+    linked_vs_names = pool_vs_index.get(pool_name, [])
     if not linked_vs_names:
         linked_vs_names = ['Unlinked']
     for vs_name in linked_vs_names:
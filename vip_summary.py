@@ -1,8 +1,9 @@
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Alignment
-import requests
 from urllib3.exceptions import InsecureRequestWarning
+from f5_session import decode_json, guarded_session
+from f5_summary_stats import status_summary
 
 def add_status_summary_to_excel(
     excel_path, summary_df, sheet_name="Status Summary", start_row=10, start_col=2, device_address=None
@@ -52,75 +53,28 @@ def fetch_and_write_f5_summary_excel_with_token(address, token, excel_path):
         from f5_status_summary_sheet import fetch_and_write_f5_summary_excel_with_token
         fetch_and_write_f5_summary_excel_with_token(address, token, excel_path)
     """
+    # Throttled, retried and circuit-broken per device like the shared sessions
+    session = guarded_session()
+
     def get_stats(url, token):
         headers = {'X-F5-Auth-Token': token, 'Content-Type': 'application/json'}
-        r = requests.get(url, headers=headers, verify=False)
+        r = session.get(url, headers=headers)
         r.raise_for_status()
-        return r.json()
-
-    def parse_stats_entries(stats_json):
-        entries = stats_json.get('entries', {})
-        total = len(entries)
-        available = unavailable = offline = unknown = 0
-        available_disabled = offline_disabled = unknown_disabled = 0
-        for entry in entries.values():
-            nested = entry.get('nestedStats', {}).get('entries', {})
-            status = nested.get('status.availabilityState', {}).get('description', '').lower()
-            enabled = nested.get('status.enabledState', {}).get('description', '').lower()
-            disabled = enabled == 'disabled'
-            if status == 'available':
-                available += 1
-                if disabled:
-                    available_disabled += 1
-            elif status == 'unavailable':
-                unavailable += 1
-            elif status == 'offline':
-                offline += 1
-                if disabled:
-                    offline_disabled += 1
-            elif status == 'unknown':
-                unknown += 1
-                if disabled:
-                    unknown_disabled += 1
-        return total, available, available_disabled, unavailable, offline, offline_disabled, unknown, unknown_disabled
+        return decode_json(r)
 
     # Virtual Servers
     vs_url = f"https://{address}/mgmt/tm/ltm/virtual/stats"
     vs_stats_json = get_stats(vs_url, token)
-    vs_total, vs_avail, vs_avail_dis, vs_unavail, vs_off, vs_off_dis, vs_unk, vs_unk_dis = parse_stats_entries(vs_stats_json)
     # Pools
     pool_url = f"https://{address}/mgmt/tm/ltm/pool/stats"
     pool_stats_json = get_stats(pool_url, token)
-    pool_total, pool_avail, pool_avail_dis, pool_unavail, pool_off, pool_off_dis, pool_unk, pool_unk_dis = parse_stats_entries(pool_stats_json)
     # Nodes
     node_url = f"https://{address}/mgmt/tm/ltm/node/stats"
     node_stats_json = get_stats(node_url, token)
-    node_total, node_avail, node_avail_dis, node_unavail, node_off, node_off_dis, node_unk, node_unk_dis = parse_stats_entries(node_stats_json)
     # Build summary DataFrame
-    summary_df = pd.DataFrame([
-        {
-            "Object Type": "Virtual Servers",
-            "Total": vs_total,
-            "Available": f"{vs_avail} ({vs_avail_dis} Disabled)",
-            "Unavailable": vs_unavail,
-            "Offline": f"{vs_off} ({vs_off_dis} Disabled)",
-            "Unknown": f"{vs_unk} ({vs_unk_dis} Disabled)"
-        },
-        {
-            "Object Type": "Pools",
-            "Total": pool_total,
-            "Available": f"{pool_avail} ({pool_avail_dis} Disabled)",
-            "Unavailable": pool_unavail,
-            "Offline": f"{pool_off} ({pool_off_dis} Disabled)",
-            "Unknown": f"{pool_unk} ({pool_unk_dis} Disabled)"
-        },
-        {
-            "Object Type": "Nodes",
-            "Total": node_total,
-            "Available": f"{node_avail} ({node_avail_dis} Disabled)",
-            "Unavailable": node_unavail,
-            "Offline": f"{node_off} ({node_off_dis} Disabled)",
-            "Unknown": f"{node_unk} ({node_unk_dis} Disabled)"
-        }
+    summary_df = status_summary([
+        ("Virtual Servers", vs_stats_json),
+        ("Pools", pool_stats_json),
+        ("Nodes", node_stats_json)
     ])
     add_status_summary_to_excel(excel_path, summary_df, device_address=address) 
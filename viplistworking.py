@@ -22,7 +22,8 @@ from datetime import datetime
 import re
 from collections import defaultdict, Counter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
-from requests.auth import HTTPBasicAuth
+from f5_session import (get_session_pool, with_select, decode_json, get_pools_expanded,
+                        VIRTUAL_FIELDS, POOL_FIELDS, MEMBER_FIELDS, NODE_FIELDS)
 from openpyxl import Workbook
 import argparse
 import logging
@@ -56,11 +57,8 @@ class F5Config:
         self.USERNAME = username
         self.PASSWORD = password
         
-        # Create session
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.USERNAME, self.PASSWORD)
-        self.session.verify = verify_ssl
-        self.session.headers.update({'Content-Type': 'application/json'})
+        # Shared token-authenticated session (see f5_session.py)
+        self.session = get_session_pool(self.USERNAME, self.PASSWORD, verify_ssl).session(self.F5_HOST)
 
         # Automatically generate report upon initialization
         try:
@@ -125,7 +123,7 @@ class F5Config:
         try:
             resp = self.session.get(url)
             resp.raise_for_status()
-            return resp.json()
+            return decode_json(resp)
         except Exception as e:
             logger.error(f"Failed to get data from {endpoint}: {str(e)}")
             return None
@@ -172,7 +170,7 @@ def parse_destination(destination):
 def process_virtual_servers(f5_config):
     """Fetch and process virtual server information using robust data-driven mapping."""
     try:
-        virtuals = f5_config.get_json('/mgmt/tm/ltm/virtual')
+        virtuals = f5_config.get_json(with_select('/mgmt/tm/ltm/virtual', VIRTUAL_FIELDS))
         vstats = f5_config.get_json('/mgmt/tm/ltm/virtual/stats')
         if not virtuals or not vstats:
             logger.error("Failed to get virtual server data or stats")
@@ -229,9 +227,9 @@ def process_virtual_servers(f5_config):
         return [], {"virtual": Counter(), "pool": Counter(), "node": Counter()}
 
 def process_pools(f5_config, summary_counts):
-    """Fetch and process pool information, always fetching members live from membersReference.link, and mapping status by fullPath/tmName.description only."""
+    """Fetch and process pool information, taking members inline from an expanded pool collection (or live from membersReference.link on older devices), and mapping status by fullPath/tmName.description only."""
     try:
-        pools = f5_config.get_json('/mgmt/tm/ltm/pool')
+        pools, expanded = get_pools_expanded(f5_config, POOL_FIELDS)
         pstats = f5_config.get_json('/mgmt/tm/ltm/pool/stats')
         if not pools or not pstats:
             logger.error("Failed to get pool data or stats")
@@ -266,20 +264,25 @@ def process_pools(f5_config, summary_counts):
                     'totalMemberCount': stats.get('memberCnt', {}).get('value', 0),
                     'members': []
                 }
-                # Always fetch members live from membersReference.link
-                members_ref = pool.get('membersReference', {}).get('link')
-                if members_ref:
-                    members_ref = members_ref.split('?')[0]
-                    if members_ref.startswith('https://localhost'):
-                        members_ref = members_ref.replace('https://localhost', '')
-                    members_data = f5_config.get_json(members_ref)
-                    if members_data and 'items' in members_data:
-                        for member in members_data['items']:
-                            pool_data[fullPath]['members'].append({
-                                'name': member.get('name', ''),
-                                'address': member.get('address', ''),
-                                'port': member.get('port', '')
-                            })
+                members_ref = pool.get('membersReference', {})
+                if expanded:
+                    member_items = members_ref.get('items', [])
+                else:
+                    # Fetch members live from membersReference.link
+                    member_items = []
+                    if members_ref.get('link'):
+                        link = members_ref['link'].split('?')[0]
+                        if link.startswith('https://localhost'):
+                            link = link.replace('https://localhost', '')
+                        members_data = f5_config.get_json(with_select(link, MEMBER_FIELDS))
+                        if members_data and 'items' in members_data:
+                            member_items = members_data['items']
+                for member in member_items:
+                    pool_data[fullPath]['members'].append({
+                        'name': member.get('name', ''),
+                        'address': member.get('address', ''),
+                        'port': member.get('port', '')
+                    })
             except Exception as e:
                 logger.error(f"Error processing pool {name}: {str(e)}")
                 continue
@@ -291,7 +294,7 @@ def process_pools(f5_config, summary_counts):
 def process_nodes(f5_config, summary_counts):
     """Fetch and process node information using robust data-driven mapping."""
     try:
-        nodes = f5_config.get_json('/mgmt/tm/ltm/node')
+        nodes = f5_config.get_json(with_select('/mgmt/tm/ltm/node', NODE_FIELDS))
         nstats = f5_config.get_json('/mgmt/tm/ltm/node/stats')
         if not nodes or not nstats:
             logger.error("Failed to get node data or stats")
@@ -333,12 +336,15 @@ def process_nodes(f5_config, summary_counts):
         return {}
 
 def generate_excel_report(report_data, summary_counts, output_prefix):
-    """Generate Excel report with summary and details."""
-    wb = Workbook()
+    """Generate Excel report with summary and details.
+
+    Uses an openpyxl write-only workbook so rows are streamed to disk as they
+    are appended instead of being held as cell objects until the save.
+    """
+    wb = Workbook(write_only=True)
     
     # Summary sheet
-    summary_sheet = wb.active
-    summary_sheet.title = "Summary"
+    summary_sheet = wb.create_sheet("Summary")
     
     # Add summary headers
     summary_sheet.append(["Type", "Available", "Offline", "Online", "Unknown", "Total"])
@@ -1,3 +1,4 @@
+from f5_index import build_pool_vs_index
 
 
   # --- Fetch virtual server list ---
@@ -65,6 +66,9 @@ def generate_summary_excel():
             vs_pool_map[vs_name] = pool
         vs_desc_map[vs_name] = desc
 
+    # Invert vs_pool_map once so each pool finds its virtual servers in O(1)
+    pool_vs_index = build_pool_vs_index(vs_pool_map)
+
     # --- Collect all data ---
     all_rows = []
     for pool in pools:
@@ -73,7 +77,7 @@ def generate_summary_excel():
         members = get_pool_members(pool_path)
 
         # Find which VSs use this pool
-        linked_vs_names = [k for k, v in vs_pool_map.items() if v == pool_path]
+        linked_vs_names = pool_vs_index.get(pool_path, [])
         if not linked_vs_names:
             linked_vs_names = ['Unlinked']
 